@@ -0,0 +1,95 @@
+""" Throughput of the serial decoders (sync, cobs, ascii), in memory and over a pty loopback
+
+Usage:
+  python benchmarks/bench_decoder.py [--samples 200000] [--channels 3] [--window 100]
+
+The pty half (Linux/macOS) writes pre-encoded packets into the master end from a thread
+while SerialManager reads the slave end with readinto and decodes, like the acquisition loop.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+from sensor_core.serial.decoders import make_decoder, encode_sync_packets, cobs_encode
+from sensor_core.serial.ser_manager import SerialManager
+
+
+def encode(protocol, samples, per_packet):
+    if protocol == 'ascii':
+        return ''.join(','.join(f"{x:.5g}" for x in row) + '\n' for row in samples.tolist()).encode()
+    payloads = samples.reshape(-1, per_packet * samples.shape[1]).view(np.uint8)
+    if protocol == 'sync':
+        return encode_sync_packets(payloads).tobytes()
+    return b''.join(cobs_encode(p.tobytes()) for p in payloads)
+
+
+def bench_memory(protocol, wire, frame_shape, chunk=1 << 16):
+    dec = make_decoder(protocol, frame_shape)
+    frames = 0
+    t0 = time.perf_counter()
+    for i in range(0, len(wire), chunk):
+        out = dec.feed(wire[i:i + chunk])
+        if out is not None:
+            frames += out.shape[0]
+    return frames, time.perf_counter() - t0
+
+
+def bench_pty(protocol, wire, frame_shape):
+    import tty
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    sm = SerialManager(os.ttyname(slave), 4_000_000, (1,) + frame_shape, protocol=protocol)
+    sm.setup_serial()
+
+    def writer():
+        view = memoryview(wire)
+        while view:
+            n = os.write(master, view[:1 << 14])
+            view = view[n:]
+
+    frames = 0
+    t0 = t_last = time.perf_counter()
+    th = threading.Thread(target=writer, daemon=True)
+    th.start()
+    while True:
+        out = sm._read_frames()
+        if out is not None:
+            frames += out.shape[0]
+            t_last = time.perf_counter()
+        elif not th.is_alive() and not sm.ser.in_waiting:
+            break
+    dt = t_last - t0
+    sm.ser.close()
+    os.close(master)
+    os.close(slave)
+    return frames, dt
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--samples", type=int, default=200_000)
+    ap.add_argument("--channels", type=int, default=3)
+    ap.add_argument("--window", type=int, default=100)
+    ap.add_argument("--per-packet", type=int, default=1, help="samples per packet")
+    args = ap.parse_args()
+
+    S, C = args.window, args.channels
+    n = (args.samples // S) * S
+    samples = np.random.default_rng(0).standard_normal((n, C)).astype('<f4')
+    frame_shape = (S, C)
+
+    for protocol in ('sync', 'cobs', 'ascii'):
+        wire = encode(protocol, samples, args.per_packet)
+        mb = len(wire) / 1e6
+        frames, dt = bench_memory(protocol, wire, frame_shape)
+        print(f"{protocol:4s} memory: {mb / dt:8.1f} MB/s  {n / dt:12,.0f} samples/s  ({frames} frames)")
+        if sys.platform.startswith(('linux', 'darwin')):
+            frames, dt = bench_pty(protocol, wire, frame_shape)
+            print(f"{protocol:4s} pty:    {mb / dt:8.1f} MB/s  {frames * S / dt:12,.0f} samples/s  ({frames} frames)")
+
+
+if __name__ == "__main__":
+    main()
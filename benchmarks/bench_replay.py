@@ -0,0 +1,72 @@
+""" Deterministic decode throughput from a raw serial capture
+
+Usage:
+  python benchmarks/bench_replay.py [capture.scraw] [--speed 0] [--record-seconds 3]
+
+Replays a capture written by SerialManager.start_capture (capture_path=...) through the
+reader thread and decoder. Without a file, a capture of the pty SensorEmulator is recorded first.
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+
+from sensor_core.serial.capture import REPLAY_PREFIX, read_capture
+from sensor_core.serial.emulator import SensorEmulator
+from sensor_core.serial.ser_manager import SerialManager
+
+
+def record(path, seconds, rate):
+    emu = SensorEmulator(num_channel=3, protocol='sync', waveform='sine', sample_rate_hz=rate)
+    emu.start()
+    sm = SerialManager(emu.port, 4_000_000, (1, 100, 3), protocol='sync')
+    sm.setup_serial()
+    sm.start_capture(path)
+    sm.start_reader()
+    t_end = time.perf_counter() + seconds
+    while time.perf_counter() < t_end:
+        sm._read_frames()
+    sm.stop_capture()
+    sm.stop_reader()
+    emu.stop()
+    sm.ser.close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("capture", nargs="?")
+    ap.add_argument("--speed", type=float, default=0.0, help="1 = recorded timing, N = N times faster, 0 = max")
+    ap.add_argument("--record-seconds", type=float, default=3.0)
+    ap.add_argument("--rate", type=float, default=50_000, help="emulator samples/s when recording")
+    args = ap.parse_args()
+
+    path = args.capture
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), "bench_replay.scraw")
+        record(path, args.record_seconds, args.rate)
+
+    hdr, _ = read_capture(path)
+    sm = SerialManager(REPLAY_PREFIX + path, 0, tuple(hdr['frame_shape']), protocol=hdr['protocol'],
+                       EOL=bytes.fromhex(hdr['eol_hex']) if hdr.get('eol_hex') else None,
+                       wire_dtype=np.dtype(hdr['wire_dtype']), data_mode=hdr['data_mode'],
+                       replay_speed=args.speed)
+    sm.setup_serial()
+    sm.start_reader()
+
+    frames = 0
+    t0 = time.perf_counter()
+    while not (sm.ser.eof and sm._byte_ring.available() == 0):
+        out = sm._read_frames()
+        if out is not None:
+            frames += out.shape[0]
+    dt = time.perf_counter() - t0
+    sm.stop_reader()
+
+    mb = sm.ser.bytes_replayed / 1e6
+    print(f"replayed {mb:.2f} MB in {dt:.3f} s: {mb / dt:.1f} MB/s, {frames / dt:,.0f} frames/s ({frames} frames)")
+    print(sm.decoder.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+""" SCBIN read throughput: per-record fh.read loop vs ScbinReader chunks
+
+Usage:
+  python benchmarks/bench_scbin_read.py [--frames 200000] [--chunk 4096] [--shape 100,3]
+
+Writes one sealed segment, then splits it into per-channel sample arrays and per-frame
+timestamps twice: with the loop the ingester used before (two fh.read calls and a struct.unpack
+per record, concatenated per batch) and with ScbinReader.iter_chunks over the memory-mapped
+file. Checks that both produce the same arrays and reports MB/s and frames/s.
+"""
+import argparse
+import os
+import struct
+import tempfile
+import time
+import numpy as np
+
+from sensor_core.memory.stream_logger import BinaryStreamWriter
+from sensor_core.memory.scbin import REC_HEADER_SZ, ScbinReader, _records_extent
+
+
+def read_per_record(path, chunk):
+    with open(path, 'rb') as fh:
+        hdr, data_off, n, _ = _records_extent(fh)
+        _, S, C = hdr['frame_shape']
+        dtype = np.dtype(hdr['dtype'])
+        fh.seek(data_off)
+        chans, ts, acc, acc_t = [[] for _ in range(C)], [], [], []
+        for k in range(n):
+            ts_ns, _ = struct.unpack('<QQ', fh.read(REC_HEADER_SZ))
+            acc.append(np.frombuffer(fh.read(C * S * dtype.itemsize), dtype=dtype).reshape(C, S))
+            acc_t.append(ts_ns)
+            if len(acc) >= chunk or k == n - 1:
+                blk = np.stack(acc)
+                for ci in range(C):
+                    chans[ci].append(blk[:, ci, :].reshape(-1))
+                ts.append(np.asarray(acc_t, dtype=np.uint64))
+                acc.clear(); acc_t.clear()
+    return [np.concatenate(c) for c in chans], np.concatenate(ts)
+
+
+def read_mapped(path, chunk):
+    with ScbinReader(path) as r:
+        C = r.slot_shape[0]
+        chans, ts = [[] for _ in range(C)], []
+        for blk in r.iter_chunks(chunk):
+            for ci in range(C):
+                chans[ci].append(blk['payload'][:, ci, :].reshape(-1))
+            ts.append(blk['ts_ns'].copy())
+        del blk
+    return [np.concatenate(c) for c in chans], np.concatenate(ts)
+
+
+def run(label, fn, path, args, mb, nframes):
+    t0 = time.perf_counter()
+    out = fn(path, args.chunk)
+    dt = time.perf_counter() - t0
+    print(f"{label:<12} {mb / dt:8.1f} MB/s  {nframes / dt:12,.0f} frames/s  ({dt:.3f} s)")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=200_000)
+    ap.add_argument("--chunk", type=int, default=4096, help="frames per ingest batch")
+    ap.add_argument("--shape", default="100,3", help="line frame shape S,C (samples, channels)")
+    args = ap.parse_args()
+
+    S, C = (int(x) for x in args.shape.split(","))
+    frames = np.random.default_rng(0).standard_normal((args.frames, C, S)).astype(np.float32)
+    ts = np.arange(args.frames, dtype=np.uint64) * 1_000_000 + time.time_ns()
+    with tempfile.TemporaryDirectory() as tmp:
+        a, b = os.path.join(tmp, "a.bin"), os.path.join(tmp, "b.bin")
+        w = BinaryStreamWriter(a, b, "bench", args.frames, (1, S, C), frames.dtype,
+                               rotate_frames=args.frames + 1, overwrite=True)
+        w.write_frames(memoryview(frames), frames[0].nbytes, 0, args.frames, ts)
+        w._rotate()  # seal a.bin
+        w._fh.close()
+        mb = args.frames * (frames[0].nbytes + REC_HEADER_SZ) / 1e6
+        old = run("per-record", read_per_record, a, args, mb, args.frames)
+        new = run("mapped", read_mapped, a, args, mb, args.frames)
+    same = all(np.array_equal(o, n) for o, n in zip(old[0], new[0])) and np.array_equal(old[1], new[1])
+    print("output identical:", same)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+""" Wake-up jitter of a periodic loop under CPU load, with and without pinning and priority
+
+Usage:
+  python benchmarks/bench_sched_jitter.py [--period-ms 1] [--seconds 3] [--hogs N] [--cpu K]
+
+Each configuration runs a 1 kHz loop (like an acquisition or writer loop) in a child process
+started through run_scheduled, while N busy-loop processes load the host. With pinning, the
+loop gets CPU K to itself and the hogs are kept on the other CPUs (a reserved core); nice and
+SCHED_FIFO rows need CAP_SYS_NICE and report what was refused.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+import numpy as np
+
+from sensor_core.utils.sched import run_scheduled
+
+
+def _hog(cpus, stop):
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    x = 0
+    while not stop.is_set():
+        x += 1
+
+
+def _periodic(period_s, seconds, out):
+    late = []
+    t_next = time.perf_counter() + period_s
+    t_end = t_next + seconds
+    while t_next < t_end:
+        time.sleep(max(0.0, t_next - time.perf_counter()))
+        late.append(time.perf_counter() - t_next)
+        t_next += period_s
+    out.put(np.asarray(late) * 1e3)
+
+
+def run(name, sched, hog_cpus, args):
+    stop = mp.Event()
+    hogs = [mp.Process(target=_hog, args=(hog_cpus, stop), daemon=True) for _ in range(args.hogs)]
+    for h in hogs:
+        h.start()
+    q, proxy = mp.Queue(), args.manager.dict()
+    p = mp.Process(target=run_scheduled, args=('update', sched, proxy, _periodic,
+                                                args.period_ms / 1e3, args.seconds, q))
+    p.start()
+    late = q.get()
+    p.join()
+    metrics = proxy.get('sched_update', {})
+    stop.set()
+    for h in hogs:
+        h.join()
+    miss = int((late > args.period_ms).sum())
+    print(f"{name:<22} p50 {np.percentile(late, 50):7.3f}  p99 {np.percentile(late, 99):7.3f}  "
+          f"max {late.max():8.3f} ms  missed {miss:5d}/{late.size}  "
+          f"cpus={metrics.get('cpus')} nice={metrics.get('nice')} policy={metrics.get('policy')}"
+          + (f"  refused: {'; '.join(metrics['errors'])}" if metrics.get('errors') else ""))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--period-ms", type=float, default=1.0)
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--hogs", type=int, default=os.cpu_count() or 1, help="busy-loop load processes")
+    ap.add_argument("--cpu", type=int, default=None, help="CPU reserved for the loop when pinned (default: last)")
+    args = ap.parse_args()
+    mp.set_start_method("fork", force=True)
+    args.manager = mp.Manager()
+
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+    k = args.cpu if args.cpu is not None else cpus[-1]
+    others = [c for c in cpus if c != k] or cpus  # single-CPU hosts cannot reserve a core
+    print(f"{args.hogs} hogs on {len(cpus)} CPUs; loop period {args.period_ms} ms; lateness in ms")
+
+    run("default", None, None, args)
+    run(f"pinned cpu {k}", {'cpus': [k]}, others, args)
+    run("pinned + nice -10", {'cpus': [k], 'nice': -10}, others, args)
+    run("pinned + SCHED_FIFO 50", {'cpus': [k], 'fifo': 50}, others, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
-__all__ = ["SensorManager"]
+__all__ = ["SensorManager", "SensorHub"]
 
 def __getattr__(name):
     if name == "SensorManager":
         from .sensor_manager import SensorManager
         return SensorManager
+    if name == "SensorHub":
+        from .sensor_hub import SensorHub
+        return SensorHub
     raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
-
@@ -3,6 +3,8 @@ from sensor_core.memory.ring_adapter import RingBuffer
 import numpy as np
 from sensor_core.memory.mem_utils import _assert_ring_layout
 from sensor_core.serial import SerialManager
+from sensor_core.serial.multi_source import make_aligner
+from sensor_core.data.transform import FrameTransform
 from sensor_core.utils import DictManager
 from sensor_core.memory.strg_manager import StorageManager
 from time import perf_counter
@@ -48,6 +50,14 @@ class DataManager(SerialManager, DictManager, StorageManager):
                                self.dtype,create=False)
         _assert_ring_layout(self.ring, tuple(self.shape), self.dtype)
 
+        # Frames are acquired in the input shape and dtype and reduced to the ring's before publishing
+        self.acquire_shape = tuple(self.input_shape) if self.input_shape else tuple(self.shape)
+        self.acquire_dtype = np.dtype(self.input_dtype) if self.input_dtype else np.dtype(self.dtype)
+        self.frame_transform = None
+        if self.transform:
+            self.frame_transform = FrameTransform(self.transform, self.acquire_shape,
+                                                  self.data_mode, self.acquire_dtype)
+
         # Start serial port
         self.start_serial(virtual_ser_port=virtual_ser_port)
 
@@ -59,64 +69,147 @@ class DataManager(SerialManager, DictManager, StorageManager):
 
     def start_serial(self, virtual_ser_port):
         """ Initialize SerialManager subclass, and setup serial port
-
+        A list of commports starts one reader thread per port and a MultiSourceAligner merging them
         """
+        if isinstance(self.commport, (list, tuple)):
+            SerialManager.__init__(self, commport=self.commport,
+                                   baudrate=self.baudrate,
+                                   frame_shape=self.acquire_shape,
+                                   virtual_ser_port=virtual_ser_port,
+                                   wire_dtype=self.acquire_dtype,
+                                   data_mode=self.data_mode,
+                                   replay_speed=self.replay_speed)
+            if self.data_mode != 'line':
+                raise ValueError("multi-port acquisition supports line data only")
+            if virtual_ser_port:
+                return
+            self.aligner = make_aligner(self.commport, self.baudrate,
+                                        self.source_channels or [self.num_channel // len(self.commport)] * len(self.commport),
+                                        window=int(self.acquire_shape[1]),
+                                        protocol=self.protocol or 'sync', EOL=self.EOL,
+                                        wire_dtype=self.acquire_dtype,
+                                        method=self.align_method or 'nearest',
+                                        max_skew_ms=self.align_max_skew_ms or 20.0,
+                                        replay_speed=self.replay_speed)
+            if self.aligner.num_channel != int(self.acquire_shape[2]):
+                raise ValueError(f"source_channels sum to {self.aligner.num_channel}, "
+                                 f"ring expects C={self.acquire_shape[2]}")
+            return
         SerialManager.__init__(self, commport=self.commport,
                                baudrate=self.baudrate,
-                               frame_shape=self.shape,
+                               frame_shape=self.acquire_shape,
                                EOL=self.EOL,
-                               virtual_ser_port=virtual_ser_port)
+                               virtual_ser_port=virtual_ser_port,
+                               protocol=self.protocol,
+                               wire_dtype=self.acquire_dtype,
+                               data_mode=self.data_mode,
+                               replay_speed=self.replay_speed,
+                               timestamp_model=bool(self.timestamp_model),
+                               counter_channel=self.counter_channel,
+                               counter_bits=self.counter_bits,
+                               nominal_rate_hz=self.nominal_rate_hz)
         self.setup_serial()
+        if self.capture_path and self.ser is not None:
+            self.start_capture(self.capture_path)
+
+    def start_io_threads(self):
+        """ Start the background port readers
+        Called from online_update_data, so the threads live in the acquisition process (threads do not
+        survive the fork from the process that built this DataManager) and inherit its CPU affinity and priority.
+        """
+        if self.aligner is not None:
+            if not any(s.is_alive() for s in self.aligner.sources):
+                self.aligner.start()
+        elif self.decoder is not None:
+            # Built-in protocols read the port on a background thread and decode from its byte ring
+            self.start_reader(metrics=self.metrics)
 
     def online_update_data(self, func=None):
-        last_push = perf_counter()
+        self.start_io_threads()
+        self._last_push = perf_counter()
         last_log = time.time()
+        # Functions taking `out` decode straight into reserved ring slots (no intermediate array);
+        # those also taking `max_frames` fill up to batch_frames slots per call
+        in_place = self.func_writes_in_place(func)
+        if in_place and self.frame_transform is not None:
+            raise ValueError("in-place acquisition functions fill ring slots directly and cannot be combined "
+                             "with a transform; return frames from func instead")
+        if in_place and (self.timestamp_model or isinstance(self.commport, (list, tuple))):
+            # the stream writer labels these records device_clock, but in-place frames bypass the clock model
+            raise ValueError("in-place acquisition functions are stamped at commit and cannot be combined "
+                             "with timestamp_model or multi-port acquisition; return frames from func instead")
+        batch = int(self.batch_frames or 64) if self.func_fills_batches(func) else None
+        line = self.data_mode == 'line'
+        frame_ndim = 2 if line else 3
         while True:
             try:
-                with timer(lambda ms: self.metrics.add_acquire_ms(ms)):
-                    ys = self.acquire_data(func=func,
-                                           data_mode=self.data_mode)
+                if in_place:
+                    t0 = perf_counter()
+                    slots = self.ring.reserve(batch or 1)
+                    if batch is None:
+                        n = self.acquire_into(slots[0].T if line else slots[0], func)
+                    else:
+                        n = self.acquire_into(slots.transpose(0, 2, 1) if line else slots, func,
+                                              max_frames=slots.shape[0])
+                    if n:
+                        self.metrics.add_acquire_ms((perf_counter() - t0) * 1000.0, frames=n)
+                        mono_ns, wall_ns = self.take_frame_stamps()
+                        with timer(lambda ms: self.metrics.note_publish(ms, write_idx=int(self.ring.write_idx),
+                                                                        frames=n)):
+                            self.ring.commit(n, mono_ns, wall_ns)
+                        self._note_published()
+                    continue
+
+                t0 = perf_counter()
+                ys = self.acquire_data(func=func,
+                                       data_mode=self.data_mode)
                 if ys is None:
                     if time.time() - last_log > 1.0:
                         print("[writer] acquire_data -> None")
                         last_log = time.time()
                     continue
 
-                if self.data_mode=='line':
-                    arr = np.asarray(ys)
-                    if arr.ndim != 2:
-                        raise ValueError(f"[writer] ys ndim={arr.ndim}, expected 2 (N,C), got {arr.shape}")
-
-                    N_in, C_in = arr.shape
-                    N_ring, _, C_ring, = self.frame_shape  # ring frame is (N, C)
-
-                    if C_in != C_ring:
-                        raise ValueError(f"[writer] channels mismatch: ys (N,{C_in}), ring expects C={C_ring}")
-
-                    # Clamp to ring N
-                    N = min(N_in, N_ring)
-                    if N != N_ring:
-                        arr = arr[:N, :]
-
-                    # Confirm frame is contiguous and transpose, then publish to ring
-                    frame = np.ascontiguousarray(arr, dtype=self.dtype)
-                    with timer(lambda ms: self.metrics.note_publish(ms, write_idx=int(self.ring.write_idx))):
-                        self.ring.publish(frame)
-                else:
-                    with timer(lambda ms: self.metrics.note_publish(ms)):
-                        self.ring.publish(np.asarray(ys, dtype=self.dtype))
-
-                wi = int(self.ring.write_idx)
-                self.metrics.last_write_idx = wi
-
-                now = perf_counter()
-                if self._metrics_proxy is not None and (now - last_push) > 0.5:
-                    self._metrics_proxy.update(self.metrics.snapshot())
-                    last_push = now
+                # acquire_data validated the shape once for the whole batch
+                arr = np.asarray(ys)
+                n = arr.shape[0] if arr.ndim > frame_ndim else 1
+                self.metrics.add_acquire_ms((perf_counter() - t0) * 1000.0, frames=n)
+
+                if self.frame_transform is not None:
+                    arr, self.frame_mono_ns = self.frame_transform(arr if arr.ndim > frame_ndim else arr[None],
+                                                                   self.frame_mono_ns)
+                    n = arr.shape[0]
+                    if n == 0:
+                        continue  # frame decimation group still filling
+
+                # Several frames from one acquisition go into the ring as a single batch
+                publish = self.ring.publish_many if arr.ndim > frame_ndim else self.ring.publish
+                mono_ns, wall_ns = self.take_frame_stamps()
+                with timer(lambda ms: self.metrics.note_publish(ms, write_idx=int(self.ring.write_idx), frames=n)):
+                    publish(arr, mono_ns, wall_ns)
+                self._note_published()
 
             except Exception as e:
                 print("[writer] EXCEPTION:", repr(e))
                 traceback.print_exc()
                 time.sleep(0.02)
 
-
+    def _note_published(self):
+        """ Record the new write index and push metrics to the shared proxy (rate-limited to ~2 Hz) """
+        wi = int(self.ring.write_idx)
+        self.metrics.last_write_idx = wi
+
+        now = perf_counter()
+        if self._metrics_proxy is not None and (now - self._last_push) > 0.5:
+            snap = self.metrics.snapshot()
+            if self.decoder is not None:
+                snap.update(self.decoder.stats())
+            if self.frame_clock is not None:
+                snap.update(self.frame_clock.clock.stats())
+            if self.aligner is not None:
+                snap.update(self.aligner.stats())
+            if self.frame_transform is not None:
+                snap.update(transform_in_shape=self.acquire_shape,
+                            transform_out_shape=tuple(self.shape),
+                            transform_out_dtype=str(self.dtype))
+            self._metrics_proxy.update(snap)
+            self._last_push = now
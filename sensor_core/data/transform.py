@@ -0,0 +1,139 @@
+from typing import Optional, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+TRANSFORM_KEYS = ('crop', 'bin', 'decimate', 'taps', 'dtype', 'scale', 'offset')
+
+
+def _lowpass_taps(q: int, taps: Optional[int] = None) -> np.ndarray:
+    """Windowed-sinc anti-alias filter for decimation by q (cutoff at the new Nyquist, unity DC gain)."""
+    n = int(taps) if taps else 8 * q + 1
+    n += (n + 1) % 2  # odd length, symmetric
+    k = np.arange(n) - (n - 1) / 2
+    h = np.sinc(k / q) * np.hamming(n)
+    return (h / h.sum()).astype(np.float64)
+
+
+class FrameTransform:
+    def __init__(self, config: dict, frame_shape: Tuple[int, ...], data_mode: str = 'line', dtype=np.float32):
+        """
+        Pre-publish reduction of acquired frames, applied once per batch before they reach the ring
+          line:  decimate (int) low-pass filters and keeps every q-th sample along S; the filter state
+                 carries across frames, so the reduced stream is continuous.
+          image: crop (y0, y1, x0, x1), then bin (int) averages b x b pixel blocks; decimate (int)
+                 averages each q consecutive frames into one.
+          both:  dtype narrows the output, as clip(round(x * scale + offset)) for integer types.
+        :param config: dict with any of crop, bin, decimate, taps (FIR length), dtype, scale, offset
+        :param frame_shape: acquired logical shape, (N, S, C) for line or (H, W, C) for image data
+        :param data_mode: 'line' or 'image'
+        :param dtype: dtype of acquired frames
+        """
+        unknown = set(config) - set(TRANSFORM_KEYS)
+        if unknown:
+            raise ValueError(f"unknown transform options {sorted(unknown)}; expected {TRANSFORM_KEYS}")
+        self.line = data_mode == 'line'
+        self.in_shape = tuple(int(x) for x in frame_shape)
+        self.in_dtype = np.dtype(dtype)
+        self.q = int(config.get('decimate') or 1)
+        self.bin = int(config.get('bin') or 1)
+        self.crop = tuple(int(x) for x in config['crop']) if config.get('crop') else None
+        self.out_dtype = np.dtype(config['dtype']) if config.get('dtype') else self.in_dtype
+        self.scale = float(config.get('scale', 1.0))
+        self.offset = float(config.get('offset', 0.0))
+        if self.q < 1 or self.bin < 1:
+            raise ValueError("decimate and bin must be positive integers")
+
+        if self.line:
+            if self.crop is not None or self.bin != 1:
+                raise ValueError("crop and bin apply to image data; line data supports decimate and dtype")
+            _, S, C = self.in_shape
+            if S % self.q:
+                raise ValueError(f"decimate={self.q} must divide the frame window S={S}")
+            self.taps = _lowpass_taps(self.q, config.get('taps')) if self.q > 1 else None
+            self._hist = None  # last len(taps) - 1 input samples, (k, C)
+            self.out_shape = (self.in_shape[0], S // self.q, C)
+        else:
+            H, W, C = self.in_shape
+            y0, y1, x0, x1 = self.crop if self.crop is not None else (0, H, 0, W)
+            if not (0 <= y0 < y1 <= H and 0 <= x0 < x1 <= W):
+                raise ValueError(f"crop {self.crop} lies outside the {H}x{W} frame")
+            # trim the crop to whole bins
+            y1 -= (y1 - y0) % self.bin
+            x1 -= (x1 - x0) % self.bin
+            self._roi = (slice(y0, y1), slice(x0, x1))
+            self.out_shape = ((y1 - y0) // self.bin, (x1 - x0) // self.bin, C)
+            self._acc = None  # frames of an incomplete decimation group
+            self._acc_stamps = None
+
+    @property
+    def identity(self) -> bool:
+        return (self.q == 1 and self.bin == 1 and self.crop is None
+                and self.out_dtype == self.in_dtype and self.scale == 1.0 and self.offset == 0.0)
+
+    def __call__(self, frames: np.ndarray, mono_ns: Optional[np.ndarray] = None):
+        """
+        Reduce a batch of frames
+        :param frames: (N, S, C) or (N, H, W, C) batch in the acquired shape
+        :param mono_ns: optional (N,) frame stamps; carried to the output frames
+        :return: (reduced batch, stamps or None); the batch may be empty while a decimation group fills
+        """
+        out = self._line(frames) if self.line else self._image(frames)
+        if not self.line and self.q > 1:
+            out, mono_ns = self._decimate_frames(out, mono_ns)
+        return self._narrow(out), mono_ns
+
+    def _line(self, frames: np.ndarray) -> np.ndarray:
+        if self.q == 1:
+            return frames
+        N, S, C = frames.shape
+        x = frames.reshape(N * S, C).astype(np.float64, copy=False)
+        k = self.taps.size - 1
+        if self._hist is None:
+            self._hist = np.repeat(x[:1], k, axis=0)  # start as if the first sample had always been there
+        ext = np.concatenate((self._hist, x))
+        self._hist = ext[-k:]
+        # one FIR output per kept sample: windows ending at samples q-1, 2q-1, ...
+        win = sliding_window_view(ext, self.taps.size, axis=0)[self.q - 1::self.q]  # (N*S/q, C, taps)
+        y = win @ self.taps[::-1]
+        return y.reshape(N, S // self.q, C)
+
+    def _image(self, frames: np.ndarray) -> np.ndarray:
+        if self.crop is None and self.bin == 1:
+            return frames
+        roi = frames[:, self._roi[0], self._roi[1], :]
+        if self.bin == 1:
+            return roi
+        N, H, W, C = roi.shape
+        b = self.bin
+        return roi.reshape(N, H // b, b, W // b, b, C).mean(axis=(2, 4))
+
+    def _decimate_frames(self, frames: np.ndarray, mono_ns: Optional[np.ndarray]):
+        if self._acc is not None and self._acc.shape[0]:
+            frames = np.concatenate((self._acc, frames))
+            if mono_ns is not None and self._acc_stamps is not None:
+                mono_ns = np.concatenate((self._acc_stamps, mono_ns))
+        n = frames.shape[0] // self.q
+        self._acc = frames[n * self.q:].copy()
+        self._acc_stamps = None if mono_ns is None else np.asarray(mono_ns)[n * self.q:].copy()
+        out = frames[:n * self.q].reshape((n, self.q) + frames.shape[1:]).mean(axis=1)
+        stamps = None if mono_ns is None else np.asarray(mono_ns)[:n * self.q:self.q]
+        return out, stamps
+
+    def _narrow(self, frames: np.ndarray) -> np.ndarray:
+        if self.scale != 1.0 or self.offset != 0.0:
+            frames = frames * self.scale + self.offset
+        if self.out_dtype.kind in 'iu':
+            info = np.iinfo(self.out_dtype)
+            frames = np.clip(np.rint(frames), info.min, info.max)
+        return frames.astype(self.out_dtype, copy=False)
+
+
+def transformed_spec(config: Optional[dict], frame_shape: Tuple[int, ...], data_mode: str, dtype):
+    """
+    Ring shape and dtype that frames have after the transform
+    :return: (logical shape, dtype)
+    """
+    if not config:
+        return tuple(frame_shape), np.dtype(dtype)
+    t = FrameTransform(config, frame_shape, data_mode, dtype)
+    return t.out_shape, t.out_dtype
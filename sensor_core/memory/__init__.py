@@ -1,3 +1,4 @@
 from .mem_utils import *
 from .strg_manager import *
-from .ring_adapter import *
\ No newline at end of file
+from .ring_adapter import *
+from .scbin import ScbinReader
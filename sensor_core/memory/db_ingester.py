@@ -1,25 +1,15 @@
-import os, json, struct, time, traceback
+import os, time, traceback
 from typing import List, Optional, Tuple
 import numpy as np
 from sqlitedict import SqliteDict
 from .strg_manager import StorageManager
+from .segments import (list_segments, claim_segment, claim_progress, record_progress, release_segment,
+                       quarantine_segment)
 
-MAGIC = b'SCBIN\x00\x00'
-MAGIC_LEN = len(MAGIC)
-REC_HEADER_SZ = 16
+from .scbin import MAGIC, ScbinReader, _read_header
 
 def _seal_path(p: str) -> str: return p + ".seal"
 
-def _read_header(fh):
-    magic = fh.read(MAGIC_LEN)
-    if magic != MAGIC:
-        raise ValueError('Invalid stream magic')
-    ver_bytes = fh.read(2);  ver = int.from_bytes(ver_bytes, 'little')
-    len_bytes = fh.read(4);  hdr_len = int.from_bytes(len_bytes, 'little')
-    payload = fh.read(hdr_len)
-    hdr = json.loads(payload.decode('utf-8'))
-    return ver, hdr, ver_bytes, len_bytes, payload
-
 def _ensure_sqlite_keys_line(sqlite_path: str, channel_keys: List[str], dtype: np.dtype):
     with SqliteDict(sqlite_path) as db:
         for k in channel_keys:
@@ -35,80 +25,93 @@ def _ensure_sqlite_keys_image(sqlite_path: str, shape: Tuple[int,int,int], dtype
             db['image'] = np.array([], dtype=dtype)  # flattened frames appended
         if 'image_shape' not in db:
             db['image_shape'] = tuple(shape)         # (H,W,Cimg)
+        if 'time' not in db:
+            db['time'] = np.array([], dtype=np.float64)  # one entry per frame
         db.commit()
 
+def _sample_times(t: np.ndarray, S: int, state: dict) -> np.ndarray:
+    """
+    Spread per-frame first-sample times over the S samples of each frame
+      Each frame's samples are evenly spaced up to the next frame's stamp; the last frame of a
+      batch, and frames followed by a gap, reuse the typical spacing.
+    :param t: per-frame times (s) of each frame's first sample
+    :param S: samples per frame
+    :param state: carries the last known sample spacing between calls
+    """
+    step = np.diff(t) / S
+    typical = float(np.median(step[step > 0])) if np.any(step > 0) else state.get('step', 0.0)
+    if step.size and typical > 0:
+        # a stamp jump of more than a few frames is a gap (lost frames), not slow samples
+        step = np.where((step <= 0) | (step > 4 * typical), typical, step)
+    step = np.append(step, typical)
+    state['step'] = typical
+    return (t[:, None] + step[:, None] * np.arange(S)).ravel()
+
+def _append_time(sm: StorageManager, ts_ns: np.ndarray, repeat: int = 1, spread: Optional[dict] = None):
+    """
+    Append producer wall-clock timestamps (seconds) to the 'time' key
+    :param sm: storage manager for the target sqlite file
+    :param ts_ns: per-frame record timestamps in ns
+    :param repeat: entries per frame, so 'time' lines up with per-sample channel data
+    :param spread: spacing state when stamps are first-sample times from a device clock model
+    (per-sample times are interpolated); None repeats the frame stamp for every sample
+    """
+    if len(ts_ns) == 0:
+        return
+    t = np.asarray(ts_ns, dtype=np.uint64).astype(np.float64) / 1e9
+    if spread is not None and repeat > 1:
+        sm.append_serial_channel('time', _sample_times(t, repeat, spread))
+    else:
+        sm.append_serial_channel('time', np.repeat(t, repeat))
+
 def _ingest_file_line(path: str, sqlite_path: str, channel_keys: List[str],
                       batch_frames: int, dtype: np.dtype, C: int, S: int,
-                      metrics_accum: dict):
+                      metrics_accum: dict, start: int = 0, on_batch=None, mapped: bool = False):
     _ensure_sqlite_keys_line(sqlite_path, channel_keys, dtype)
     sm = StorageManager(channel_key=channel_keys, filepath=sqlite_path, overwrite=False)
-    acc = {k: [] for k in channel_keys}
     frames = 0; bytes_read = 0; batches = 0
-    with open(path, 'rb') as fh:
-        ver, hdr, ver_b, len_b, payload = _read_header(fh)
-        while True:
-            rec = fh.read(REC_HEADER_SZ)
-            if not rec: break
-            ts_ns, wi = struct.unpack('<QQ', rec)
-            raw = fh.read(S * C * dtype.itemsize)
-            if len(raw) < S * C * dtype.itemsize:
-                break
-            arr = np.frombuffer(raw, dtype=dtype, count=C*S).reshape(C, S)
+    # records stop at the footer (version 2) or at a preallocated tail. Only claimed segments are mapped:
+    # the writer reuses (truncates) A/B files, and a mapped page of a truncated file is a SIGBUS
+    with ScbinReader(path, mapped=mapped) as reader:
+        hdr = reader.header
+        spread = {} if hdr.get('ts_model') == 'device_clock' else None
+        for chunk in reader.iter_chunks(batch_frames, start=start):
+            payload = chunk['payload']                      # (k, C, S)
             for ci, key in enumerate(channel_keys):
-                acc[key].append(arr[ci])
-            frames += 1
-            bytes_read += REC_HEADER_SZ + len(raw)
-            if sum(len(v) for v in acc.values()) >= batch_frames:
-                for key in channel_keys:
-                    if acc[key]:
-                        block = np.concatenate(acc[key], axis=0)
-                        sm.append_serial_channel(key, block)
-                        acc[key].clear()
-                batches += 1
-    for key in channel_keys:
-        if acc[key]:
-            block = np.concatenate(acc[key], axis=0)
-            sm.append_serial_channel(key, block)
-            acc[key].clear()
+                sm.append_serial_channel(key, payload[:, ci, :].reshape(-1))
+            _append_time(sm, chunk['ts_ns'], repeat=S, spread=spread)
+            frames += len(chunk)
+            bytes_read += chunk.nbytes
+            batches += 1
+            del payload, chunk
+            if on_batch is not None:
+                on_batch(start + frames)
     metrics_accum["frames_ingested"] = metrics_accum.get("frames_ingested", 0) + frames
     metrics_accum["bytes_read"] = metrics_accum.get("bytes_read", 0) + bytes_read
     metrics_accum["batches_flushed"] = metrics_accum.get("batches_flushed", 0) + batches
-    return ver_b, len_b, payload
+    return hdr
 
 def _ingest_file_image(path: str, sqlite_path: str, shape: Tuple[int,int,int],
-                       batch_frames: int, dtype: np.dtype, metrics_accum: dict):
-    H, W, Cimg = shape
-    frame_items = H * W * Cimg
+                       batch_frames: int, dtype: np.dtype, metrics_accum: dict,
+                       start: int = 0, on_batch=None, mapped: bool = False):
     _ensure_sqlite_keys_image(sqlite_path, shape, dtype)
     sm = StorageManager(channel_key=['image'], filepath=sqlite_path, overwrite=False)
-    acc = []
     frames = 0; bytes_read = 0; batches = 0
-    with open(path, 'rb') as fh:
-        ver, hdr, ver_b, len_b, payload = _read_header(fh)
-        while True:
-            rec = fh.read(REC_HEADER_SZ)
-            if not rec: break
-            ts_ns, wi = struct.unpack('<QQ', rec)
-            raw = fh.read(frame_items * dtype.itemsize)
-            if len(raw) < frame_items * dtype.itemsize:
-                break
-            arr = np.frombuffer(raw, dtype=dtype, count=frame_items)  # flat
-            acc.append(arr)
-            frames += 1
-            bytes_read += REC_HEADER_SZ + len(raw)
-            if len(acc) >= batch_frames:
-                block = np.concatenate(acc, axis=0)
-                sm.append_serial_channel('image', block)
-                acc.clear()
-                batches += 1
-    if acc:
-        block = np.concatenate(acc, axis=0)
-        sm.append_serial_channel('image', block)
-        acc.clear()
+    with ScbinReader(path, mapped=mapped) as reader:
+        hdr = reader.header
+        for chunk in reader.iter_chunks(batch_frames, start=start):
+            sm.append_serial_channel('image', chunk['payload'].reshape(-1))  # flat frames
+            _append_time(sm, chunk['ts_ns'])
+            frames += len(chunk)
+            bytes_read += chunk.nbytes
+            batches += 1
+            del chunk
+            if on_batch is not None:
+                on_batch(start + frames)
     metrics_accum["frames_ingested"] = metrics_accum.get("frames_ingested", 0) + frames
     metrics_accum["bytes_read"] = metrics_accum.get("bytes_read", 0) + bytes_read
     metrics_accum["batches_flushed"] = metrics_accum.get("batches_flushed", 0) + batches
-    return ver_b, len_b, payload
+    return hdr
 
 def ingest_loop(file_a: str, file_b: str, sqlite_path: str, channel_keys: List[str],
                 batch_frames: int = 32, sleep_s: float = 0.2,
@@ -116,7 +119,20 @@ def ingest_loop(file_a: str, file_b: str, sqlite_path: str, channel_keys: List[s
                 data_mode_hint: Optional[str] = None,
                 frame_shape_hint: Optional[Tuple[int, ...]] = None,
                 dtype_hint: Optional[str] = None,
-                precreate_sqlite: bool = True):
+                precreate_sqlite: bool = True,
+                segment_dir: Optional[str] = None,
+                spill_dir: Optional[str] = None):
+    """
+    Ingest sealed stream files into the sqlite store until the process is stopped
+      A/B files are truncated back to their header after ingest. With segment_dir, sealed numbered
+      segments (including any spilled to spill_dir) are claimed and ingested oldest first, then deleted.
+      Progress is recorded in the claim marker, so a segment left claimed by a crash is resumed after
+      the last flushed batch; a segment that fails to ingest is renamed to <segment>.bad.
+    :param segment_dir: segment directory of a writer in segment mode; file_a and file_b are then unused
+    :param spill_dir: spill directory of that writer (default <segment_dir>/spill)
+    """
+    if segment_dir is not None and spill_dir is None:
+        spill_dir = os.path.join(segment_dir, "spill")
 
     try:
         # initialize metrics immediately
@@ -129,7 +145,11 @@ def ingest_loop(file_a: str, file_b: str, sqlite_path: str, channel_keys: List[s
                 "ingest_fps_estimate": 0.0,
                 "ingest_updated_unix": time.time(),
                 "ingest_alive": True,
-                "ingest_watch_paths": [os.path.abspath(file_a), os.path.abspath(file_b)],
+                "ingest_watch_paths": ([os.path.abspath(file_a), os.path.abspath(file_b)] if segment_dir is None
+                                       else [os.path.abspath(segment_dir), os.path.abspath(spill_dir)]),
+                "ingest_backlog_depth": 0,
+                "ingest_segments_resumed": 0,
+                "ingest_segments_quarantined": 0,
                 "ingest_sqlite_path": os.path.abspath(sqlite_path),
                 "ingest_started": True,
             })
@@ -190,6 +210,106 @@ def ingest_loop(file_a: str, file_b: str, sqlite_path: str, channel_keys: List[s
                 last_frames_total = frames_total
                 last_t = now
 
+        def _ingest_path(path: str, start: int = 0, on_batch=None, mapped: bool = False):
+            """
+            Ingest one sealed file; returns its header fields, or None when it was skipped
+            :param start: first record to ingest (records before it were ingested by an earlier run)
+            :param on_batch: called with the number of records done after each flushed batch
+            :param mapped: mmap the file; only for claimed segments, which the writer never truncates
+            """
+            with open(path, 'rb') as fh:
+                try:
+                    ver, hdr, ver_b, len_b, payload = _read_header(fh)
+                    if metrics_proxy is not None:
+                        metrics_proxy.update({
+                            "ingest_last_header": {
+                                "path": os.path.abspath(path),
+                                "data_mode": hdr.get('data_mode', 'line'),
+                                "frame_shape": tuple(hdr.get('frame_shape', [])),
+                                "dtype": hdr.get('dtype'),
+                            }
+                        })
+                except ValueError as e:
+                    if metrics_proxy is not None:
+                        metrics_proxy.update({
+                            "ingest_last_error": f"HeaderError on {os.path.abspath(path)}: {e}",
+                        })
+                    return None
+            dtype = np.dtype(hdr['dtype'])
+            shape = tuple(hdr['frame_shape'])
+            mode = hdr.get('data_mode', 'line')
+
+            delta = {"frames_ingested": 0, "bytes_read": 0, "batches_flushed": 0}
+            if mode == 'line':
+                _, S, C = shape
+                _ = _ingest_file_line(path, sqlite_path, channel_keys, batch_frames, dtype, C, S, delta,
+                                      start=start, on_batch=on_batch, mapped=mapped)
+            elif mode == 'image':
+                H, W, Cimg = shape
+                _ = _ingest_file_image(path, sqlite_path, (H, W, Cimg), batch_frames, dtype, delta,
+                                       start=start, on_batch=on_batch, mapped=mapped)
+            else:
+                if metrics_proxy is not None:
+                    metrics_proxy.update({
+                        "ingest_last_error": f"HeaderError on {os.path.abspath(path)}: unknown data_mode {mode!r}",
+                    })
+                return None
+
+            if metrics_proxy is not None:
+                metrics_proxy.update({
+                    "ingest_bins_ingested": int(metrics_proxy["ingest_bins_ingested"]) + 1,
+                    "ingest_frames_ingested": int(metrics_proxy["ingest_frames_ingested"]) + int(delta["frames_ingested"]),
+                    "ingest_bytes_read": int(metrics_proxy["ingest_bytes_read"]) + int(delta["bytes_read"]),
+                    "ingest_batches_flushed": int(metrics_proxy["ingest_batches_flushed"]) + int(delta["batches_flushed"]),
+                })
+                _metrics_flush(force=True)
+            return ver_b, len_b, payload
+
+        def _ingest_segment(path: str, start: int = 0):
+            """ Ingest one claimed segment and delete it; a segment that cannot be ingested is
+            quarantined as <path>.bad so it neither stops ingest nor loses its data """
+            try:
+                ok = _ingest_path(path, start, on_batch=lambda done: record_progress(path, done),
+                                  mapped=True) is not None
+                error = tb = None
+            except Exception as e:
+                ok, error = False, f"{e.__class__.__name__} on {os.path.abspath(path)}: {e}"
+                tb = ''.join(traceback.format_exc())[-2000:]
+            if ok:
+                release_segment(path)
+                return
+            bad = quarantine_segment(path)
+            if metrics_proxy is not None:
+                update = {"ingest_segments_quarantined": int(metrics_proxy.get("ingest_segments_quarantined", 0)) + 1,
+                          "ingest_last_quarantined": os.path.abspath(bad)}
+                if error is not None:
+                    update.update({"ingest_last_error": error, "ingest_last_traceback": tb})
+                metrics_proxy.update(update)
+
+        if segment_dir is not None:
+            # a segment claimed by an earlier run was interrupted; resume it after the frames it recorded
+            for _, path in list_segments(segment_dir, spill_dir, state='claimed'):
+                done = claim_progress(path)
+                if metrics_proxy is not None:
+                    metrics_proxy.update({
+                        "ingest_segments_resumed": int(metrics_proxy.get("ingest_segments_resumed", 0)) + 1,
+                        "ingest_last_resumed": {"path": os.path.abspath(path), "frames_done": done},
+                    })
+                _ingest_segment(path, done)
+            while True:
+                backlog = list_segments(segment_dir, spill_dir, state='sealed')
+                if metrics_proxy is not None:
+                    metrics_proxy.update({"ingest_backlog_depth": len(backlog),
+                                          "ingest_updated_unix": time.time(), "ingest_alive": True})
+                if not backlog:
+                    time.sleep(sleep_s)
+                    _metrics_flush(force=False)
+                    continue
+                _, path = backlog[0]
+                if claim_segment(path):
+                    _ingest_segment(path)
+                _metrics_flush(force=False)
+
         files = [file_a, file_b]
         while True:
             did_work = False
@@ -199,46 +319,10 @@ def ingest_loop(file_a: str, file_b: str, sqlite_path: str, channel_keys: List[s
             for path in files:
                 seal = _seal_path(path)
                 if os.path.exists(seal):
-                    with open(path, 'rb') as fh:
-                        try:
-                            ver, hdr, ver_b, len_b, payload = _read_header(fh)
-                            if metrics_proxy is not None:
-                                metrics_proxy.update({
-                                    "ingest_last_header": {
-                                        "path": os.path.abspath(path),
-                                        "data_mode": hdr.get('data_mode', 'line'),
-                                        "frame_shape": tuple(hdr.get('frame_shape', [])),
-                                        "dtype": hdr.get('dtype'),
-                                    }
-                                })
-                        except ValueError as e:
-                            if metrics_proxy is not None:
-                                metrics_proxy.update({
-                                    "ingest_last_error": f"HeaderError on {os.path.abspath(path)}: {e}",
-                                })
-                            continue
-                    dtype = np.dtype(hdr['dtype'])
-                    shape = tuple(hdr['frame_shape'])
-                    mode = hdr.get('data_mode', 'line')
-
-                    delta = {"frames_ingested": 0, "bytes_read": 0, "batches_flushed": 0}
-                    if mode == 'line':
-                        N, _, C = shape
-                        _ = _ingest_file_line(path, sqlite_path, channel_keys, batch_frames, dtype, N, C, delta)
-                    elif mode == 'image':
-                        H, W, Cimg = shape
-                        _ = _ingest_file_image(path, sqlite_path, (H, W, Cimg), batch_frames, dtype, delta)
-                    else:
+                    ingested = _ingest_path(path)
+                    if ingested is None:
                         continue
-
-                    if metrics_proxy is not None:
-                        metrics_proxy.update({
-                            "ingest_bins_ingested": int(metrics_proxy["ingest_bins_ingested"]) + 1,
-                            "ingest_frames_ingested": int(metrics_proxy["ingest_frames_ingested"]) + int(delta["frames_ingested"]),
-                            "ingest_bytes_read": int(metrics_proxy["ingest_bytes_read"]) + int(delta["bytes_read"]),
-                            "ingest_batches_flushed": int(metrics_proxy["ingest_batches_flushed"]) + int(delta["batches_flushed"]),
-                        })
-                        _metrics_flush(force=True)
+                    ver_b, len_b, payload = ingested
 
                     # truncate back to header
                     try: os.remove(seal)
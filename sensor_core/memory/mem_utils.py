@@ -1,3 +1,6 @@
+import os
+import re
+import itertools
 import numpy as np
 from typing import Tuple, Optional
 try:
@@ -5,6 +8,26 @@ try:
 except Exception as e:
     RingBuffer = None  # will raise when used
 
+_ring_ids = itertools.count()
+
+def make_ring_name(name: str = "sensor") -> str:
+    """
+    Build a shared memory name that is unique per host process and per ring
+      Kept short because macOS limits POSIX shm names to 31 characters.
+    :param name: human readable sensor name, used as a (truncated) hint
+    """
+    hint = re.sub(r"[^A-Za-z0-9]", "", str(name))[:8] or "ring"
+    return f"/sc{os.getpid()}_{next(_ring_ids)}_{hint}"
+
+def ring_capacity_for_rate(frame_rate_hz: float, seconds: float = 2.0, minimum: int = 64) -> int:
+    """
+    Size a ring to hold a given span of frames at the stream's data rate
+    :param frame_rate_hz: frames published per second
+    :param seconds: how much history the ring should hold
+    :param minimum: lower bound on the returned capacity
+    """
+    return max(int(minimum), int(np.ceil(float(frame_rate_hz) * float(seconds))))
+
 def _normalize_image_shape(shape):
     """
     Normalize image shape for C frames
@@ -31,6 +54,23 @@ def _assert_ring_layout(ring: RingBuffer, logical_shape: Tuple[int, ...], dtype)
     if ring.logical_shape != tuple(logical_shape):
         raise ValueError(f"Ring logical shape mismatch: ring={ring.logical_shape}, expected={logical_shape}")
 
+def logical_frame_shape(ser_channel_key, data_mode: str = "line", frame_shape=None) -> Tuple[int, ...]:
+    """
+    Logical frame shape of a stream: (num_points, window size, channels) for line or (H, W, C) for image data
+    :param ser_channel_key: serial channel key names (line data takes its channel count from them)
+    :param data_mode: line or image data
+    :param frame_shape: input shape of each frame
+    """
+    if frame_shape is None:
+        raise ValueError("frame_shape is required")
+    if data_mode.lower() == "line":
+        return (
+            int(frame_shape[0]), # number of points,
+            int(frame_shape[1]), # window size (number of frames)
+            len(ser_channel_key) # number of serial channels
+        )
+    return _normalize_image_shape(tuple(frame_shape))
+
 def initialize_ring(ser_channel_key, dtype, shm_name="/sensor_ring",
                     frames_capacity=4096, data_mode="line", frame_shape=None):
     """
@@ -43,16 +83,6 @@ def initialize_ring(ser_channel_key, dtype, shm_name="/sensor_ring",
     :param data_mode: allow for line or image data
     :param frame_shape: input shape of each frame
     """
-    if frame_shape is None:
-        raise ValueError("frame_shape is required")
-    if data_mode.lower() == "line":
-        logical = (
-            int(frame_shape[0]), # number of points,
-            int(frame_shape[1]), # window size (number of frames)
-            len(ser_channel_key) # number of serial channels
-        )
-    else:
-        logical = _normalize_image_shape(tuple(frame_shape))
-
+    logical = logical_frame_shape(ser_channel_key, data_mode, frame_shape)
     ring = RingBuffer(shm_name, int(frames_capacity), tuple(logical), data_mode, np.dtype(dtype), create=True)
     return ring, logical
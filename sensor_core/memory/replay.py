@@ -0,0 +1,177 @@
+import os, time, traceback
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy as np
+from sqlitedict import SqliteDict
+from .ring_adapter import RingBuffer
+from .scbin import ScbinReader
+
+
+def load_scbin(path: str):
+    """ Read the records of one SCBIN segment into memory
+      Copied rather than mapped: replay sources may be live A/B files that the writer truncates on
+      rotation, which would fault on a mapping.
+    :param path: .bin segment written by BinaryStreamWriter
+    :return: (header dict, structured array with fields ts_ns, write_idx, payload of the slot shape)
+    """
+    with ScbinReader(path, mapped=False) as reader:
+        return reader.header, reader.records
+
+
+def load_sqlite_frames(sqlite_path: str, channel_keys: Sequence[str], frame_shape: Tuple[int, ...],
+                       data_mode: str = 'line', dtype=np.float32):
+    """ Rebuild ring frames from the sqlite store written by the ingester
+    :param sqlite_path: .sqlite3 file
+    :param channel_keys: channel keys in ring channel order (line mode)
+    :param frame_shape: logical frame shape, (N, S, C) for line or (H, W, C) for image data
+    :param data_mode: line or image data
+    :param dtype: frame dtype
+    :return: (frames as (F, C, S) or (F, H, W, C), per-frame wall ts_ns or None when 'time' is missing)
+    """
+    with SqliteDict(sqlite_path, flag='r') as db:
+        t = np.asarray(db['time'], dtype=np.float64) if 'time' in db else None
+        if data_mode == 'line':
+            S = int(frame_shape[1])
+            chans = [np.asarray(db[k], dtype=dtype) for k in channel_keys]
+            F = min(c.size for c in chans) // S
+            frames = np.stack([c[:F * S].reshape(F, S) for c in chans], axis=1)
+            ts = t[::S][:F] if t is not None and t.size >= F * S else None
+        else:
+            H, W, C = (int(x) for x in frame_shape)
+            img = np.asarray(db['image'], dtype=dtype)
+            F = img.size // (H * W * C)
+            frames = img[:F * H * W * C].reshape(F, H, W, C)
+            ts = t[:F] if t is not None and t.size >= F else None
+    if ts is not None:
+        ts = (ts * 1e9).astype(np.uint64)
+    return frames, ts
+
+
+class RingReplayer:
+    def __init__(self, ring: RingBuffer, speed: Optional[float] = 1.0, batch_frames: int = 256,
+                 metrics_proxy: Optional[dict] = None):
+        """
+        Publishes recorded frames into a live ring at their original pace, N times faster, or flat out
+          Frames that are due go in with one publish_many per batch. Pacing follows the recorded
+          producer timestamps and carries across segments, so A/B files replay as one stream.
+        :param ring: destination ring (created by the owner)
+        :param speed: 1.0 original timing, N times faster, None or 0 as fast as possible
+        :param batch_frames: most frames per publish
+        :param metrics_proxy: optional proxy receiving replay counters (~2 Hz)
+        """
+        self.ring = ring
+        self._metrics = metrics_proxy
+        self._last_push = 0.0
+        self.speed = float(speed) if speed else None
+        self.batch_frames = max(1, int(batch_frames))
+        self.frames_published = 0
+        self.batches = 0
+        self.late_ms = 0.0  # how far behind schedule the last batch went out
+        self._ts0 = None
+        self._t0 = None
+
+    def restart_clock(self):
+        self._ts0 = self._t0 = None
+
+    def play(self, frames: np.ndarray, ts_ns: Optional[np.ndarray] = None, stop_event=None) -> int:
+        """
+        Publish frames (slot layout, (F, C, S) or (F, H, W, C)) paced by ts_ns
+        :param frames: recorded frames
+        :param ts_ns: per-frame recorded timestamps; without them frames go out as fast as possible
+        :param stop_event: optional event that ends playback early
+        :return: number of frames published
+        """
+        n = len(frames)
+        timed = self.speed is not None and ts_ns is not None and n > 0
+        if timed and self._ts0 is None:
+            self._ts0, self._t0 = int(ts_ns[0]), time.perf_counter()
+        rel = (np.asarray(ts_ns, dtype=np.int64) - self._ts0) / 1e9 / self.speed if timed else None
+
+        sent = 0
+        while sent < n:
+            if stop_event is not None and stop_event.is_set():
+                break
+            end = min(n, sent + self.batch_frames)
+            if timed:
+                elapsed = time.perf_counter() - self._t0
+                due = int(np.searchsorted(rel, elapsed, side='right'))
+                if due <= sent:
+                    time.sleep(min(rel[sent] - elapsed, 0.05))
+                    continue
+                end = min(end, due)
+                self.late_ms = max(0.0, float(elapsed - rel[end - 1]) * 1000.0)
+            self.ring.publish_many(frames[sent:end])
+            self.frames_published += end - sent
+            self.batches += 1
+            sent = end
+            if self._metrics is not None and time.perf_counter() - self._last_push > 0.5:
+                self._metrics.update(self.snapshot())
+                self._last_push = time.perf_counter()
+        return sent
+
+    def play_scbin(self, paths: Sequence[str], stop_event=None) -> int:
+        """ Replay SCBIN segments in recorded order (sorted by their first timestamp) """
+        segs = []
+        for p in paths:
+            try:
+                hdr, recs = load_scbin(p)
+            except FileNotFoundError:
+                continue  # e.g. a segment ingest claimed and deleted since it was listed
+            if len(recs):
+                segs.append((int(recs['ts_ns'][0]), recs))
+        total = 0
+        for _, recs in sorted(segs, key=lambda s: s[0]):
+            total += self.play(recs['payload'], recs['ts_ns'], stop_event=stop_event)
+        return total
+
+    def snapshot(self) -> dict:
+        return {
+            "replay_frames": int(self.frames_published),
+            "replay_batches": int(self.batches),
+            "replay_late_ms": round(self.late_ms, 3),
+            "replay_speed": self.speed if self.speed is not None else "max",
+        }
+
+
+def replay_loop(shm_name: str, capacity_frames: int, frame_shape: Tuple[int, ...], dtype,
+                sources: Union[str, List[str]], data_mode: str = 'line', speed: Optional[float] = 1.0,
+                batch_frames: int = 256, loop: bool = False, channel_keys: Optional[List[str]] = None,
+                metrics_proxy: Optional[dict] = None, stop_event=None):
+    """
+    Replay producer process: feeds recorded SCBIN segments or a sqlite store into the ring
+    :param shm_name: ring name
+    :param capacity_frames: ring capacity
+    :param frame_shape: logical frame shape
+    :param dtype: frame dtype
+    :param sources: list of .bin segments, or one .sqlite3 path
+    :param data_mode: line or image data
+    :param speed: 1.0 original timing, N times faster, None or 0 as fast as possible
+    :param batch_frames: most frames per publish
+    :param loop: start over when the recording ends
+    :param channel_keys: channel keys in ring order (sqlite sources, line mode)
+    :param metrics_proxy: optional proxy receiving replay counters
+    :param stop_event: optional event that ends the replay
+    """
+    ring = RingBuffer(shm_name, int(capacity_frames), tuple(frame_shape), data_mode, np.dtype(dtype), create=False)
+    player = RingReplayer(ring, speed=speed, batch_frames=batch_frames, metrics_proxy=metrics_proxy)
+    if isinstance(sources, str):
+        sources = [sources]
+    sqlite_src = [s for s in sources if str(s).endswith('.sqlite3')]
+
+    frames = ts = None
+    if sqlite_src:
+        frames, ts = load_sqlite_frames(sqlite_src[0], channel_keys or [], frame_shape, data_mode, dtype)
+
+    try:
+        while True:
+            if frames is not None:
+                player.play(frames, ts, stop_event=stop_event)
+            else:
+                player.play_scbin(sources, stop_event=stop_event)
+            if not loop or (stop_event is not None and stop_event.is_set()):
+                break
+            player.restart_clock()
+    except Exception:
+        traceback.print_exc()
+    finally:
+        if metrics_proxy is not None:
+            metrics_proxy.update(dict(player.snapshot(), replay_done=True))
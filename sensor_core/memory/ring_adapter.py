@@ -1,10 +1,13 @@
 import numpy as np
 import fastring
 
+# Per-slot producer timestamps as stored next to each ring slot (nanoseconds)
+STAMP_DTYPE = np.dtype([('mono_ns', '<u8'), ('wall_ns', '<u8')])
+
 class RingBuffer:
     """
     Python adapter for C++ fastring class
-    Internally the native ring is always (C_flat, S_flat) with S_flat=1 for images.
+    Each ring slot holds one frame: a (C, S) block for line data, or an (H, W, C) block for images.
     """
     def __init__(self, 
                  name, 
@@ -23,16 +26,26 @@ class RingBuffer:
             N, S, C = self.logical_shape
             self._N, self._S, self._C = int(N), int(S), int(C)
             self.frame_shape = (int(N), int(S), int(C))
+            self._slot_shape = (self._C, self._S)
         elif (self._mode == "image"):
             H, W, C = self.logical_shape
             self._H, self._W, self._Cimg = int(H), int(W), int(C)
             self._S = self._H * self._W * self._Cimg
             self.frame_shape = (self._H, self._W, self._Cimg)
+            self._slot_shape = (self._H, self._W, self._Cimg)
         else:
             raise ValueError(f"frame_shape must be (N,S,C) or (H,W,C), got {self.logical_shape}")
 
+        slot_items = int(np.prod(self._slot_shape))
         maker = fastring.Ring.create if create else fastring.Ring.open
-        self._ring = maker(self.name, int(self.capacity), int(self._S * self.dtype.itemsize))
+        self._ring = maker(self.name, int(self.capacity), int(slot_items * self.dtype.itemsize))
+        # the native ring may round capacity up so the mirror mapping is page-aligned
+        self.capacity = int(self._ring.capacity)
+        self._reserved = 0  # frames of the open reservation (see reserve/commit)
+
+    def unlink(self):
+        """Remove the ring's shared memory name so it does not outlive the pipeline."""
+        fastring.Ring.unlink(self.name)
 
     @property
     def write_idx(self) -> int:
@@ -42,81 +55,174 @@ class RingBuffer:
     def frame_bytes(self) -> int:
         return int(self._ring.frame_bytes)
 
-    def publish(self, arr):
+    @property
+    def mirrored(self) -> bool:
+        return bool(self._ring.mirrored)
+
+    @property
+    def slot_shape(self) -> tuple:
+        """Shape of one frame as stored in a ring slot: (C,S) for line, (H,W,C) for image."""
+        return self._slot_shape
+
+    def wait_for(self, idx: int, timeout=None) -> int:
+        """
+        Sleep until the producer has published frame idx - 1 (write_idx >= idx)
+        :param idx: write index to wait for
+        :param timeout: seconds to wait at most; None waits indefinitely
+        :return: write_idx when woken; less than idx if the wait timed out
+        """
+        t = -1.0 if timeout is None else max(0.0, float(timeout))
+        return int(self._ring.wait_for(int(idx), t))
+
+    def publish(self, arr, mono_ns=None, wall_ns=None):
         """
         Publish array to ring buffer
-        :param arr: input array to store
+        :param arr: input array to store, a single (S,C) / (H,W,C) frame or an (N, ...) batch
+        :param mono_ns: optional monotonic timestamp(s) per frame; defaults to publish time
+        :param wall_ns: optional wall-clock timestamp(s) per frame; defaults to publish time
         """
         a = np.asarray(arr)
 
         if self._mode == "line":
-            if a.shape == (self._C, self._S):
+            if a.ndim == 3:
+                return self.publish_many(a, mono_ns, wall_ns)
+            if a.shape == (self._S, self._C):
                 a = a.T
-            if a.shape != (self._S, self._C):
+            if a.shape != (self._C, self._S):
                 raise ValueError(f"publish LINE expects (S,C) got {a.shape}")
-            frame = np.ascontiguousarray(a, dtype=self.dtype)
-            self._ring.publish(frame)
-            return
         else:
             # image mode
-            if a.ndim == 3:
-                if a.shape != (self._H, self._W, self._Cimg):
-                    raise ValueError(f"publish Image expects (H,W,C), got {a.shape}")
-                frame = np.ascontiguousarray(a, dtype=self.dtype)
-                self._ring.publish(frame)
-                return
+            if a.ndim == 4:
+                return self.publish_many(a, mono_ns, wall_ns)
+            if a.shape != (self._H, self._W, self._Cimg):
+                raise ValueError(f"publish Image expects (H,W,C) or (N,H,W,C), got {a.shape}")
+        return self.publish_many(a[None],
+                                 None if mono_ns is None else np.atleast_1d(mono_ns),
+                                 None if wall_ns is None else np.atleast_1d(wall_ns))
+
+    def publish_many(self, frames, mono_ns=None, wall_ns=None):
+        """
+        Publish a batch of frames with a single native call
+          The block is copied in at most two pieces (split at the ring end) and
+          write_idx advances once for the whole batch.
+        :param frames: (N,S,C) / (N,C,S) line frames or (N,H,W,C) image frames
+        :param mono_ns: optional (N,) monotonic timestamps; defaults to one stamp taken at publish
+        :param wall_ns: optional (N,) wall-clock timestamps; defaults to one stamp taken at publish
+        :return: write_idx after the batch is published
+        """
+        a = np.asarray(frames)
+
+        if self._mode == "line":
+            if a.ndim != 3:
+                raise ValueError(f"publish_many LINE expects (N,S,C), got {a.shape}")
+            if a.shape[1:] == (self._S, self._C):
+                a = a.transpose(0, 2, 1)
+            if a.shape[1:] != (self._C, self._S):
+                raise ValueError(f"publish_many LINE expects (N,S,C), got {a.shape}")
+        else:
+            if a.ndim != 4 or a.shape[1:] != (self._H, self._W, self._Cimg):
+                raise ValueError(f"publish_many Image expects (N,H,W,C), got {a.shape}")
 
-            if a.ndim == 4 and a.shape[1:] == (self._H, self._W, self._Cimg):
-                a = np.ascontiguousarray(a, dtype=self.dtype)
-                for i in range(a.shape[0]):
-                    self._ring.publish(a[i])
-                return
+        if a.shape[0] == 0:
+            return self.write_idx
+        # the publish takes the reserved slots, so a later commit must not publish them
+        self._reserved = 0
+        block = np.ascontiguousarray(a, dtype=self.dtype)
+        return int(self._ring.publish_many(block, mono_ns, wall_ns))
 
-            raise ValueError(f"publish Image expects (H,W,C) or (N,H,W,C), got {a.shape}")
+    def reserve(self, frames: int = 1):
+        """
+        Return a writable view of the next slots so a producer can fill frames in place
+          Nothing is visible to consumers until commit(). Line slots are (C,S); use
+          view.transpose(0, 2, 1) to write (S,C) samples. On a ring without the mirror
+          mapping a reservation crossing the ring end is cut short at the end. A publish before the
+          commit invalidates the reservation.
+        :param frames: number of frames to reserve (at most capacity)
+        :return: writable (n, C, S) or (n, H, W, C) array over shared memory, n <= frames
+        """
+        mv = self._ring.reserve(int(frames))
+        n = mv.shape[0]
+        self._reserved = int(n)
+        return np.frombuffer(mv, dtype=self.dtype).reshape((n,) + self._slot_shape)
+
+    def commit(self, frames: int = 1, mono_ns=None, wall_ns=None) -> int:
+        """
+        Publish frames written into the last reservation
+        :param frames: number of reserved frames to publish; 0 drops the reservation
+        :param mono_ns: optional (frames,) monotonic timestamps; defaults to commit time
+        :param wall_ns: optional (frames,) wall-clock timestamps; defaults to commit time
+        :return: write_idx after the commit
+        """
+        frames = int(frames)
+        if frames > self._reserved:
+            raise ValueError(f"commit of {frames} frames exceeds the open reservation of {self._reserved} "
+                             "(nothing reserved, or a publish since reserve() took the slots)")
+        self._reserved = 0
+        return int(self._ring.commit(frames, mono_ns, wall_ns))
+
+    def read_window_checked(self, start: int, frames: int, out=None, stamps=None):
+        """
+        Copy consecutive frames starting at start and validate each one against its slot stamp
+          Frames the producer lapped before or during the copy are flagged invalid
+          instead of being returned as good data.
+        :param start: logical start index
+        :param frames: number of frames to read (at most capacity)
+        :param out: optional preallocated array with room for at least `frames` frames
+        :param stamps: optional STAMP_DTYPE array, filled with the timestamps of the frames read
+        :return: (frames array, boolean validity mask, number of overrun or torn frames)
+        """
+        start = int(start)
+        frames = int(frames)
+        if out is None:
+            out = np.empty((frames,) + self._slot_shape, dtype=self.dtype)
+        elif out.shape[0] < frames or out.shape[1:] != self._slot_shape or out.dtype != self.dtype:
+            raise ValueError(f"out must be (>= {frames},) + {self._slot_shape} {self.dtype}, got {out.shape} {out.dtype}")
+        ok = np.empty(frames, dtype=np.uint8)
+        if stamps is not None and (stamps.dtype != STAMP_DTYPE or stamps.shape[0] < frames):
+            raise ValueError(f"stamps must be a STAMP_DTYPE array of at least {frames} entries")
+        lost = int(self._ring.read_window_checked(start, frames, out, ok, stamps))
+        return out[:frames], ok.view(np.bool_), lost
+
+    def read_stamps(self, start: int, frames: int, out=None):
+        """
+        Return the producer timestamps of consecutive frames starting at start
+          Vectorized companion to view_window; fields are mono_ns and wall_ns.
+        :param start: logical start index
+        :param frames: number of frames
+        :param out: optional preallocated STAMP_DTYPE array
+        """
+        frames = int(frames)
+        if out is None:
+            out = np.empty(frames, dtype=STAMP_DTYPE)
+        elif out.dtype != STAMP_DTYPE or out.shape[0] < frames:
+            raise ValueError(f"out must be a STAMP_DTYPE array of at least {frames} entries")
+        self._ring.read_stamps(int(start), frames, out)
+        return out[:frames]
 
     def view_window(self, start: int, frames: int):
         """
         Return a NumPy view of consecutive frames starting at start
-          Falls back to one copy if the underlying memoryview is not C-contiguous.
+          The ring's data region is mapped twice back to back, so any window of up to
+          capacity frames is one zero-copy view. Rings without the mirror (Windows)
+          fall back to one copy when the window wraps.
         :param start: logical start index for view
         :param frames: number of frames to show
         """
         start = int(start)
         frames = int(frames)
+        if frames > self.capacity:
+            raise ValueError(f"window of {frames} frames exceeds ring capacity {self.capacity}")
 
-        def _call_view(start_i, frames_i, dim0=None, dim1=None):
-            try:
-                return self._ring.view_window(start_i, frames_i)
-            except TypeError:
-                if dim0 is None or dim1 is None:
-                    raise
-                return self._ring.view_window(start_i, frames_i, int(dim0), int(dim1))
+        slot = start % self.capacity
+        if self.mirrored or slot + frames <= self.capacity:
+            mv = self._ring.view_window(start, frames)
+            return np.frombuffer(mv, dtype=self.dtype).reshape((frames,) + self._slot_shape)
 
-        if self._mode == "line":
-            N, C = self._N, self._C
-            mv = _call_view(start, frames, C, N)
-            try:
-                arr = np.frombuffer(mv, dtype=self.dtype, count=frames * C * N)
-            except BufferError:
-                arr = np.frombuffer(mv.tobytes(), dtype=self.dtype, count=frames * C * N)
-            return arr.reshape(frames, C, N)
-
-        H, W, Cimg = self._H, self._W, self._Cimg
-        mv = _call_view(start, frames, H, W * Cimg)
-
-        elem_count = frames * H * W * Cimg
-        try:
-            arr = np.frombuffer(mv, dtype=self.dtype, count=elem_count)
-            arr = arr.reshape(frames, H, W, Cimg)
-            return arr
-        except BufferError:
-            arr = np.frombuffer(mv.tobytes(), dtype=self.dtype, count=elem_count)
-            return arr.reshape(frames, H, W, Cimg)
+        first = self.capacity - slot
+        return np.concatenate((self.view_window(start, first),
+                               self.view_window(start + first, frames - first)), axis=0)
 
     def view_window_bytes(self, start: int, frames: int):
         if frames <= 0:
             return memoryview(b"")
-        if self._mode == 'line':
-            return self._ring.view_window(int(start), int(frames), int(self._C), int(self._S))
-        else:
-            return self._ring.view_window(int(start), int(frames), int(self._H), int(self._W * self._Cimg))
\ No newline at end of file
+        return memoryview(self.view_window(start, frames)).cast('B')
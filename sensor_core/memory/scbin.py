@@ -0,0 +1,355 @@
+import os, json, mmap, struct, zlib
+from typing import Iterator, Optional, Tuple
+import numpy as np
+
+# Layout: MAGIC, <H version, <I header length, JSON header, records (<QQ ts_ns, write_idx + payload).
+# Version 2 appends a footer when the file is sealed: the sparse index (INDEX_DTYPE entries, one
+# every index_stride records) followed by the fixed-size trailer, which ends with FOOTER_MAGIC.
+MAGIC = b'SCBIN\x00\x00'
+MAGIC_LEN = len(MAGIC)
+VERSION = 2
+REC_HEADER_SZ = 16
+FOOTER_MAGIC = b'SCBIDX\x00\x00'
+# index offset, frame count, index entries, index stride, crc32 of the records, crc32 of the index, magic
+_TRAILER = struct.Struct('<QQIIII8s')
+INDEX_DTYPE = np.dtype([('write_idx', '<u8'), ('ts_ns', '<u8'), ('offset', '<u8')])
+
+
+def _read_header(fh):
+    magic = fh.read(MAGIC_LEN)
+    if magic != MAGIC:
+        raise ValueError('Invalid stream magic')
+    ver_bytes = fh.read(2);  ver = int.from_bytes(ver_bytes, 'little')
+    len_bytes = fh.read(4);  hdr_len = int.from_bytes(len_bytes, 'little')
+    payload = fh.read(hdr_len)
+    hdr = json.loads(payload.decode('utf-8'))
+    return ver, hdr, ver_bytes, len_bytes, payload
+
+
+def _record_bytes(hdr: dict) -> int:
+    """ Size of one SCBIN record (16-byte ts_ns/write_idx header + frame payload) """
+    return REC_HEADER_SZ + int(np.prod(hdr['frame_shape'][1:] if hdr.get('data_mode', 'line') == 'line'
+                                       else hdr['frame_shape'])) * np.dtype(hdr['dtype']).itemsize
+
+
+def _records_end(ts_ns: np.ndarray) -> int:
+    """
+    Number of records before a preallocated (zero-filled) tail
+      Written records always carry a non-zero wall-clock ts_ns, and the zero tail is contiguous,
+      so a binary search touches only a few pages.
+    """
+    lo, hi = 0, int(ts_ns.shape[0])
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if ts_ns[mid] != 0:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class _RecordField:
+    """
+    One u8 field of every record, read on demand with seek/read rather than a mapping
+      Safe on a file the writer may truncate (a short read ends the records instead of faulting);
+      the binary searches here touch only O(log n) entries.
+    """
+    def __init__(self, fh, data_off: int, rec_bytes: int, n: int, field_off: int):
+        self._fh, self._off, self._rec, self._field = fh, data_off, rec_bytes, field_off
+        self.shape = (int(n),)
+
+    def __getitem__(self, k: int) -> int:
+        self._fh.seek(self._off + int(k) * self._rec + self._field)
+        raw = self._fh.read(8)
+        return int.from_bytes(raw, 'little') if len(raw) == 8 else 0
+
+
+def build_footer(index: np.ndarray, index_offset: int, frame_count: int, index_stride: int,
+                 records_crc32: int) -> bytes:
+    """
+    Footer bytes written after the last record when a file is sealed
+    :param index: INDEX_DTYPE entries for records 0, stride, 2 * stride, ...
+    :param index_offset: file offset of the footer (end of the records)
+    :param frame_count: number of records
+    :param index_stride: records between index entries
+    :param records_crc32: zlib.crc32 of all record bytes
+    """
+    idx = np.ascontiguousarray(index, dtype=INDEX_DTYPE).tobytes()
+    return idx + _TRAILER.pack(int(index_offset), int(frame_count), len(index), int(index_stride),
+                               int(records_crc32) & 0xFFFFFFFF, zlib.crc32(idx), FOOTER_MAGIC)
+
+
+def read_footer(fh) -> Optional[dict]:
+    """
+    Read the footer of a sealed version-2 file
+    :param fh: binary file object (position is not preserved)
+    :return: dict with index (INDEX_DTYPE), index_offset, frame_count, index_stride, records_crc32,
+    or None when the file has no valid footer (version 1, still being written, or torn)
+    """
+    size = os.fstat(fh.fileno()).st_size
+    if size < _TRAILER.size:
+        return None
+    fh.seek(size - _TRAILER.size)
+    index_offset, count, entries, stride, rec_crc, idx_crc, magic = _TRAILER.unpack(fh.read(_TRAILER.size))
+    if magic != FOOTER_MAGIC or index_offset + entries * INDEX_DTYPE.itemsize + _TRAILER.size != size:
+        return None
+    fh.seek(index_offset)
+    raw = fh.read(entries * INDEX_DTYPE.itemsize)
+    if zlib.crc32(raw) != idx_crc:
+        return None
+    return {'index': np.frombuffer(raw, dtype=INDEX_DTYPE), 'index_offset': index_offset,
+            'frame_count': count, 'index_stride': stride, 'records_crc32': rec_crc}
+
+
+def _slot_shape(frame_shape: Tuple[int, ...], data_mode: str) -> Tuple[int, ...]:
+    if data_mode == 'line':
+        _, S, C = frame_shape
+        return (int(C), int(S))
+    return tuple(int(x) for x in frame_shape)
+
+
+def _records_extent(fh) -> Tuple[dict, int, int, Optional[dict]]:
+    """
+    Locate the records of a file of any version
+    :return: (header, offset of the first record, number of records, footer or None)
+    """
+    fh.seek(0)
+    ver, hdr, _, _, _ = _read_header(fh)
+    data_off = fh.tell()
+    rec_bytes = _record_bytes(hdr)
+    footer = read_footer(fh) if ver >= 2 else None
+    if footer is not None:
+        return hdr, data_off, int(footer['frame_count']), footer
+    # version 1, or a file still being written: whole records up to a preallocated or torn tail
+    n = (os.fstat(fh.fileno()).st_size - data_off) // rec_bytes
+    if n:
+        n = _records_end(_RecordField(fh, data_off, rec_bytes, n, 0))
+    return hdr, data_off, n, None
+
+
+def _search(field, value: int, side: str = 'left', index: Optional[np.ndarray] = None,
+            index_field: str = '', stride: int = 1) -> int:
+    """
+    First record whose field is >= value (side='left') or > value (side='right'), in O(log n)
+      With a footer index, the index narrows the search to one stride of records.
+    :param field: ts_ns or write_idx of every record (e.g. a memmap column); only O(log n) entries are read
+    """
+    n = int(field.shape[0])
+    lo, hi = 0, n
+    if index is not None and len(index):
+        j = int(np.searchsorted(index[index_field], value, side=side))
+        lo = max(0, (j - 1) * stride)
+        hi = min(n, j * stride + 1) if j < len(index) else n
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if field[mid] < value or (side == 'right' and field[mid] == value):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class ScbinReader:
+    def __init__(self, path: str, mapped: bool = True):
+        """
+        Reader of one SCBIN file (any version, sealed or still being written)
+          Records are exposed as a NumPy structured array with fields ts_ns (wall-clock ns), write_idx
+          (ring index) and payload, shaped like a ring slot: (C, S) for line data, (H, W, C) for image data.
+          Mapped, the array lies over an mmap of the file and slices, field views and chunks are
+          zero-copy views. Touching a mapped page after the file was truncated kills the process
+          (SIGBUS), so only map files no writer will truncate (sealed segments, offline copies); the
+          A/B stream files are reused by the writer and must be read with mapped=False, which reads
+          chunks into fresh arrays and loads the whole record array only when it is asked for.
+        :param path: .bin file written by BinaryStreamWriter
+        :param mapped: mmap the file (zero-copy) or read it with buffered reads
+        """
+        self.path = path
+        self.mapped = bool(mapped)
+        self._fh = open(path, 'rb')
+        try:
+            self.version = _read_header(self._fh)[0]
+            self.header, self.data_offset, self._n, self.footer = _records_extent(self._fh)
+            self.data_mode = self.header.get('data_mode', 'line')
+            self.frame_shape = tuple(self.header['frame_shape'])
+            self.dtype = np.dtype(self.header['dtype'])
+            self.slot_shape = _slot_shape(self.frame_shape, self.data_mode)
+            self.record_dtype = np.dtype([('ts_ns', '<u8'), ('write_idx', '<u8'),
+                                          ('payload', self.dtype, self.slot_shape)])
+            self._mm, self._records = None, None
+            if self.mapped and self._n:
+                self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+                # frombuffer holds a buffer export on the mapping, so close() cannot unmap pages still in use
+                self._records = np.frombuffer(self._mm, dtype=self.record_dtype, count=self._n,
+                                              offset=self.data_offset)
+        except Exception:
+            self._fh.close()
+            raise
+        if self.mapped:
+            self._fh.close()
+            self._fh = None
+
+    @property
+    def records(self) -> np.ndarray:
+        """ All records; a view of the mapping, or read into memory on first use when not mapped """
+        if self._records is None:
+            self._records = self._read(0, self._n) if self._fh is not None else np.zeros(0, self.record_dtype)
+            self._n = len(self._records)
+        return self._records
+
+    def _read(self, k0: int, k1: int) -> np.ndarray:
+        """ Records k0..k1 read into a new array; cut short at the last whole record of a truncated file """
+        out = np.empty(max(0, k1 - k0), dtype=self.record_dtype)
+        self._fh.seek(self.data_offset + k0 * self.record_dtype.itemsize)
+        got = self._fh.readinto(memoryview(out).cast('B')) or 0
+        return out[:got // self.record_dtype.itemsize]
+
+    def __len__(self) -> int:
+        return int(self._n)
+
+    def __getitem__(self, item):
+        return self.records[item]
+
+    def __iter__(self):
+        return self.iter_chunks()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def ts_ns(self) -> np.ndarray:
+        return self.records['ts_ns']
+
+    @property
+    def write_idx(self) -> np.ndarray:
+        return self.records['write_idx']
+
+    @property
+    def payload(self) -> np.ndarray:
+        return self.records['payload']
+
+    def find_index(self, write_idx: int, side: str = 'left') -> int:
+        """ First record with write_idx >= the target (side='right': > the target), in O(log n) """
+        return self._find('write_idx', write_idx, side)
+
+    def find_time(self, ts_ns: int, side: str = 'left') -> int:
+        """ First record with ts_ns >= the target (side='right': > the target), in O(log n) """
+        return self._find('ts_ns', ts_ns, side)
+
+    def _find(self, key: str, value: int, side: str) -> int:
+        f = self.footer
+        if self._records is not None or self._fh is None:
+            field = self.records[key]
+        else:
+            field = _RecordField(self._fh, self.data_offset, self.record_dtype.itemsize, self._n,
+                                 0 if key == 'ts_ns' else 8)
+        return _search(field, int(value), side=side,
+                       index=f['index'] if f else None, index_field=key,
+                       stride=f['index_stride'] if f else 1)
+
+    def time_range(self, t0_ns: Optional[int] = None, t1_ns: Optional[int] = None) -> np.ndarray:
+        """ Records with t0_ns <= ts_ns < t1_ns (either bound may be None) """
+        k0 = 0 if t0_ns is None else self.find_time(t0_ns)
+        k1 = len(self) if t1_ns is None else self.find_time(t1_ns)
+        return self._slice(k0, max(k0, k1))
+
+    def index_range(self, i0: Optional[int] = None, i1: Optional[int] = None) -> np.ndarray:
+        """ Records with i0 <= write_idx < i1 (either bound may be None) """
+        k0 = 0 if i0 is None else self.find_index(i0)
+        k1 = len(self) if i1 is None else self.find_index(i1)
+        return self._slice(k0, max(k0, k1))
+
+    def _slice(self, k0: int, k1: int) -> np.ndarray:
+        if self._records is not None or self._fh is None:
+            return self.records[k0:k1]
+        return self._read(k0, k1)
+
+    def iter_chunks(self, chunk_frames: int = 4096, start: int = 0,
+                    stop: Optional[int] = None) -> Iterator[np.ndarray]:
+        """
+        Iterate over the records in chunks of up to chunk_frames records (views when mapped)
+        :param start: first record
+        :param stop: end record (exclusive), default all
+        """
+        stop = len(self) if stop is None else min(int(stop), len(self))
+        step = max(1, int(chunk_frames))
+        for k in range(int(start), stop, step):
+            chunk = self._slice(k, min(k + step, stop))
+            if not len(chunk):
+                return  # truncated underneath a buffered read
+            yield chunk
+
+    def verify(self) -> dict:
+        """ Check the records against the footer (see verify_scbin) """
+        return verify_scbin(self.path)
+
+    def close(self):
+        """ Release the file; arrays still referencing a mapping keep it alive until they are dropped """
+        self._records, self._n = None, 0
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # views handed out are still in use; the mapping goes when they do
+            self._mm = None
+
+
+def seek_record(path: str, write_idx: Optional[int] = None, ts_ns: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Find the first record at or after a ring write index or a wall-clock timestamp
+      Uses the footer index when the file has one; version-1 and unsealed files are searched directly.
+    :param path: SCBIN file
+    :param write_idx: ring write index to seek to
+    :param ts_ns: wall-clock ns to seek to (ignored when write_idx is given)
+    :return: (record number, byte offset of that record); the record number equals the record count
+    when every record is before the target
+    """
+    if write_idx is None and ts_ns is None:
+        raise ValueError("seek_record needs write_idx or ts_ns")
+    with ScbinReader(path, mapped=False) as r:
+        k = r.find_index(write_idx) if write_idx is not None else r.find_time(ts_ns)
+        return k, r.data_offset + k * r.record_dtype.itemsize
+
+
+def verify_scbin(path: str) -> dict:
+    """
+    Check a file against its footer: record count, records checksum and index consistency
+    :return: dict with version, frame_count, has_footer, ok and, when not ok, error
+    """
+    with open(path, 'rb') as fh:
+        ver, _, _, _, _ = _read_header(fh)
+        hdr, data_off, n, footer = _records_extent(fh)
+        out = {'version': ver, 'frame_count': n, 'has_footer': footer is not None, 'ok': True}
+        if footer is None:
+            if ver >= 2:
+                out.update(ok=False, error="no footer (file not sealed or truncated)")
+            return out
+        rec_bytes = _record_bytes(hdr)
+        if data_off + n * rec_bytes != footer['index_offset']:
+            out.update(ok=False, error="frame count does not match the footer offset")
+            return out
+        fh.seek(data_off)
+        crc, left = 0, n * rec_bytes
+        while left:
+            chunk = fh.read(min(left, 16 << 20))
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            left -= len(chunk)
+        if left or crc != footer['records_crc32']:
+            out.update(ok=False, error="records checksum mismatch")
+            return out
+        idx = footer['index']
+        stride = footer['index_stride']
+        if n:
+            wi = _RecordField(fh, data_off, rec_bytes, n, 8)
+            k = np.arange(0, n, stride)
+            if (len(idx) != len(k) or np.any(idx['offset'] != data_off + k * rec_bytes)
+                    or any(int(idx['write_idx'][j]) != wi[kk] for j, kk in enumerate(k))):
+                out.update(ok=False, error="index does not match the records")
+    return out
@@ -0,0 +1,141 @@
+import os, re, glob, shutil
+from typing import List, Tuple
+
+BACKLOG_POLICIES = ('block', 'drop-oldest', 'spill')
+
+_SEGMENT_RE = re.compile(r'^seg_(\d+)\.bin$')
+SEAL_SUFFIX = ".seal"
+CLAIM_SUFFIX = ".ingest"
+BAD_SUFFIX = ".bad"
+
+
+def segment_path(segment_dir: str, number: int) -> str:
+    """ Path of segment `number` in segment_dir (numbers sort in write order) """
+    return os.path.join(segment_dir, f"seg_{int(number):08d}.bin")
+
+
+def segment_number(path: str):
+    """ Sequence number of a segment path, or None when it is not a segment """
+    m = _SEGMENT_RE.match(os.path.basename(path))
+    return int(m.group(1)) if m else None
+
+
+def list_segments(*dirs: str, state: str = 'sealed') -> List[Tuple[int, str]]:
+    """
+    Segments in one or more directories, oldest first
+    :param dirs: segment directory and optionally its spill directory (None entries are skipped)
+    :param state: 'sealed' (complete, waiting for ingest), 'claimed' (being ingested), 'backlog' (either)
+    or 'all' (including the active segment)
+    :return: list of (number, path)
+    """
+    out = []
+    for d in dirs:
+        if not d:
+            continue
+        for path in glob.glob(os.path.join(d, "seg_*.bin")):
+            n = segment_number(path)
+            if n is None:
+                continue
+            sealed = os.path.exists(path + SEAL_SUFFIX)
+            claimed = os.path.exists(path + CLAIM_SUFFIX)
+            if (state == 'all' or (state == 'sealed' and sealed) or (state == 'claimed' and claimed)
+                    or (state == 'backlog' and (sealed or claimed))):
+                out.append((n, path))
+    out.sort()
+    return out
+
+
+def next_segment_number(*dirs: str) -> int:
+    """ Number after the highest segment in dirs (quarantined ones included), so numbering keeps
+    increasing across restarts """
+    nums = [n for n, _ in list_segments(*dirs, state='all')]
+    for d in dirs:
+        if d:
+            nums += [segment_number(p[:-len(BAD_SUFFIX)])
+                     for p in glob.glob(os.path.join(d, "seg_*.bin" + BAD_SUFFIX))]
+    nums = [n for n in nums if n is not None]
+    return max(nums) + 1 if nums else 0
+
+
+def claim_segment(path: str) -> bool:
+    """
+    Take a sealed segment for ingest by turning its seal into a claim marker
+      Claimed segments are never dropped or spilled by the writer.
+    :return: False when the segment was no longer sealed (dropped, spilled or claimed elsewhere)
+    """
+    try:
+        os.replace(path + SEAL_SUFFIX, path + CLAIM_SUFFIX)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def claim_progress(path: str) -> int:
+    """ Frames of a claimed segment already ingested, as recorded by record_progress (0 when unknown) """
+    try:
+        with open(path + CLAIM_SUFFIX, 'rb') as fh:
+            return int(fh.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def record_progress(path: str, frames: int):
+    """ Record in the claim marker how many frames of a claimed segment are ingested, so a restarted
+    ingest resumes after them instead of appending them again """
+    tmp = path + CLAIM_SUFFIX + ".tmp"
+    with open(tmp, 'wb') as fh:
+        fh.write(str(int(frames)).encode())
+    os.replace(tmp, path + CLAIM_SUFFIX)
+
+
+def quarantine_segment(path: str) -> str:
+    """ Set aside a segment that failed ingest as <path>.bad (never listed or ingested again)
+    :return: the new path
+    """
+    dst = path + BAD_SUFFIX
+    os.replace(path, dst)
+    for marker in (path + CLAIM_SUFFIX, path + SEAL_SUFFIX):
+        try:
+            os.remove(marker)
+        except FileNotFoundError:
+            pass
+    return dst
+
+
+def release_segment(path: str):
+    """ Delete an ingested segment and its claim marker """
+    for p in (path, path + CLAIM_SUFFIX):
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+
+
+def remove_segment(path: str) -> bool:
+    """ Delete a sealed segment (drop-oldest); False when it was claimed or removed meanwhile """
+    try:
+        os.remove(path + SEAL_SUFFIX)
+    except FileNotFoundError:
+        return False
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    return True
+
+
+def spill_segment(path: str, spill_dir: str) -> bool:
+    """ Move a sealed segment into spill_dir (may be another disk), keeping its number and seal
+    :return: False when the segment was claimed or removed meanwhile
+    """
+    os.makedirs(spill_dir, exist_ok=True)
+    dst = os.path.join(spill_dir, os.path.basename(path))
+    try:
+        # take the seal first so ingest cannot claim the segment mid-move
+        os.replace(path + SEAL_SUFFIX, path + ".spilling")
+    except FileNotFoundError:
+        return False
+    shutil.move(path, dst)
+    open(dst + SEAL_SUFFIX, 'wb').close()
+    os.remove(path + ".spilling")
+    return True
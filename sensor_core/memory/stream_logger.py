@@ -1,10 +1,16 @@
-import os, json, struct, time, traceback
+import os, json, struct, time, traceback, threading, queue, zlib
+from collections import deque
 from typing import Tuple, Optional
 import numpy as np
-from .ring_adapter import RingBuffer
+from .ring_adapter import RingBuffer, STAMP_DTYPE
+from .scbin import MAGIC, VERSION, INDEX_DTYPE, _record_bytes, _records_extent, build_footer
+from .segments import (BACKLOG_POLICIES, segment_path, list_segments, next_segment_number,
+                       remove_segment, spill_segment)
 
-MAGIC = b'SCBIN\x00\x00'
-VERSION = 1
+DURABILITY_MODES = ('seal', 'periodic', 'write_behind')
+
+# sync_file_range(2) flags
+_SFR_WAIT_BEFORE, _SFR_WRITE, _SFR_WAIT_AFTER = 1, 2, 4
 
 def _ensure_parent(path: str):
     parent = os.path.dirname(os.path.abspath(path))
@@ -26,14 +32,79 @@ def _contiguous_bytes_view(mv: memoryview) -> memoryview:
         pass
     return memoryview(bytes(mv))
 
+def _load_sync_file_range():
+    """libc sync_file_range (Linux only), or None"""
+    try:
+        import ctypes, ctypes.util
+        fn = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True).sync_file_range
+    except (OSError, AttributeError):
+        return None
+    fn.argtypes = [ctypes.c_int, ctypes.c_int64, ctypes.c_int64, ctypes.c_uint]
+    fn.restype = ctypes.c_int
+    return fn
+
+def _trim_preallocated(path: str) -> Tuple[int, int, int]:
+    """
+    Truncate a file to its whole written records, dropping a preallocated or torn tail and any footer
+    :return: (offset of the first record, number of records, new size)
+    """
+    with open(path, 'r+b') as fh:
+        hdr, data_off, n, _ = _records_extent(fh)
+        end = data_off + n * _record_bytes(hdr)
+        fh.truncate(end)
+    return data_off, n, end
+
+def _index_entries(recs: np.ndarray, r0: int, data_off: int, rec_bytes: int, stride: int) -> np.ndarray:
+    """Footer index entries for the records r0, r0 + 1, ... in recs that fall on a multiple of stride."""
+    sel = np.arange((-r0) % stride, len(recs), stride)
+    entries = np.empty(len(sel), dtype=INDEX_DTYPE)
+    entries['write_idx'] = recs['write_idx'][sel]
+    entries['ts_ns'] = recs['ts_ns'][sel]
+    entries['offset'] = data_off + (r0 + sel) * rec_bytes
+    return entries
+
+def _scan_records(fh, data_off: int, n: int, rec_bytes: int, stride: int):
+    """Checksum and footer index of the n records already in a file."""
+    recs = np.memmap(fh, dtype=[('ts_ns', '<u8'), ('write_idx', '<u8'), ('payload', f'V{rec_bytes - 16}')],
+                     mode='r', offset=data_off, shape=(n,))
+    crc = zlib.crc32(memoryview(recs).cast('B'))
+    index = _index_entries(recs, 0, data_off, rec_bytes, stride)
+    del recs
+    return crc, index
+
+def _seal_recovered(path: str, default_stride: int = 256):
+    """Trim a file left open by an earlier run to its records and append its footer, so it can be sealed."""
+    data_off, n, end = _trim_preallocated(path)
+    with open(path, 'r+b') as fh:
+        hdr, _, _, _ = _records_extent(fh)
+        stride = int(hdr.get('index_stride', default_stride))
+        crc, index = _scan_records(fh, data_off, n, _record_bytes(hdr), stride) if n else (0, np.zeros(0, INDEX_DTYPE))
+        fh.seek(end)
+        fh.write(build_footer(index, end, n, stride, crc))
+        fh.flush()
+        os.fsync(fh.fileno())
+
+def _valid_runs(valid: np.ndarray):
+    """Yield (offset, length, ok) for each run of equal flags in a validity mask."""
+    edges = np.flatnonzero(np.diff(valid.view(np.int8))) + 1
+    bounds = np.concatenate(([0], edges, [len(valid)]))
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        yield int(a), int(b - a), bool(valid[a])
+
 class BinaryStreamWriter:
     def __init__(self, file_a: str, file_b: str, ring_name: str, capacity_frames: int,
                  frame_shape: Tuple[int, ...], dtype, data_mode: str = 'line',
                  rotate_frames: int = 8192, rotate_seconds: Optional[float] = None,
                  overwrite: bool = False, metrics_proxy: Optional[dict] = None,
-                 control_proxy: Optional[dict] = None):
+                 control_proxy: Optional[dict] = None, ts_model: str = 'publish',
+                 segment_dir: Optional[str] = None, max_backlog: int = 8, backlog_policy: str = 'block',
+                 spill_dir: Optional[str] = None, preallocate: bool = True, durability: str = 'seal',
+                 sync_every_mb: float = 8.0, index_stride: int = 256):
         """
         Append-only binary logger to two alternating files with seal markers
+          With segment_dir it writes numbered segments instead (seg_00000000.bin, ...), which ingest
+          consumes oldest first. Files are preallocated and truncated on seal, when a footer with a
+          sparse (write_idx, ts_ns, offset) index and a crc32 of the records is appended (version 2).
         :param file_a: location of .bin file a
         :param file_b: location of .bin file b
         :param ring_name: location of ring buffer
@@ -46,18 +117,56 @@ class BinaryStreamWriter:
         :param overwrite: flag to overwrite existing bin and sqlite file
         :param metrics_proxy: metrics proxy for timing analysis
         :param control_proxy: contains flag to force switch between .bin files
+        :param ts_model: 'publish' (ts_ns is the publish time) or 'device_clock' (ts_ns is the first sample's time)
+        :param segment_dir: directory for numbered segments; None keeps the A/B files
+        :param max_backlog: most sealed segments left waiting for ingest
+        :param backlog_policy: 'block' the rotation, 'drop-oldest' or 'spill' once max_backlog is exceeded
+        :param spill_dir: where 'spill' moves segments (default <segment_dir>/spill)
+        :param preallocate: reserve each file's expected size up front (posix_fallocate)
+        :param durability: fsync only on 'seal', fdatasync 'periodic'ally, or 'write_behind' with sync_file_range
+        :param sync_every_mb: data written between syncs for 'periodic' and 'write_behind'
+        :param index_stride: records between footer index entries
         """
+        if backlog_policy not in BACKLOG_POLICIES:
+            raise ValueError(f"backlog_policy must be one of {BACKLOG_POLICIES}, got {backlog_policy!r}")
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}, got {durability!r}")
         self.files = [file_a, file_b]
+        self.segment_dir = segment_dir
+        self.max_backlog = max(1, int(max_backlog))
+        self.backlog_policy = backlog_policy
+        self.spill_dir = spill_dir or (os.path.join(segment_dir, "spill") if segment_dir else None)
         self.ring_name = ring_name
         self.capacity_frames = int(capacity_frames)
         self.frame_shape = tuple(frame_shape)
         self.dtype = np.dtype(dtype)
         self.data_mode = data_mode
+        self.ts_model = ts_model
         self.rotate_frames = int(rotate_frames)
         self.rotate_seconds = float(rotate_seconds) if rotate_seconds else None
         self._active = 0
         self._frames_written_in_active = 0
         self._fh = None
+        self._rec_buf = None  # reusable SCBIN records (header + payload) for one batch
+        self._rec_bytes = _record_bytes({'frame_shape': self.frame_shape, 'dtype': str(self.dtype),
+                                         'data_mode': data_mode})
+
+        # preallocation and durability
+        self.preallocate = bool(preallocate) and hasattr(os, 'posix_fallocate')
+        self.durability = durability
+        self.sync_bytes = max(1, int(float(sync_every_mb) * (1 << 20)))
+        self._sync_file_range = _load_sync_file_range() if durability == 'write_behind' else None
+        if durability == 'write_behind' and self._sync_file_range is None:
+            self.durability = 'periodic'
+        self._synced_to = 0          # file offset up to which data was last synced or written back
+        self._prev_chunk = None      # (start, end) of the chunk whose writeback is still in flight
+
+        # footer state of the active file
+        self.index_stride = max(1, int(index_stride))
+        self._data_off = 0
+        self._records_in_active = 0
+        self._records_crc = 0
+        self._index = []
 
         # proxies
         self._metrics = metrics_proxy
@@ -67,6 +176,29 @@ class BinaryStreamWriter:
         self._m_total_frames = 0
         self._m_total_bytes = 0
         self._m_rotations = 0
+        self._m_frames_lost = 0
+        self._m_gap_count = 0
+        self._m_gaps = deque(maxlen=32)
+        self._m_latency_ms = deque(maxlen=500)
+
+        # disk-stage counters, set by AsyncStreamWriter when writes run on a background thread
+        self._m_io_buffers = 0
+        self._m_queue_depth = 0
+        self._m_queue_max = 0
+        self._m_stalls = 0
+        self._m_stall_total_ms = 0.0
+        self._m_stall_max_ms = 0.0
+
+        # segment backlog counters
+        self._m_backlog_depth = 0
+        self._m_backlog_max = 0
+        self._m_backlog_blocked_ms = 0.0
+        self._m_segments_dropped = 0
+        self._m_bytes_dropped = 0
+        self._m_segments_spilled = 0
+        self._m_syncs = 0
+        self._m_sync_ms = deque(maxlen=256)
+        self._m_prealloc_error = None
 
         # timers
         self._m_last_flush = time.monotonic()
@@ -74,6 +206,10 @@ class BinaryStreamWriter:
         self._last_rotation_wall = time.time()
         self._last_heartbeat = 0.0
 
+        if segment_dir is not None:
+            self._setup_segments(overwrite)
+            return
+
         # Setup bin files
         _ensure_parent(file_a); _ensure_parent(file_b)
         if overwrite:
@@ -91,17 +227,143 @@ class BinaryStreamWriter:
         if os.path.exists(_seal_path(self.files[self._active])):
             os.remove(_seal_path(self.files[self._active]))
 
-        self._fh = open(self.files[self._active], 'ab')
-        self._frames_written_in_active = 0
+        self._active_path = self.files[self._active]
+        self._open_active(fresh=False)
         self._publish_heartbeat(force=True)
 
-    def _write_header(self, fh):
+    def _setup_segments(self, overwrite: bool):
+        os.makedirs(self.segment_dir, exist_ok=True)
+        if overwrite:
+            for d in (self.segment_dir, self.spill_dir):
+                for _, path in list_segments(d, state='all'):
+                    for f in (path, _seal_path(path)):
+                        try: os.remove(f)
+                        except FileNotFoundError: pass
+        # segments left open by an earlier run hold complete records up to the crash: seal them for ingest
+        backlog = {p for _, p in list_segments(self.segment_dir, state='backlog')}
+        for _, path in list_segments(self.segment_dir, state='all'):
+            if path not in backlog:
+                _seal_recovered(path, self.index_stride)
+                open(_seal_path(path), 'wb').close()
+        self._seq = next_segment_number(self.segment_dir, self.spill_dir)
+        self._open_segment()
+        self._publish_heartbeat(force=True)
+
+    def _open_segment(self):
+        self._active_path = segment_path(self.segment_dir, self._seq)
+        self._open_active(fresh=True)
+
+    def _open_active(self, fresh: bool):
+        """ Open the active file for appending after its last whole record, and preallocate the rest """
+        if fresh:
+            with open(self._active_path, 'wb') as fh:
+                self._write_header(fh, sync=self.durability == 'periodic')
+        data_off, n, end = _trim_preallocated(self._active_path)
+        self._fh = open(self._active_path, 'r+b')
+        self._data_off = data_off
+        self._records_in_active = 0
+        self._records_crc = 0
+        self._index = []
+        if n:
+            self._reindex(n)  # reopened after a crash: rebuild the footer state of what is already there
+        self._fh.seek(end)
+        self._frames_written_in_active = 0
+        self._synced_to = end
+        self._prev_chunk = None
+        if self.preallocate:
+            try:
+                os.posix_fallocate(self._fh.fileno(), end, self.rotate_frames * self._rec_bytes)
+            except OSError as e:
+                # e.g. filesystems without fallocate support; keep appending without it
+                self.preallocate = False
+                self._m_prealloc_error = f"{e.__class__.__name__}: {e}"
+
+    def _reindex(self, n: int):
+        self._records_crc, index = _scan_records(self._fh, self._data_off, n, self._rec_bytes, self.index_stride)
+        self._index = [index]
+        self._records_in_active = n
+
+    def _add_records(self, recs: np.ndarray):
+        """ Fold appended records into the active file's checksum and sparse index """
+        self._records_crc = zlib.crc32(memoryview(recs).cast('B'), self._records_crc)
+        entries = _index_entries(recs, self._records_in_active, self._data_off, self._rec_bytes, self.index_stride)
+        if len(entries):
+            self._index.append(entries)
+        self._records_in_active += len(recs)
+
+    def _seal_active(self):
+        """ Append the footer, truncate the active file to it, make it durable and close it """
+        self._fh.flush()
+        pos = self._fh.tell()
+        index = np.concatenate(self._index) if self._index else np.zeros(0, dtype=INDEX_DTYPE)
+        self._fh.write(build_footer(index, pos, self._records_in_active, self.index_stride, self._records_crc))
+        self._fh.flush()
+        self._fh.truncate(self._fh.tell())
+        os.fsync(self._fh.fileno())
+        self._fh.close()
+
+    def _after_write(self):
+        """ Apply the durability policy after an append """
+        if self.durability == 'seal':
+            return
+        pos = self._fh.tell()
+        if pos - self._synced_to < self.sync_bytes:
+            return
+        t0 = time.perf_counter()
+        self._fh.flush()
+        fd = self._fh.fileno()
+        if self.durability == 'periodic':
+            (os.fdatasync if hasattr(os, 'fdatasync') else os.fsync)(fd)
+        else:
+            # start writeback of the new chunk, then wait for the previous one and drop it from the page cache
+            self._sync_file_range(fd, self._synced_to, pos - self._synced_to, _SFR_WRITE)
+            if self._prev_chunk is not None:
+                a, b = self._prev_chunk
+                self._sync_file_range(fd, a, b - a, _SFR_WAIT_BEFORE | _SFR_WRITE | _SFR_WAIT_AFTER)
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(fd, a, b - a, os.POSIX_FADV_DONTNEED)
+            self._prev_chunk = (self._synced_to, pos)
+        self._synced_to = pos
+        self._m_syncs += 1
+        self._m_sync_ms.append((time.perf_counter() - t0) * 1000.0)
+
+    def _enforce_backlog(self):
+        """ Apply the backlog policy until at most max_backlog sealed segments are waiting """
+        while True:
+            depth = len(list_segments(self.segment_dir, state='backlog'))
+            self._m_backlog_depth = depth
+            self._m_backlog_max = max(self._m_backlog_max, depth)
+            if depth <= self.max_backlog:
+                break
+            # only sealed segments can go; one already claimed by ingest is left alone
+            sealed = list_segments(self.segment_dir, state='sealed')
+            if self.backlog_policy != 'block' and sealed:
+                path = sealed[0][1]
+                if self.backlog_policy == 'drop-oldest':
+                    size = os.path.getsize(path) if os.path.exists(path) else 0
+                    if remove_segment(path):
+                        self._m_segments_dropped += 1
+                        self._m_bytes_dropped += size
+                elif spill_segment(path, self.spill_dir):
+                    self._m_segments_spilled += 1
+                continue
+            t0 = time.perf_counter()
+            time.sleep(0.05)
+            self._m_backlog_blocked_ms += (time.perf_counter() - t0) * 1000.0
+            self._publish_heartbeat(force=False)
+
+    def _write_header(self, fh, sync: bool = True):
         header = {
             'ring_name': self.ring_name,
             'frame_shape': self.frame_shape,
             'dtype': str(self.dtype),
             'data_mode': self.data_mode,
             'version': VERSION,
+            # record ts_ns is the producer's wall clock; add this to monotonic ns to compare
+            'ts_clock': 'wall_ns',
+            'ts_model': self.ts_model,
+            'mono_to_wall_ns': time.time_ns() - time.monotonic_ns(),
+            'index_stride': self.index_stride,
         }
         payload = json.dumps(header).encode('utf-8')
         fh.write(MAGIC)
@@ -109,27 +371,55 @@ class BinaryStreamWriter:
         fh.write(struct.pack('<I', len(payload)))
         fh.write(payload)
         fh.flush()
-        os.fsync(fh.fileno())
+        if sync:
+            os.fsync(fh.fileno())
 
     def _publish_heartbeat(self, force=False):
         if self._metrics is None:
             return
         now = time.time()
         if force or (now - self._last_heartbeat) >= 1.0:
-            seals = [os.path.abspath(self.files[0]) + ".seal", os.path.abspath(self.files[1]) + ".seal"]
-            seal_exists = [os.path.exists(seals[0]), os.path.exists(seals[1])]
-            seal_mtime = [
-                (os.path.getmtime(seals[0]) if seal_exists[0] else None),
-                (os.path.getmtime(seals[1]) if seal_exists[1] else None),
-            ]
+            if self.segment_dir is None:
+                seals = [os.path.abspath(self.files[0]) + ".seal", os.path.abspath(self.files[1]) + ".seal"]
+            else:
+                backlog = list_segments(self.segment_dir, state='backlog')
+                self._m_backlog_depth = len(backlog)
+                seals = [os.path.abspath(p) + ".seal" for _, p in backlog]
+            seal_exists = [os.path.exists(f) for f in seals]
+            seal_mtime = [(os.path.getmtime(f) if e else None) for f, e in zip(seals, seal_exists)]
             dt = max(1e-6, time.monotonic() - self._m_last_flush)
             fps = self._m_frames_since / dt
             self._metrics.update({
-                "writer_active_bin": os.path.abspath(self.files[self._active]),
+                "writer_active_bin": os.path.abspath(self._active_path),
                 "writer_total_frames": int(self._m_total_frames),
                 "writer_total_bytes": int(self._m_total_bytes),
                 "writer_rotations": int(self._m_rotations),
+                "writer_frames_lost": int(self._m_frames_lost),
+                "writer_gap_count": int(self._m_gap_count),
+                "writer_gaps_recent": list(self._m_gaps),
+                "writer_latency_avg_ms": float(np.mean(self._m_latency_ms)) if self._m_latency_ms else 0.0,
+                "writer_latency_p95_ms": float(np.percentile(self._m_latency_ms, 95)) if self._m_latency_ms else 0.0,
                 "writer_fps_estimate": float(fps),
+                "writer_io_buffers": int(self._m_io_buffers),
+                "writer_queue_depth": int(self._m_queue_depth),
+                "writer_queue_max": int(self._m_queue_max),
+                "writer_stall_count": int(self._m_stalls),
+                "writer_stall_total_ms": float(self._m_stall_total_ms),
+                "writer_stall_max_ms": float(self._m_stall_max_ms),
+                "writer_backlog_depth": int(self._m_backlog_depth),
+                "writer_backlog_max": int(self._m_backlog_max),
+                "writer_backlog_limit": int(self.max_backlog) if self.segment_dir else None,
+                "writer_backlog_policy": self.backlog_policy if self.segment_dir else None,
+                "writer_backlog_blocked_ms": float(self._m_backlog_blocked_ms),
+                "writer_segments_dropped": int(self._m_segments_dropped),
+                "writer_bytes_dropped": int(self._m_bytes_dropped),
+                "writer_segments_spilled": int(self._m_segments_spilled),
+                "writer_preallocate": bool(self.preallocate),
+                "writer_prealloc_error": self._m_prealloc_error,
+                "writer_durability": self.durability,
+                "writer_syncs": int(self._m_syncs),
+                "writer_sync_avg_ms": float(np.mean(self._m_sync_ms)) if self._m_sync_ms else 0.0,
+                "writer_sync_max_ms": float(np.max(self._m_sync_ms)) if self._m_sync_ms else 0.0,
                 "writer_last_rotation_unix": self._last_rotation_wall,
                 "writer_updated_unix": now,
                 "writer_alive": True,
@@ -142,14 +432,18 @@ class BinaryStreamWriter:
             self._last_heartbeat = now
 
     def _rotate(self):
-        self._fh.flush(); os.fsync(self._fh.fileno()); self._fh.close()
-        open(_seal_path(self.files[self._active]), 'wb').close()
-        self._active = 1 - self._active
-        try: os.remove(_seal_path(self.files[self._active]))
-        except FileNotFoundError: pass
-        with open(self.files[self._active], 'wb') as fh: self._write_header(fh)
-        self._fh = open(self.files[self._active], 'ab')
-        self._frames_written_in_active = 0
+        self._seal_active()
+        open(_seal_path(self._active_path), 'wb').close()
+        if self.segment_dir is not None:
+            self._seq += 1
+            self._enforce_backlog()
+            self._open_segment()
+        else:
+            self._active = 1 - self._active
+            self._active_path = self.files[self._active]
+            try: os.remove(_seal_path(self._active_path))
+            except FileNotFoundError: pass
+            self._open_active(fresh=True)
         self._m_rotations += 1
         self._last_rotation_wall = time.time()
         self._publish_heartbeat(force=True)
@@ -157,6 +451,8 @@ class BinaryStreamWriter:
     def _maybe_time_rotate(self):
         if self.rotate_seconds is None:
             return
+        if self.segment_dir is not None and self._frames_written_in_active == 0:
+            return  # do not fill the segment directory with empty segments while idle
         if (time.time() - self._last_rotation_wall) >= self.rotate_seconds:
             self._fh.flush()
             self._rotate()
@@ -169,7 +465,45 @@ class BinaryStreamWriter:
             self._fh.flush()
             self._rotate()
 
-    def write_frames(self, buf: memoryview, frame_bytes: int, start_idx: int, nframes: int, ts_ns: int):
+    def note_gap(self, start_idx: int, nframes: int):
+        """
+        Record frames that were lost before reaching disk (ring overrun or torn read)
+          They are not written; the jump in record write_idx marks the gap in the file.
+        :param start_idx: logical ring index of the first lost frame
+        :param nframes: number of consecutive frames lost
+        """
+        if nframes <= 0:
+            return
+        self._m_frames_lost += int(nframes)
+        self._m_gap_count += 1
+        self._m_gaps.append((int(start_idx), int(start_idx) + int(nframes)))
+        self._publish_heartbeat(force=True)
+
+    def note_latency(self, mono_ns: int):
+        """
+        Record end-to-end latency of a frame from producer publish to disk write
+        :param mono_ns: producer monotonic timestamp of the frame
+        """
+        self._m_latency_ms.append((time.monotonic_ns() - int(mono_ns)) / 1e6)
+
+    def _records(self, nframes: int, frame_bytes: int) -> np.ndarray:
+        """Record buffer for nframes SCBIN records (<QQ header + payload), reused across batches."""
+        rec = self._rec_buf
+        if rec is None or rec.dtype['payload'].itemsize != frame_bytes or rec.shape[0] < nframes:
+            dt = np.dtype([('ts_ns', '<u8'), ('write_idx', '<u8'), ('payload', f'V{frame_bytes}')])
+            size = max(nframes, rec.shape[0] if rec is not None and rec.dtype == dt else 0)
+            self._rec_buf = rec = np.empty(size, dtype=dt)
+        return rec[:nframes]
+
+    def write_frames(self, buf: memoryview, frame_bytes: int, start_idx: int, nframes: int, ts_ns):
+        """
+        Append frames as SCBIN records, rotating files as needed
+        :param buf: contiguous bytes of nframes frames
+        :param frame_bytes: bytes per frame
+        :param start_idx: logical ring index of the first frame
+        :param nframes: number of frames in buf
+        :param ts_ns: per-frame timestamps (ns), or a single timestamp for the whole batch
+        """
         if nframes <= 0:
             self._maybe_time_rotate()
             self._maybe_force_rotate()
@@ -177,14 +511,18 @@ class BinaryStreamWriter:
             return
 
         b = _contiguous_bytes_view(memoryview(buf))
+        recs = self._records(nframes, frame_bytes)
+        # build every record of the batch at once: headers and payload interleaved in one buffer
+        recs['ts_ns'] = ts_ns
+        recs['write_idx'] = np.arange(start_idx, start_idx + nframes, dtype=np.uint64)
+        recs['payload'] = np.frombuffer(b, dtype=recs.dtype['payload'], count=nframes)
         remaining = nframes
         idx = 0
         while remaining > 0:
             can_write = min(remaining, max(1, self.rotate_frames - self._frames_written_in_active))
-            for i in range(can_write):
-                off = (idx + i) * frame_bytes
-                self._fh.write(struct.pack('<QQ', ts_ns, (start_idx + idx + i)))
-                self._fh.write(b[off:off+frame_bytes])
+            self._fh.write(memoryview(recs[idx:idx + can_write]).cast('B'))
+            self._add_records(recs[idx:idx + can_write])
+            self._after_write()
             self._frames_written_in_active += can_write
             self._m_total_frames += can_write
             self._m_total_bytes += (can_write * (frame_bytes + 16))
@@ -201,17 +539,189 @@ class BinaryStreamWriter:
         self._maybe_force_rotate()
         self._publish_heartbeat(force=False)
 
+class AsyncStreamWriter:
+    def __init__(self, writer: BinaryStreamWriter, slot_shape: Tuple[int, ...], dtype,
+                 buffers: int = 4, buffer_bytes: int = 16 << 20, idle_timeout: float = 0.25):
+        """
+        Disk stage of the stream writer: a background thread writes, flushes, fsyncs and rotates
+          drain() copies ring windows into buffers from a fixed pool and queues them; the disk thread
+          writes them in order and returns them to the pool. While the disk thread is busy (e.g. in a
+          slow fsync at rotation) the drain keeps filling the current buffer and then the free ones;
+          only when none is free does it block, and that wait is counted as a stall in the writer metrics.
+        :param writer: BinaryStreamWriter, used only from the disk thread once started
+        :param slot_shape: ring slot shape
+        :param dtype: ring dtype
+        :param buffers: number of pooled buffers
+        :param buffer_bytes: total size of the pool, split between the buffers
+        :param idle_timeout: how often an idle disk thread runs time-based rotation, control flags and heartbeats
+        """
+        self.writer = writer
+        self._frame_bytes = int(np.prod(slot_shape)) * np.dtype(dtype).itemsize
+        buffers = max(2, int(buffers))
+        self.chunk_frames = max(1, int(buffer_bytes) // (buffers * max(1, self._frame_bytes)))
+        self._pool = [(np.empty((self.chunk_frames,) + tuple(slot_shape), dtype=dtype),
+                       np.empty(self.chunk_frames, dtype=STAMP_DTYPE),
+                       np.empty(self.chunk_frames, dtype=np.bool_)) for _ in range(buffers)]
+        self._free = queue.Queue()
+        for i in range(buffers):
+            self._free.put(i)
+        self._work = queue.Queue()
+        self._cur = None  # [buffer id, first logical index, frames filled, frames lost]
+        self._idle_timeout = float(idle_timeout)
+        self._error = None
+        self.writer._m_io_buffers = buffers
+        self._thread = threading.Thread(target=self._run, name='stream-disk', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def drain(self, ring: RingBuffer, start: int, nframes: int):
+        """
+        Copy consecutive ring frames into pooled buffers and queue them for the disk thread
+          Frames the producer lapped during the copy are written as gaps.
+        :param ring: source ring
+        :param start: logical index of the first frame
+        :param nframes: number of frames
+        """
+        cap = ring.capacity
+        while nframes > 0:
+            if self._cur is None:
+                self._cur = [self._acquire(), start, 0, 0]
+            i, _, filled, _ = self._cur
+            frames, stamps, valid = self._pool[i]
+            k = min(nframes, self.chunk_frames - filled, cap)
+            _, ok, lost = ring.read_window_checked(start, k, out=frames[filled:], stamps=stamps[filled:])
+            valid[filled:filled + k] = ok
+            self._cur[2] += k
+            self._cur[3] += lost
+            if self._cur[2] == self.chunk_frames:
+                self.flush()
+            start += k
+            nframes -= k
+        if self._free.qsize() == len(self._pool) - 1:
+            self.flush()  # disk thread idle: hand the partial buffer over now rather than wait to fill it
+
+    def gap(self, start: int, nframes: int):
+        """ Queue a gap (frames lost before they could be copied) in stream order """
+        self.flush()
+        self._work.put(('gap', int(start), int(nframes)))
+        self._note_depth()
+
+    def flush(self):
+        """ Queue the partially filled buffer, if any """
+        if self._cur is None or self._cur[2] == 0:
+            return
+        i, start, n, lost = self._cur
+        self._cur = None
+        self._work.put(('frames', i, start, n, lost))
+        self._note_depth()
+
+    def check(self):
+        """ Re-raise a disk-thread failure on the calling (drain) thread """
+        if self._error is not None:
+            raise self._error
+
+    def close(self, timeout: Optional[float] = None):
+        """ Write everything queued, flush the file, and stop the disk thread """
+        self.flush()
+        self._work.put(None)
+        self._thread.join(timeout)
+        self.check()
+
+    def _acquire(self) -> int:
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        t0 = time.perf_counter()
+        while True:
+            self.check()
+            try:
+                i = self._free.get(timeout=0.5)
+                break
+            except queue.Empty:
+                continue
+        ms = (time.perf_counter() - t0) * 1000.0
+        w = self.writer
+        w._m_stalls += 1
+        w._m_stall_total_ms += ms
+        w._m_stall_max_ms = max(w._m_stall_max_ms, ms)
+        return i
+
+    def _note_depth(self):
+        depth = self._work.qsize()
+        w = self.writer
+        w._m_queue_depth = depth
+        w._m_queue_max = max(w._m_queue_max, depth)
+
+    def _run(self):
+        w = self.writer
+        fb = self._frame_bytes
+        try:
+            while True:
+                try:
+                    item = self._work.get(timeout=self._idle_timeout)
+                except queue.Empty:
+                    w.write_frames(memoryview(b""), fb, 0, 0, time.time_ns())
+                    continue
+                if item is None:
+                    w._fh.flush()
+                    return
+                self._note_depth()
+                if item[0] == 'gap':
+                    w.note_gap(item[1], item[2])
+                    continue
+                _, i, start, n, lost = item
+                frames, stamps, valid = self._pool[i]
+                wall = stamps['wall_ns'][:n]
+                if not lost:
+                    w.write_frames(frames[:n], fb, start, n, wall)
+                    w.note_latency(stamps['mono_ns'][n - 1])
+                else:
+                    for off, length, ok in _valid_runs(valid[:n]):
+                        if ok:
+                            w.write_frames(frames[off:off + length], fb, start + off, length,
+                                           wall[off:off + length])
+                            w.note_latency(stamps['mono_ns'][off + length - 1])
+                        else:
+                            w.note_gap(start + off, length)
+                self._free.put(i)
+        except Exception as e:
+            self._error = e
+
+
 def dump_loop(file_a: str, file_b: str, shm_name: str, capacity_frames: int,
               frame_shape: Tuple[int, ...], dtype, data_mode: str = 'line',
-              poll_hz: float = 400.0, overwrite: bool = False, rotate_frames: int = 8192,
+              poll_hz: float = 4.0, overwrite: bool = False, rotate_frames: int = 8192,
               rotate_seconds: Optional[float] = None, metrics_proxy: Optional[dict] = None,
-              control_proxy: Optional[dict] = None):
+              control_proxy: Optional[dict] = None, ts_model: str = 'publish', io_buffers: int = 4,
+              io_buffer_mb: float = 16.0, segment_dir: Optional[str] = None, max_backlog: int = 8,
+              backlog_policy: str = 'block', spill_dir: Optional[str] = None, preallocate: bool = True,
+              durability: str = 'seal', sync_every_mb: float = 8.0, index_stride: int = 256):
+    """
+    Stream the ring to the A/B SCBIN files until the process is stopped
+      This thread drains the ring into pooled buffers; an AsyncStreamWriter thread does the disk I/O,
+      so a slow flush, fsync or rotation does not hold up draining.
+    :param io_buffers: number of buffers between the drain and disk stages
+    :param io_buffer_mb: total size of those buffers; bounds how long a disk stall can be absorbed
+    :param segment_dir: write numbered segments there instead of the A/B files (see BinaryStreamWriter)
+    :param max_backlog: most sealed segments waiting for ingest
+    :param backlog_policy: 'block', 'drop-oldest' or 'spill' once max_backlog is exceeded
+    :param spill_dir: destination of spilled segments
+    :param preallocate: preallocate each file to rotate_frames records, truncating it on seal
+    :param durability: 'seal', 'periodic' or 'write_behind' (see BinaryStreamWriter)
+    :param sync_every_mb: data between syncs for 'periodic' and 'write_behind'
+    :param index_stride: records between entries of the footer index written at seal
+    """
     if metrics_proxy is not None:
         metrics_proxy.update({
             "writer_alive": True,
             "writer_start_unix": time.time(),
-            "writer_watch_bins": [os.path.abspath(file_a), os.path.abspath(file_b)],
-            "writer_watch_seals": [os.path.abspath(file_a) + ".seal", os.path.abspath(file_b) + ".seal"],
+            "writer_watch_bins": ([os.path.abspath(file_a), os.path.abspath(file_b)] if segment_dir is None
+                                  else [os.path.abspath(segment_dir)]),
+            "writer_watch_seals": ([os.path.abspath(file_a) + ".seal", os.path.abspath(file_b) + ".seal"]
+                                   if segment_dir is None else []),
             "writer_ring": {"name": shm_name, "capacity": int(capacity_frames), "shape": tuple(frame_shape), "dtype": str(np.dtype(dtype))},
         })
     try:
@@ -219,41 +729,31 @@ def dump_loop(file_a: str, file_b: str, shm_name: str, capacity_frames: int,
         writer = BinaryStreamWriter(file_a, file_b, shm_name, capacity_frames, frame_shape, dtype,
                                     data_mode=data_mode, rotate_frames=rotate_frames,
                                     rotate_seconds=rotate_seconds, overwrite=overwrite,
-                                    metrics_proxy=metrics_proxy, control_proxy=control_proxy)
+                                    metrics_proxy=metrics_proxy, control_proxy=control_proxy,
+                                    ts_model=ts_model, segment_dir=segment_dir, max_backlog=max_backlog,
+                                    backlog_policy=backlog_policy, spill_dir=spill_dir,
+                                    preallocate=preallocate, durability=durability, sync_every_mb=sync_every_mb,
+                                    index_stride=index_stride)
+        # Block on the ring between batches; poll_hz sets how often the idle disk stage
+        # wakes up for time-based rotation, control flags and heartbeats
+        idle_timeout = 1.0 / poll_hz
+        cap = ring.capacity
+        disk = AsyncStreamWriter(writer, ring.slot_shape, ring.dtype, buffers=io_buffers,
+                                 buffer_bytes=int(io_buffer_mb * (1 << 20)), idle_timeout=idle_timeout).start()
         last_idx = int(ring.write_idx)
-        frame_bytes = ring.frame_bytes
-        period = 1.0 / poll_hz
-        cap = int(capacity_frames)
-
-        def _write_window_wrapped(start: int, n: int, ts_ns: int):
-            if n <= 0:
-                return
-            end = (start + n)
-            if end <= cap:
-                buf = ring.view_window_bytes(start, n)
-                writer.write_frames(buf, frame_bytes, start, n, ts_ns)
-            else:
-                first = cap - start
-                second = end - cap
-                if first > 0:
-                    buf1 = ring.view_window_bytes(start, first)
-                    writer.write_frames(buf1, frame_bytes, start, first, ts_ns)
-                if second > 0:
-                    buf2 = ring.view_window_bytes(0, second)
-                    writer.write_frames(buf2, frame_bytes, 0, second, ts_ns)
 
         while True:
-            wi = int(ring.write_idx)
+            wi = ring.wait_for(last_idx + 1, timeout=idle_timeout)
+            disk.check()
             if wi != last_idx:
-                n = (wi - last_idx) % cap
-                if n > 0:
-                    start = (wi - n) % cap
-                    ts_ns = time.time_ns()
-                    _write_window_wrapped(start, n, ts_ns)
-                    last_idx = wi
+                if wi - last_idx > cap:
+                    # producer lapped the writer; everything older than one ring is gone
+                    disk.gap(last_idx, wi - cap - last_idx)
+                    last_idx = wi - cap
+                disk.drain(ring, last_idx, wi - last_idx)
+                last_idx = wi
             else:
-                writer.write_frames(memoryview(b""), frame_bytes, 0, 0, time.time_ns())
-            time.sleep(period)
+                disk.flush()
     except Exception as e:
         if metrics_proxy is not None:
             metrics_proxy.update({
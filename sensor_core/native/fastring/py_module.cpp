@@ -4,6 +4,29 @@
 #include "ring.hpp"
 namespace py = pybind11;
 
+using u64_array = py::array_t<uint64_t, py::array::c_style | py::array::forcecast>;
+
+// Optional per-frame timestamps passed from Python (None -> stamp with "now")
+static const uint64_t* optional_stamps(const u64_array& a, bool given, size_t nframes) {
+    if (!given)
+        return nullptr;
+    if ((size_t)a.size() != nframes)
+        throw std::runtime_error("timestamp arrays must have one entry per frame");
+    return a.data();
+}
+
+// Writable (N,) buffer of 16-byte (mono_ns, wall_ns) records, or nullptr for None
+static SlotStamp* stamp_buffer(const py::object& o, size_t nframes) {
+    if (o.is_none())
+        return nullptr;
+    py::array a = o.cast<py::array>();
+    if (!(a.flags() & py::array::c_style) || !a.writeable() || a.itemsize() != sizeof(SlotStamp))
+        throw std::runtime_error("timestamp buffer must be a writable C-contiguous array of 16-byte records");
+    if ((size_t)a.size() < nframes)
+        throw std::runtime_error("timestamp buffer too small for requested frames");
+    return static_cast<SlotStamp*>(a.mutable_data());
+}
+
 PYBIND11_MODULE(fastring, m) {
     py::class_<ShmRing>(m, "Ring")
         .def_static("create", [](const std::string& name, size_t cap, size_t fbytes) {
@@ -12,42 +35,104 @@ PYBIND11_MODULE(fastring, m) {
         .def_static("open", [](const std::string& name, size_t cap, size_t fbytes) {
             return ShmRing::open(name.c_str(), cap, fbytes);
         })
+        .def_static("unlink", [](const std::string& name) {
+            ShmRing::unlink(name.c_str());
+        })
         .def_property_readonly("frame_bytes", [](const ShmRing& r){ return r.frame_bytes; })
         .def_property_readonly("capacity", [](const ShmRing& r){ return r.capacity; })
+        .def_property_readonly("mirrored", [](const ShmRing& r){ return r.mirrored; })
         .def_property_readonly("write_idx", [](const ShmRing& r) {
             return (uint64_t) r.hdr->write_idx.load(std::memory_order_acquire);
         })
         .def("publish", [](ShmRing& r, py::array arr) {
-            py::gil_scoped_release release;
             if (!(arr.flags() & py::array::c_style))
                 throw std::runtime_error("array must be C-contiguous");
             size_t nbytes = (size_t)arr.nbytes();
             if (nbytes % r.frame_bytes != 0)
                 throw std::runtime_error("size not multiple of frame_bytes");
-            r.publish(arr.data(), nbytes / r.frame_bytes);
+            const void* src = arr.data();
+            py::gil_scoped_release release;
+            r.publish(src, nbytes / r.frame_bytes);
         })
-        .def("view_frame", [](ShmRing& r, uint64_t logical_idx, py::ssize_t C, py::ssize_t S) {
+        .def("publish_many", [](ShmRing& r, py::array arr, py::object mono_ns, py::object wall_ns) {
+            if (!(arr.flags() & py::array::c_style))
+                throw std::runtime_error("array must be C-contiguous");
+            if (arr.ndim() < 1)
+                throw std::runtime_error("publish_many expects an (N, ...) array");
+            size_t nframes = (size_t)arr.shape(0);
+            if ((size_t)arr.nbytes() != nframes * r.frame_bytes)
+                throw std::runtime_error("each of the N frames must be frame_bytes long");
+            const void* src = arr.data();
+            u64_array mono = mono_ns.is_none() ? u64_array() : u64_array::ensure(mono_ns);
+            u64_array wall = wall_ns.is_none() ? u64_array() : u64_array::ensure(wall_ns);
+            const uint64_t* mono_p = optional_stamps(mono, !mono_ns.is_none(), nframes);
+            const uint64_t* wall_p = optional_stamps(wall, !wall_ns.is_none(), nframes);
+            {
+                py::gil_scoped_release release;
+                r.publish(src, nframes, mono_p, wall_p);
+            }
+            return (uint64_t) r.hdr->write_idx.load(std::memory_order_acquire);
+        }, py::arg("arr"), py::arg("mono_ns") = py::none(), py::arg("wall_ns") = py::none())
+        .def("reserve", [](ShmRing& r, size_t frames) {
+            size_t granted = 0;
+            uint8_t* ptr = r.reserve(frames, granted);
+            std::array<py::ssize_t, 2> shape   { (py::ssize_t)granted, (py::ssize_t)r.frame_bytes };
+            std::array<py::ssize_t, 2> strides { (py::ssize_t)r.frame_bytes, 1 };
+            return py::memoryview::from_buffer(ptr, shape, strides, /*readonly=*/false);
+        }, py::arg("frames") = 1)
+        .def("commit", [](ShmRing& r, size_t frames, py::object mono_ns, py::object wall_ns) {
+            u64_array mono = mono_ns.is_none() ? u64_array() : u64_array::ensure(mono_ns);
+            u64_array wall = wall_ns.is_none() ? u64_array() : u64_array::ensure(wall_ns);
+            const uint64_t* mono_p = optional_stamps(mono, !mono_ns.is_none(), frames);
+            const uint64_t* wall_p = optional_stamps(wall, !wall_ns.is_none(), frames);
+            r.commit(frames, mono_p, wall_p);
+            return (uint64_t) r.hdr->write_idx.load(std::memory_order_acquire);
+        }, py::arg("frames"), py::arg("mono_ns") = py::none(), py::arg("wall_ns") = py::none())
+        .def("read_window_checked", [](const ShmRing& r, uint64_t start, size_t frames,
+                                       py::array out, py::array ok, py::object stamps) {
+            if (!(out.flags() & py::array::c_style) || !out.writeable())
+                throw std::runtime_error("out must be a writable C-contiguous array");
+            if ((size_t)out.nbytes() < frames * r.frame_bytes)
+                throw std::runtime_error("out too small for requested frames");
+            // a plain py::array, not array_t<uint8_t>: force-casting would fill a temporary copy
+            if (!ok.dtype().is(py::dtype::of<uint8_t>()) || !(ok.flags() & py::array::c_style)
+                || !ok.writeable() || (size_t)ok.size() < frames)
+                throw std::runtime_error("ok must be a writable C-contiguous uint8 array of at least `frames` items");
+            uint8_t* dst = static_cast<uint8_t*>(out.mutable_data());
+            uint8_t* flags = static_cast<uint8_t*>(ok.mutable_data());
+            SlotStamp* ts = stamp_buffer(stamps, frames);
+            py::gil_scoped_release release;
+            return r.read_checked(start, frames, dst, flags, ts);
+        }, py::arg("start"), py::arg("frames"), py::arg("out"), py::arg("ok"), py::arg("stamps") = py::none())
+        .def("read_stamps", [](const ShmRing& r, uint64_t start, size_t frames, py::object out) {
+            if (frames > r.capacity)
+                throw std::runtime_error("window larger than ring capacity");
+            SlotStamp* ts = stamp_buffer(out, frames);
+            if (!ts)
+                throw std::runtime_error("out must be a timestamp buffer");
+            py::gil_scoped_release release;
+            r.copy_stamps(start, frames, ts);
+        })
+        .def("wait_for", [](const ShmRing& r, uint64_t idx, double timeout) {
+            py::gil_scoped_release release;
+            return r.wait_for(idx, timeout);
+        }, py::arg("idx"), py::arg("timeout") = -1.0)
+        .def("view_frame", [](ShmRing& r, uint64_t logical_idx) {
             size_t slot = (size_t)(logical_idx % r.capacity);
             void* ptr = r.data + slot * r.frame_bytes;
-            const py::ssize_t itemsize = (py::ssize_t)sizeof(float);
-            const char* fmt = "f";
-            std::array<py::ssize_t, 2> shape   { C, S };
-            std::array<py::ssize_t, 2> strides { (py::ssize_t)(S * sizeof(float)), (py::ssize_t)sizeof(float) };
-            return py::memoryview::from_buffer(ptr, itemsize, fmt, shape, strides, /*readonly=*/true);
+            std::array<py::ssize_t, 1> shape   { (py::ssize_t)r.frame_bytes };
+            std::array<py::ssize_t, 1> strides { 1 };
+            return py::memoryview::from_buffer(static_cast<uint8_t*>(ptr), shape, strides, /*readonly=*/true);
         })
-        .def("view_window", [](ShmRing& r, uint64_t start, size_t frames, py::ssize_t C, py::ssize_t S) {
+        .def("view_window", [](ShmRing& r, uint64_t start, size_t frames) {
+            if (frames > r.capacity)
+                throw std::runtime_error("window larger than ring capacity");
             size_t slot = (size_t)(start % r.capacity);
-            if (slot + frames > r.capacity)
+            if (!r.mirrored && slot + frames > r.capacity)
                 throw std::runtime_error("window wraps ring; split into two calls");
             void* ptr = r.data + slot * r.frame_bytes;
-            const py::ssize_t itemsize = (py::ssize_t)sizeof(float);
-            const char* fmt = "f";
-            std::array<py::ssize_t, 3> shape   { (py::ssize_t)frames, C, S };
-            std::array<py::ssize_t, 3> strides {
-                (py::ssize_t)r.frame_bytes,
-                (py::ssize_t)(S * sizeof(float)),
-                (py::ssize_t)sizeof(float)
-            };
-            return py::memoryview::from_buffer(ptr, itemsize, fmt, shape, strides, /*readonly=*/true);
+            std::array<py::ssize_t, 2> shape   { (py::ssize_t)frames, (py::ssize_t)r.frame_bytes };
+            std::array<py::ssize_t, 2> strides { (py::ssize_t)r.frame_bytes, 1 };
+            return py::memoryview::from_buffer(static_cast<uint8_t*>(ptr), shape, strides, /*readonly=*/true);
         });
 }
@@ -1,8 +1,13 @@
 #pragma once
 #include <cstdint>
+#include <algorithm>
 #include <atomic>
+#include <chrono>
+#include <climits>
 #include <cstring>
+#include <numeric>
 #include <stdexcept>
+#include <thread>
 
 #ifdef _WIN32
     #include <windows.h>
@@ -13,12 +18,72 @@
     #include <unistd.h>
 #endif
 
+#ifdef __linux__
+    #include <linux/futex.h>
+    #include <sys/syscall.h>
+    #include <ctime>
+#endif
+
 struct RingHeader {
     std::atomic<uint64_t> write_idx;
     size_t capacity;
     size_t frame_bytes;
+    // Bumped on every publish; consumers sleep on it (futex on Linux)
+    std::atomic<uint32_t> publish_seq;
+    std::atomic<uint32_t> waiters;
 };
 
+// Per-slot producer timestamps (nanoseconds), written inside the slot's seqlock window
+struct SlotStamp {
+    uint64_t mono_ns;
+    uint64_t wall_ns;
+};
+
+// Shared memory layout: [RingHeader][seq[capacity]][stamps[capacity]][data[capacity * frame_bytes]]
+// seq[slot] holds 2 * (logical_idx + 1) once a frame is committed to the slot and
+// an odd value while the producer is overwriting it (seqlock-style stamps).
+// The data region starts on a page boundary so it can be mapped a second time
+// directly behind itself (mirror mapping, POSIX only).
+static inline size_t ring_align(size_t n, size_t a) { return (n + a - 1) / a * a; }
+static inline size_t ring_page_size() {
+#ifdef _WIN32
+    return 64;
+#else
+    long p = sysconf(_SC_PAGESIZE);
+    return p > 0 ? static_cast<size_t>(p) : 4096;
+#endif
+}
+static inline size_t ring_seq_offset() { return ring_align(sizeof(RingHeader), 64); }
+static inline size_t ring_stamp_offset(size_t capacity) {
+    return ring_seq_offset() + ring_align(capacity * sizeof(uint64_t), 64);
+}
+static inline size_t ring_data_offset(size_t capacity) {
+    return ring_align(ring_stamp_offset(capacity) + capacity * sizeof(SlotStamp), ring_page_size());
+}
+static inline uint64_t ring_mono_ns() {
+    return static_cast<uint64_t>(std::chrono::duration_cast<std::chrono::nanoseconds>(
+        std::chrono::steady_clock::now().time_since_epoch()).count());
+}
+static inline uint64_t ring_wall_ns() {
+    return static_cast<uint64_t>(std::chrono::duration_cast<std::chrono::nanoseconds>(
+        std::chrono::system_clock::now().time_since_epoch()).count());
+}
+// The mirror needs capacity * frame_bytes to be a whole number of pages. Round the
+// requested capacity up to the next such value unless that wastes too much memory.
+static inline size_t ring_effective_capacity(size_t capacity, size_t frame_bytes) {
+#ifdef _WIN32
+    return capacity;
+#else
+    size_t page = ring_page_size();
+    size_t step = page / std::gcd(frame_bytes, page);
+    size_t rounded = ring_align(capacity, step);
+    size_t extra = (rounded - capacity) * frame_bytes;
+    size_t budget = std::max<size_t>(capacity * frame_bytes / 8, size_t(1) << 20);
+    return extra <= budget ? rounded : capacity;
+#endif
+}
+static inline uint64_t ring_seq_committed(uint64_t logical_idx) { return 2 * (logical_idx + 1); }
+
 struct ShmRing {
 #ifdef _WIN32
     HANDLE hMap = NULL;
@@ -28,8 +93,13 @@ struct ShmRing {
     size_t capacity = 0;
     size_t frame_bytes = 0;
     size_t total_bytes = 0;
+    size_t map_bytes = 0;
+    bool mirrored = false;
+    size_t reserved = 0;  // frames handed out by reserve() and not yet committed (producer only)
     uint8_t* base = nullptr;
     RingHeader* hdr = nullptr;
+    std::atomic<uint64_t>* seq = nullptr;
+    SlotStamp* stamps = nullptr;
     uint8_t* data = nullptr;
 
     ShmRing() = default;
@@ -57,9 +127,10 @@ struct ShmRing {
 
     static ShmRing create(const char* name, size_t capacity, size_t frame_bytes) {
         ShmRing r;
+        capacity = ring_effective_capacity(capacity, frame_bytes);
         r.capacity = capacity;
         r.frame_bytes = frame_bytes;
-        r.total_bytes = sizeof(RingHeader) + capacity * frame_bytes;
+        r.total_bytes = ring_data_offset(capacity) + capacity * frame_bytes;
 
 #ifdef _WIN32
         LARGE_INTEGER li;
@@ -88,6 +159,7 @@ struct ShmRing {
 
         r.hMap = hMap;
         r.base = static_cast<uint8_t*>(p);
+        r.map_bytes = r.total_bytes;
 #else
         int fd = shm_open(name, O_CREAT | O_RDWR, 0600);
         if (fd < 0)
@@ -98,19 +170,18 @@ struct ShmRing {
             throw std::runtime_error("ftruncate failed");
         }
 
-        void* p = mmap(nullptr, r.total_bytes, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
-        if (p == MAP_FAILED) {
-            close(fd);
-            throw std::runtime_error("mmap failed");
-        }
-
-        r.fd = fd;
-        r.base = static_cast<uint8_t*>(p);
+        r.map_posix(fd);
 #endif
 
         r.hdr  = reinterpret_cast<RingHeader*>(r.base);
-        r.data = r.base + sizeof(RingHeader);
+        r.seq  = reinterpret_cast<std::atomic<uint64_t>*>(r.base + ring_seq_offset());
+        r.stamps = reinterpret_cast<SlotStamp*>(r.base + ring_stamp_offset(capacity));
+        r.data = r.base + ring_data_offset(capacity);
+        for (size_t i = 0; i < capacity; ++i)
+            r.seq[i].store(0, std::memory_order_relaxed);
         r.hdr->write_idx.store(0, std::memory_order_relaxed);
+        r.hdr->publish_seq.store(0, std::memory_order_relaxed);
+        r.hdr->waiters.store(0, std::memory_order_relaxed);
         r.hdr->capacity    = capacity;
         r.hdr->frame_bytes = frame_bytes;
         return r;
@@ -118,9 +189,10 @@ struct ShmRing {
 
     static ShmRing open(const char* name, size_t capacity, size_t frame_bytes) {
         ShmRing r;
+        capacity = ring_effective_capacity(capacity, frame_bytes);
         r.capacity = capacity;
         r.frame_bytes = frame_bytes;
-        r.total_bytes = sizeof(RingHeader) + capacity * frame_bytes;
+        r.total_bytes = ring_data_offset(capacity) + capacity * frame_bytes;
 
 #ifdef _WIN32
         HANDLE hMap = OpenFileMappingA(
@@ -144,39 +216,249 @@ struct ShmRing {
 
         r.hMap = hMap;
         r.base = static_cast<uint8_t*>(p);
+        r.map_bytes = r.total_bytes;
 #else
         int fd = shm_open(name, O_RDWR, 0600);
         if (fd < 0)
             throw std::runtime_error("shm_open open failed");
 
-        void* p = mmap(nullptr, r.total_bytes, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
-        if (p == MAP_FAILED) {
-            close(fd);
-            throw std::runtime_error("mmap failed");
-        }
-
-        r.fd = fd;
-        r.base = static_cast<uint8_t*>(p);
+        r.map_posix(fd);
 #endif
 
         r.hdr  = reinterpret_cast<RingHeader*>(r.base);
-        r.data = r.base + sizeof(RingHeader);
-        return r; 
+        r.seq  = reinterpret_cast<std::atomic<uint64_t>*>(r.base + ring_seq_offset());
+        r.stamps = reinterpret_cast<SlotStamp*>(r.base + ring_stamp_offset(capacity));
+        r.data = r.base + ring_data_offset(capacity);
+        return r;
+    }
+
+    // Remove the named shared memory object; existing mappings stay valid until closed
+    static void unlink(const char* name) {
+#ifndef _WIN32
+        ::shm_unlink(name);
+#else
+        (void)name;  // Windows drops the mapping when the last handle closes
+#endif
     }
 
-    void publish(const void* frames, size_t nframes) {
+    // Copy nframes frames into the ring. mono_ns / wall_ns optionally give one
+    // timestamp per frame; otherwise the whole batch is stamped with "now".
+    void publish(const void* frames, size_t nframes,
+                 const uint64_t* mono_ns = nullptr, const uint64_t* wall_ns = nullptr) {
+        if (nframes == 0)
+            return;
+        const uint64_t now_mono = mono_ns ? 0 : ring_mono_ns();
+        const uint64_t now_wall = wall_ns ? 0 : ring_wall_ns();
         const uint8_t* src = static_cast<const uint8_t*>(frames);
         uint64_t idx = hdr->write_idx.load(std::memory_order_relaxed);
 
-        for (size_t i = 0; i < nframes; ++i) {
-            size_t slot = static_cast<size_t>((idx + i) % capacity);
-            std::memcpy(data + slot * frame_bytes, src + i * frame_bytes, frame_bytes);
+        // Only the newest `capacity` frames of an oversized batch survive
+        size_t skip = nframes > capacity ? nframes - capacity : 0;
+        size_t count = nframes - skip;
+        size_t slot = static_cast<size_t>((idx + skip) % capacity);
+        size_t first = (mirrored || count < capacity - slot) ? count : capacity - slot;
+
+        // Mark the target slots as being written before touching their payload
+        for (size_t i = 0; i < count; ++i) {
+            uint64_t li = idx + skip + i;
+            seq[static_cast<size_t>(li % capacity)].store(ring_seq_committed(li) - 1, std::memory_order_relaxed);
+        }
+        std::atomic_thread_fence(std::memory_order_release);
+
+        // One copy through the mirror, otherwise up to the ring end and the wrapped remainder
+        std::memcpy(data + slot * frame_bytes, src + skip * frame_bytes, first * frame_bytes);
+        if (count > first)
+            std::memcpy(data, src + (skip + first) * frame_bytes, (count - first) * frame_bytes);
+
+        for (size_t i = 0; i < count; ++i) {
+            uint64_t li = idx + skip + i;
+            size_t s = static_cast<size_t>(li % capacity);
+            stamps[s].mono_ns = mono_ns ? mono_ns[skip + i] : now_mono;
+            stamps[s].wall_ns = wall_ns ? wall_ns[skip + i] : now_wall;
+            seq[s].store(ring_seq_committed(li), std::memory_order_release);
+        }
+        hdr->write_idx.store(idx + nframes, std::memory_order_release);
+        notify();
+    }
+
+    // Zero-copy producer path: return a pointer to the next nframes slots so the caller
+    // can write frames in place, then make them visible with commit(). The slots are
+    // marked as being written, so checked readers never see a half-filled frame. On a
+    // ring without the mirror the reservation stops at the ring end; the number of
+    // frames actually reserved is returned through granted.
+    uint8_t* reserve(size_t nframes, size_t& granted) {
+        if (nframes > capacity)
+            throw std::runtime_error("cannot reserve more frames than ring capacity");
+        uint64_t idx = hdr->write_idx.load(std::memory_order_relaxed);
+        size_t slot = static_cast<size_t>(idx % capacity);
+        granted = (mirrored || nframes <= capacity - slot) ? nframes : capacity - slot;
+        for (size_t i = 0; i < granted; ++i) {
+            uint64_t li = idx + i;
+            seq[static_cast<size_t>(li % capacity)].store(ring_seq_committed(li) - 1, std::memory_order_relaxed);
         }
+        std::atomic_thread_fence(std::memory_order_release);
+        reserved = granted;
+        return data + slot * frame_bytes;
+    }
 
+    // Publish the first nframes frames of the last reservation (stamped like publish())
+    void commit(size_t nframes, const uint64_t* mono_ns = nullptr, const uint64_t* wall_ns = nullptr) {
+        if (nframes > reserved)
+            throw std::runtime_error("commit exceeds reserved frames");
+        reserved = 0;
+        if (nframes == 0)
+            return;
+        const uint64_t now_mono = mono_ns ? 0 : ring_mono_ns();
+        const uint64_t now_wall = wall_ns ? 0 : ring_wall_ns();
+        uint64_t idx = hdr->write_idx.load(std::memory_order_relaxed);
+        for (size_t i = 0; i < nframes; ++i) {
+            uint64_t li = idx + i;
+            size_t s = static_cast<size_t>(li % capacity);
+            stamps[s].mono_ns = mono_ns ? mono_ns[i] : now_mono;
+            stamps[s].wall_ns = wall_ns ? wall_ns[i] : now_wall;
+            seq[s].store(ring_seq_committed(li), std::memory_order_release);
+        }
         hdr->write_idx.store(idx + nframes, std::memory_order_release);
+        notify();
+    }
+
+    // Block until write_idx >= target or the timeout expires (timeout_s < 0 waits forever).
+    // Returns the write_idx observed last, so callers can tell a timeout from success.
+    uint64_t wait_for(uint64_t target, double timeout_s) const {
+        using clock = std::chrono::steady_clock;
+        const bool forever = timeout_s < 0;
+        const auto deadline = clock::now() + std::chrono::duration_cast<clock::duration>(
+            std::chrono::duration<double>(forever ? 0.0 : timeout_s));
+
+        while (true) {
+            uint32_t seen = hdr->publish_seq.load(std::memory_order_seq_cst);
+            uint64_t wi = hdr->write_idx.load(std::memory_order_acquire);
+            if (wi >= target)
+                return wi;
+
+            auto remaining = deadline - clock::now();
+            if (!forever && remaining <= clock::duration::zero())
+                return wi;
+
+#ifdef __linux__
+            hdr->waiters.fetch_add(1, std::memory_order_seq_cst);
+            struct timespec ts;
+            struct timespec* tsp = nullptr;
+            if (!forever) {
+                auto ns = std::chrono::duration_cast<std::chrono::nanoseconds>(remaining).count();
+                ts.tv_sec  = static_cast<time_t>(ns / 1000000000LL);
+                ts.tv_nsec = static_cast<long>(ns % 1000000000LL);
+                tsp = &ts;
+            }
+            // Returns immediately if publish_seq already moved past `seen`
+            syscall(SYS_futex, reinterpret_cast<uint32_t*>(&hdr->publish_seq),
+                    FUTEX_WAIT, seen, tsp, nullptr, 0);
+            hdr->waiters.fetch_sub(1, std::memory_order_seq_cst);
+#else
+            // No cross-process futex here; fall back to a short sleep
+            (void)seen;
+            auto nap = std::chrono::duration_cast<clock::duration>(std::chrono::microseconds(200));
+            std::this_thread::sleep_for((!forever && remaining < nap) ? remaining : nap);
+#endif
+        }
+    }
+
+    // Copy frames [start, start + nframes) into out and flag each one in ok.
+    // A frame is valid only if its slot carried the expected stamp both before
+    // and after the copy; otherwise it was overrun (lapped / not yet written)
+    // or torn (overwritten mid-copy). Returns the number of invalid frames.
+    size_t read_checked(uint64_t start, size_t nframes, uint8_t* out, uint8_t* ok,
+                        SlotStamp* ts_out = nullptr) const {
+        if (nframes == 0)
+            return 0;
+        if (nframes > capacity)
+            throw std::runtime_error("read window larger than ring capacity");
+
+        for (size_t i = 0; i < nframes; ++i) {
+            uint64_t li = start + i;
+            uint64_t s = seq[static_cast<size_t>(li % capacity)].load(std::memory_order_acquire);
+            ok[i] = (s == ring_seq_committed(li)) ? 1 : 0;
+        }
+
+        size_t slot = static_cast<size_t>(start % capacity);
+        size_t first = (mirrored || nframes < capacity - slot) ? nframes : capacity - slot;
+        std::memcpy(out, data + slot * frame_bytes, first * frame_bytes);
+        if (nframes > first)
+            std::memcpy(out + first * frame_bytes, data, (nframes - first) * frame_bytes);
+        if (ts_out)
+            copy_stamps(start, nframes, ts_out);
+        std::atomic_thread_fence(std::memory_order_acquire);
+
+        size_t bad = 0;
+        for (size_t i = 0; i < nframes; ++i) {
+            uint64_t li = start + i;
+            uint64_t s = seq[static_cast<size_t>(li % capacity)].load(std::memory_order_relaxed);
+            if (s != ring_seq_committed(li))
+                ok[i] = 0;
+            bad += ok[i] ? 0 : 1;
+        }
+        return bad;
+    }
+
+    // Copy the timestamps of frames [start, start + nframes) without validation
+    void copy_stamps(uint64_t start, size_t nframes, SlotStamp* out) const {
+        size_t slot = static_cast<size_t>(start % capacity);
+        size_t first = (nframes < capacity - slot) ? nframes : capacity - slot;
+        std::memcpy(out, stamps + slot, first * sizeof(SlotStamp));
+        if (nframes > first)
+            std::memcpy(out + first, stamps, (nframes - first) * sizeof(SlotStamp));
     }
 
 private:
+#ifndef _WIN32
+    // Map [header | seq | data] and, when the data region is page-sized, a second view
+    // of data directly behind it so any window of up to capacity frames is contiguous.
+    void map_posix(int shm_fd) {
+        fd = shm_fd;
+        const size_t data_off = ring_data_offset(capacity);
+        const size_t data_bytes = capacity * frame_bytes;
+
+        if (data_bytes > 0 && data_bytes % ring_page_size() == 0) {
+            const size_t span = data_off + 2 * data_bytes;
+            void* region = mmap(nullptr, span, PROT_NONE, MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+            if (region != MAP_FAILED) {
+                uint8_t* r8 = static_cast<uint8_t*>(region);
+                void* p1 = mmap(r8, data_off + data_bytes, PROT_READ | PROT_WRITE,
+                                MAP_SHARED | MAP_FIXED, fd, 0);
+                void* p2 = (p1 == MAP_FAILED) ? MAP_FAILED :
+                           mmap(r8 + data_off + data_bytes, data_bytes, PROT_READ | PROT_WRITE,
+                                MAP_SHARED | MAP_FIXED, fd, static_cast<off_t>(data_off));
+                if (p2 != MAP_FAILED) {
+                    base = r8;
+                    map_bytes = span;
+                    mirrored = true;
+                    return;
+                }
+                munmap(region, span);
+            }
+        }
+
+        void* p = mmap(nullptr, total_bytes, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+        if (p == MAP_FAILED) {
+            close(fd);
+            fd = -1;
+            throw std::runtime_error("mmap failed");
+        }
+        base = static_cast<uint8_t*>(p);
+        map_bytes = total_bytes;
+        mirrored = false;
+    }
+#endif
+
+    void notify() {
+        hdr->publish_seq.fetch_add(1, std::memory_order_seq_cst);
+#ifdef __linux__
+        if (hdr->waiters.load(std::memory_order_seq_cst) > 0)
+            syscall(SYS_futex, reinterpret_cast<uint32_t*>(&hdr->publish_seq),
+                    FUTEX_WAKE, INT_MAX, nullptr, nullptr, 0);
+#endif
+    }
+
     void cleanup() {
 #ifdef _WIN32
         if (base) {
@@ -187,8 +469,8 @@ private:
         }
         hMap = NULL;
 #else
-        if (base && total_bytes > 0) {
-            munmap(base, total_bytes);
+        if (base && map_bytes > 0) {
+            munmap(base, map_bytes);
         }
         if (fd >= 0) {
             close(fd);
@@ -197,10 +479,14 @@ private:
 #endif
         base = nullptr;
         hdr = nullptr;
+        seq = nullptr;
+        stamps = nullptr;
         data = nullptr;
         capacity = 0;
         frame_bytes = 0;
         total_bytes = 0;
+        map_bytes = 0;
+        mirrored = false;
     }
 
     void move_from(ShmRing&& other) noexcept {
@@ -212,17 +498,26 @@ private:
         other.fd = -1;
 #endif
         capacity    = other.capacity;
+        reserved    = other.reserved;
         frame_bytes = other.frame_bytes;
         total_bytes = other.total_bytes;
+        map_bytes   = other.map_bytes;
+        mirrored    = other.mirrored;
         base        = other.base;
         hdr         = other.hdr;
+        seq         = other.seq;
+        stamps      = other.stamps;
         data        = other.data;
 
         other.capacity = 0;
         other.frame_bytes = 0;
         other.total_bytes = 0;
+        other.map_bytes = 0;
+        other.mirrored = false;
         other.base = nullptr;
         other.hdr  = nullptr;
+        other.seq  = nullptr;
+        other.stamps = nullptr;
         other.data = nullptr;
     }
 };
@@ -160,7 +160,6 @@ class PlotManager(DictManager):
                 self.metrics.last_write_idx = wi
 
                 lag = int(getattr(self, "plot_lag_frames", 16))
-                cap = int(self.ring.capacity)
                 end = wi - lag
                 if end < 0:
                     return
@@ -172,15 +171,7 @@ class PlotManager(DictManager):
                     if start < 0:
                         return
 
-                    slot = start % cap
-                    first = min(K, cap - slot)
-                    win1 = self.ring.view_window(start, first)
-                    rest = K - first
-                    if rest:
-                        win2 = self.ring.view_window(start + first, rest)
-                        win = np.concatenate((win1, win2), axis=0)
-                    else:
-                        win = win1
+                    win = self.ring.view_window(start, K)
 
                     self.metrics.update_drop_estimate(write_idx_now=wi, frames_read_this_tick=K)
 
@@ -246,16 +237,8 @@ class PlotManager(DictManager):
                         self._last_present = time.perf_counter()
                         return
 
-                    # handle wrap case
-                    slot = start % cap
-                    first = min(frames_to_read, cap - slot)
-                    win1 = self.ring.view_window(start, first)
-                    rest = frames_to_read - first
-                    if rest:
-                        win2 = self.ring.view_window(start + first, rest)
-                        win = np.concatenate((win1, win2), axis=0)
-                    else:
-                        win = win1
+                    # contiguous even across the ring end (mirror-mapped ring)
+                    win = self.ring.view_window(start, frames_to_read)
 
                     self.metrics.update_drop_estimate(write_idx_now=wi, frames_read_this_tick=frames_to_read)
                     latest = win[-1]
@@ -0,0 +1,121 @@
+import os
+import time
+from multiprocessing import Manager
+from sensor_core.sensor_manager import SensorManager
+from sensor_core.utils.utils import setup_process_start_method
+
+
+class SensorHub:
+    def __init__(self, base_dir: str = "."):
+        """ Initialize SensorHub Class
+        Runs several independent sensor streams in one host process. Each sensor gets its own
+        SensorManager with its own ring, stream writer and ingester; the hub keeps names unique,
+        shares one multiprocessing Manager for all metric proxies and handles lifecycles together.
+        :param base_dir: directory for per-sensor .bin and .sqlite3 files when paths are not given
+        """
+        self.os_flag = setup_process_start_method()
+        self.base_dir = os.path.abspath(base_dir)
+        self._mp_manager = Manager()
+        self.sensors = {}
+
+    def add_sensor(self, name: str, ser_channel_key, commport: str, **kwargs) -> SensorManager:
+        """ Create and register a sensor stream
+
+        Example:
+          hub.add_sensor("imu", ["ax", "ay", "az"], "/dev/ttyACM0", frame_shape=(1000, 10, 3), frame_rate_hz=100)
+          hub.add_sensor("cam", ["cam0"], None, data_mode="image", frame_shape=(480, 640, 1), frame_rate_hz=30)
+        :param name: unique sensor name
+        :param ser_channel_key: list of serial channel names
+        :param commport: target serial port
+        :param kwargs: any SensorManager argument (frame_rate_hz / ring_capacity size the ring per stream);
+        segment_dir and spill_dir must not be shared with another sensor
+        :return: the sensor's SensorManager
+        """
+        name = str(name)
+        if name in self.sensors:
+            raise ValueError(f"sensor name already registered: {name}")
+
+        # Per-sensor default file locations so streams never share .bin or .sqlite3 files
+        kwargs.setdefault("fast_stream_path_a", os.path.join(self.base_dir, f"{name}_stream_a.bin"))
+        kwargs.setdefault("fast_stream_path_b", os.path.join(self.base_dir, f"{name}_stream_b.bin"))
+        kwargs.setdefault("sqlite_path", os.path.join(self.base_dir, f"{name}_db.sqlite3"))
+        # Ingest claims and deletes every numbered segment in these directories, so they cannot be shared
+        mine = self._segment_dirs(kwargs.get("segment_dir"), kwargs.get("spill_dir"))
+        for other, sm in self.sensors.items():
+            shared = mine & self._segment_dirs(sm.segment_dir, sm.spill_dir)
+            if shared:
+                raise ValueError(f"segment directory {sorted(shared)[0]} is already used by sensor {other!r}")
+
+        sm = SensorManager(ser_channel_key=ser_channel_key,
+                           commport=commport,
+                           name=name,
+                           mp_manager=self._mp_manager,
+                           **kwargs)
+        self.sensors[name] = sm
+        return sm
+
+    @staticmethod
+    def _segment_dirs(segment_dir, spill_dir) -> set:
+        """ Directories a sensor's writer and ingester keep numbered segments in """
+        if not segment_dir:
+            return set()
+        segment_dir = os.path.abspath(segment_dir)
+        return {segment_dir, os.path.abspath(spill_dir or os.path.join(segment_dir, "spill"))}
+
+    def __getitem__(self, name: str) -> SensorManager:
+        return self.sensors[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sensors
+
+    def start_acquisition(self, name: str, func=None, virtual_ser_port: bool = False,
+                          save_data: bool = False, filepath: str = None):
+        """ Create and start the acquisition process of one sensor
+        :param name: sensor name
+        :param func: optional custom acquisition function for this sensor
+        :param virtual_ser_port: if True, rely on func to generate data instead of a serial port
+        :param save_data: boolean flag passed through to update_data_process
+        :param filepath: database path passed through to update_data_process
+        :return: pointer to process
+        """
+        sm = self.sensors[name]
+        p = sm.update_data_process(save_data=save_data, filepath=filepath,
+                                   virtual_ser_port=virtual_ser_port, func=func)
+        sm.start_process(p)
+        return p
+
+    def start_all(self, funcs: dict = None, virtual_ser_port: bool = False):
+        """ Start acquisition for every registered sensor
+        :param funcs: optional {sensor name: acquisition function}
+        :param virtual_ser_port: if True, rely on the custom functions instead of serial ports
+        :return: {sensor name: process}
+        """
+        funcs = funcs or {}
+        return {name: self.start_acquisition(name, func=funcs.get(name), virtual_ser_port=virtual_ser_port)
+                for name in self.sensors}
+
+    def remove_sensor(self, name: str, timeout: float = 2.0):
+        """ Stop one sensor's processes, release its ring and forget it
+        :param name: sensor name
+        :param timeout: seconds to wait for each process to exit
+        """
+        sm = self.sensors.pop(name)
+        sm.shutdown(timeout=timeout)
+
+    def shutdown(self, timeout: float = 2.0):
+        """ Stop all sensors and the shared multiprocessing Manager
+        :param timeout: seconds to wait for each process to exit
+        """
+        for name in list(self.sensors):
+            self.remove_sensor(name, timeout=timeout)
+        self._mp_manager.shutdown()
+
+    def get_metrics(self) -> dict:
+        """Return a metrics snapshot per sensor."""
+        return {name: sm.get_metrics() for name, sm in self.sensors.items()}
+
+    def debug_status(self) -> dict:
+        return {
+            "updated_unix": time.time(),
+            "sensors": {name: sm.debug_status() for name, sm in self.sensors.items()},
+        }
@@ -1,11 +1,15 @@
 import time
 import os
 from sensor_core.data import DataManager
+from sensor_core.data.transform import transformed_spec
 from sensor_core.memory.strg_manager import StorageManager
+from sensor_core.memory.segments import BACKLOG_POLICIES, list_segments
+from sensor_core.memory.stream_logger import DURABILITY_MODES
 from sensor_core.dsp.dsp_manager import DSPManager
 from sensor_core.memory.mem_utils import *
 from sensor_core.utils.utils import *
 from sensor_core.utils.utils import _coerce
+from sensor_core.utils.sched import run_scheduled, SCHED_ROLES
 from multiprocessing import Process, freeze_support, Manager
 from threading import Thread
 import pathlib
@@ -25,6 +29,11 @@ class SensorManager(DataManager, StorageManager):
                  sqlite_path: str = "./serial_db.sqlite3",
                  rotate_frames: int = 8192,
                  rotate_seconds: float = 5.0,
+                 name: str = "sensor",
+                 ring_capacity: int = 4096,
+                 frame_rate_hz: float = None,
+                 ring_seconds: float = 2.0,
+                 mp_manager=None,
                  **kwargs):
         """ Initialize SensorManager Class
         Initializes serial port, shared memory object, and kwarg dictionary (args_dict)
@@ -33,9 +42,54 @@ class SensorManager(DataManager, StorageManager):
         :param baudrate: target data transfer rate (in bits/sec)
         :param frame_shape: for line data, tuple of (num_points, window_size, num_channels); for image data, tuple of (height, width, num_channels)
         :param dtype: data type to store in shared memory object
+        :param name: sensor name; used to derive a collision-free shared memory name for the ring
+        :param ring_capacity: ring size in frames (ignored when frame_rate_hz is given)
+        :param frame_rate_hz: optional expected frame rate; sizes the ring to hold ring_seconds of frames
+        :param ring_seconds: seconds of history the ring holds when sized from frame_rate_hz
+        :param mp_manager: optional shared multiprocessing Manager (e.g. from SensorHub) for metric proxies
+        :param kwargs: optional settings below; see SerialManager, FrameTransform, dump_loop and ingest_loop for details
+        :param protocol: 'sync', 'cobs' or 'ascii' to decode packets or text lines from the port (per port for a list)
+        :param EOL: sync word, COBS delimiter or line terminator of the protocol (per port for a list)
+        :param capture_path: file to record the raw bytes read from the port
+        :param replay_speed: playback speed when commport is 'replay:<capture file>'
+        :param source_channels: channels of each port when commport is a list of ports read in parallel
+        :param align_method: 'nearest' or 'linear' matching of samples from several ports into one frame
+        :param align_max_skew_ms: largest time difference of samples matched into one frame
+        :param timestamp_model: stamp frames from a device clock fit, so the stored 'time' is per sample
+        :param counter_channel: channel carrying the device sample counter (timestamp_model)
+        :param counter_bits: width of the device counter (timestamp_model)
+        :param nominal_rate_hz: nominal device sample rate (timestamp_model)
+        :param batch_frames: most ring slots handed to an in-place custom function that takes max_frames
+        :param transform: dict of crop, bin, decimate, taps, dtype, scale, offset applied before publishing
+        :param process_sched: {role: {'cpus': [...], 'nice': n, 'fifo': priority}} for roles in SCHED_ROLES
+        :param stream_io_buffers: pooled buffers between the stream writer's drain and disk threads
+        :param stream_io_buffer_mb: total size of those buffers
+        :param segment_dir: write numbered stream segments here instead of the A/B stream files
+        :param max_backlog: most sealed segments waiting for ingest
+        :param backlog_policy: 'block', 'drop-oldest' or 'spill' when the backlog is full
+        :param spill_dir: where 'spill' moves segments (default <segment_dir>/spill)
+        :param stream_preallocate: preallocate stream files (default True)
+        :param stream_durability: 'seal', 'periodic' or 'write_behind' sync of written data to disk
+        :param stream_sync_every_mb: data written between syncs for 'periodic' and 'write_behind'
         """
         self.dtype = dtype
         self.data_mode = data_mode
+        self.name = str(name)
+        self._procs = []
+        self._stream_proc = None
+        self._ingest_proc = None
+        self.process_sched = dict(kwargs.get("process_sched") or {})
+        unknown = set(self.process_sched) - set(SCHED_ROLES)
+        if unknown:
+            raise ValueError(f"process_sched roles {sorted(unknown)} not in {SCHED_ROLES}")
+        self.segment_dir = os.path.abspath(kwargs["segment_dir"]) if kwargs.get("segment_dir") else None
+        self.spill_dir = os.path.abspath(kwargs["spill_dir"]) if kwargs.get("spill_dir") else None
+        backlog_policy = kwargs.get("backlog_policy", "block")
+        if backlog_policy not in BACKLOG_POLICIES:
+            raise ValueError(f"backlog_policy must be one of {BACKLOG_POLICIES}, got {backlog_policy!r}")
+        stream_durability = kwargs.get("stream_durability", "seal")
+        if stream_durability not in DURABILITY_MODES:
+            raise ValueError(f"stream_durability must be one of {DURABILITY_MODES}, got {stream_durability!r}")
 
         # Defines start method for multiprocessing. Necessary for windows and macOS
         self.os_flag = setup_process_start_method()
@@ -44,11 +98,21 @@ class SensorManager(DataManager, StorageManager):
         self.ser_channel_key, self.plot_channel_key = self.setup_channel_keys(
                                                       ser_channel_key=ser_channel_key,
                                                       **kwargs)
+        # Optional pre-publish reduction; the ring (and everything behind it) holds the reduced frames
+        transform = kwargs.get("transform")
+        self.input_shape = logical_frame_shape(ser_channel_key, data_mode, frame_shape)
+        ring_shape, self.dtype = transformed_spec(transform, self.input_shape, data_mode, dtype)
+
         # Setup ring buffer
+        if frame_rate_hz is not None:
+            ring_capacity = ring_capacity_for_rate(frame_rate_hz, ring_seconds)
+        self.shm_name = make_ring_name(self.name)
         self.ring, self.logical_shape = initialize_ring(ser_channel_key=ser_channel_key,
-                                                        dtype=dtype,
+                                                        dtype=self.dtype,
+                                                        shm_name=self.shm_name,
+                                                        frames_capacity=int(ring_capacity),
                                                         data_mode=data_mode,
-                                                        frame_shape=frame_shape)
+                                                        frame_shape=ring_shape)
                         
         # Setup target consumer params and enforce
         plot_target_fps = kwargs.get("plot_target_fps", 60.0)
@@ -64,10 +128,10 @@ class SensorManager(DataManager, StorageManager):
                                                    plot_channel_key=self.plot_channel_key,
                                                    commport=commport,
                                                    baudrate=baudrate,
-                                                   shm_name='/sensor_ring',
+                                                   shm_name=self.shm_name,
                                                    shape=self.logical_shape,
-                                                   dtype=dtype,
-                                                   ring_capacity=4096,
+                                                   dtype=self.dtype,
+                                                   ring_capacity=self.ring.capacity,
                                                    data_mode=data_mode,
                                                    frame_shape=self.logical_shape
                                                    )
@@ -75,12 +139,27 @@ class SensorManager(DataManager, StorageManager):
         self.static_args_dict = update_static_dict(static_args_dict=self.static_args_dict,
                                                    plot_target_fps=plot_target_fps,
                                                    plot_catch_up_max=plot_catch_up_max,
-                                                   plot_catchup_boost=plot_catchup_boost
+                                                   plot_catchup_boost=plot_catchup_boost,
+                                                   EOL=kwargs.get("EOL"),
+                                                   protocol=kwargs.get("protocol"),
+                                                   capture_path=kwargs.get("capture_path"),
+                                                   replay_speed=kwargs.get("replay_speed", 1.0),
+                                                   source_channels=kwargs.get("source_channels"),
+                                                   align_method=kwargs.get("align_method", "nearest"),
+                                                   align_max_skew_ms=kwargs.get("align_max_skew_ms", 20.0),
+                                                   timestamp_model=kwargs.get("timestamp_model", False),
+                                                   counter_channel=kwargs.get("counter_channel"),
+                                                   counter_bits=kwargs.get("counter_bits"),
+                                                   nominal_rate_hz=kwargs.get("nominal_rate_hz"),
+                                                   batch_frames=kwargs.get("batch_frames", 64),
+                                                   transform=transform,
+                                                   input_shape=self.input_shape,
+                                                   input_dtype=np.dtype(dtype)
                                                    )
        
 
         # Make shared proxies for metrics
-        self._mp_manager = Manager()
+        self._mp_manager = mp_manager if mp_manager is not None else Manager()
         self.writer_metrics_proxy = self._mp_manager.dict()
         self.plot_metrics_proxy = self._mp_manager.dict()
         self.ingest_metrics_proxy = self._mp_manager.dict()
@@ -127,22 +206,34 @@ class SensorManager(DataManager, StorageManager):
         try:
             from sensor_core.memory.stream_logger import dump_loop as _dump_loop
             ring_args = self.static_args_dict
-            shm_name = ring_args.get('shm_name', '/sensor_ring')
+            shm_name = ring_args.get('shm_name', self.shm_name)
             capacity = int(ring_args.get('ring_capacity', 4096))
             frame_shape = ring_args.get('logical_shape', self.logical_shape)
             _dtype = ring_args.get("dtype", dtype)
-            self._stream_proc = Process(target=_dump_loop,
-                                        args=(fast_stream_path_a, fast_stream_path_b, shm_name, capacity, frame_shape, _dtype),
+            self._stream_proc = Process(name='stream', target=run_scheduled,
+                                        args=('stream', self.process_sched.get('stream'), self.writer_metrics_proxy,
+                                              _dump_loop, fast_stream_path_a, fast_stream_path_b, shm_name,
+                                              capacity, frame_shape, _dtype),
                                         kwargs={'overwrite': False,
                                                 'rotate_frames': int(rotate_frames),
                                                 'rotate_seconds': float(rotate_seconds) if rotate_seconds else None,
                                                 'metrics_proxy': self.writer_metrics_proxy,
                                                 'control_proxy': self.stream_ctrl_proxy,
                                                 'data_mode': self.data_mode,
+                                                'ts_model': self._ts_model(),
+                                                'io_buffers': int(kwargs.get("stream_io_buffers", 4)),
+                                                'io_buffer_mb': float(kwargs.get("stream_io_buffer_mb", 16.0)),
+                                                'segment_dir': self.segment_dir,
+                                                'max_backlog': int(kwargs.get("max_backlog", 8)),
+                                                'backlog_policy': backlog_policy,
+                                                'spill_dir': self.spill_dir,
+                                                'preallocate': bool(kwargs.get("stream_preallocate", True)),
+                                                'durability': stream_durability,
+                                                'sync_every_mb': float(kwargs.get("stream_sync_every_mb", 8.0)),
                                                 })
             self.start_process(self._stream_proc)
         except Exception as e:
-            print(f'[SensorManager] failed to start stream logger: {e}')
+            print(f'[SensorManager:{self.name}] failed to start stream logger: {e}')
             self._stream_proc = None
 
         if start_stream_ingest:
@@ -153,13 +244,17 @@ class SensorManager(DataManager, StorageManager):
                     frame_shape = ring_args.get('logical_shape', self.logical_shape)
                     _dtype = ring_args.get("dtype", dtype)
                     # TO DO: change away from 'hint' and just call them the actual kwargs (i.e. frame)shape, data_mode)
-                    self._ingest_proc = Process(target=_ingest_loop,
-                                                args=(fast_stream_path_a, fast_stream_path_b, sqlite_path, ch_keys),
+                    self._ingest_proc = Process(name='ingest', target=run_scheduled,
+                                                args=('ingest', self.process_sched.get('ingest'),
+                                                      self.ingest_metrics_proxy, _ingest_loop,
+                                                      fast_stream_path_a, fast_stream_path_b, sqlite_path, ch_keys),
                                                 kwargs={'metrics_proxy': self.ingest_metrics_proxy,
                                                         'data_mode_hint': data_mode,
                                                         'frame_shape_hint': frame_shape,
                                                         'dtype_hint': _dtype,
-                                                        'precreate_sqlite': True
+                                                        'precreate_sqlite': True,
+                                                        'segment_dir': self.segment_dir,
+                                                        'spill_dir': self.spill_dir,
                                                         })
                     self.ingest_metrics_proxy.update({
                         "ingest_config_enabled": True,
@@ -167,13 +262,12 @@ class SensorManager(DataManager, StorageManager):
                     })
                     self.start_process(self._ingest_proc)
                 except Exception as e:
-                    print(f'[SensorManager] failed to start stream ingester: {e}')
+                    print(f'[SensorManager:{self.name}] failed to start stream ingester: {e}')
                     self.ingest_metrics_proxy.update({
                         "ingest_config_enabled": True,
                         "ingest_last_error": f"spawn_failed: {e.__class__.__name__}: {e}",
                     })
         else:
-            self._ingest_proc = None
             self.ingest_metrics_proxy.update({
                 "ingest_config_enabled": False,
                 "ingest_config_reason": "disabled_by_config"
@@ -229,17 +323,55 @@ class SensorManager(DataManager, StorageManager):
                           virtual_ser_port=virtual_ser_port,
                           metrics_proxy=self.writer_metrics_proxy)
 
+        args = ('update', self.process_sched.get('update'), self.writer_metrics_proxy, odm.online_update_data, func)
         if self.os_flag == 'win':
             p = Thread(name='update',
-                       target=odm.online_update_data,
-                       args=(func,))
+                       target=run_scheduled,
+                       args=args)
         else:
             p = Process(name='update',
-                        target=odm.online_update_data,
-                        args=(func,))
+                        target=run_scheduled,
+                        args=args)
 
         return p
 
+    def _ts_model(self) -> str:
+        """ How the producer stamps frames: 'device_clock' (first sample, from a clock fit) or 'publish' """
+        args = self.static_args_dict
+        if args.get('timestamp_model') or isinstance(args.get('commport'), (list, tuple)):
+            return 'device_clock'
+        return 'publish'
+
+    def replay_process(self, sources=None, speed: float = 1.0, batch_frames: int = 256, loop: bool = False):
+        """ Initialize a process that replays recorded frames into the ring in place of acquisition
+        Drives PlotManager, DSP and the stream writer with repeatable load, at rates above the hardware's.
+
+        :param sources: list of SCBIN .bin segments or one .sqlite3 store; defaults to this sensor's A/B files,
+        or with segment_dir to its sealed segments (the segment being written and those claimed by ingest are excluded)
+        :param speed: 1.0 replays at the recorded timing, N times faster, None or 0 as fast as possible
+        :param batch_frames: most frames per publish_many
+        :param loop: start over when the recording ends
+        :return: pointer to process
+        """
+        from sensor_core.memory.replay import replay_loop
+        if sources is None and self.segment_dir is not None:
+            sources = [p for _, p in list_segments(self.segment_dir, self.spill_dir
+                                                   or os.path.join(self.segment_dir, "spill"), state='sealed')]
+        elif sources is None:
+            sources = [self.fast_stream_path_a, self.fast_stream_path_b]
+        ch_keys = list(self.ser_channel_key) if isinstance(self.ser_channel_key, (list, tuple, np.ndarray)) else [self.ser_channel_key]
+        kwargs = {'data_mode': self.data_mode,
+                  'speed': speed,
+                  'batch_frames': int(batch_frames),
+                  'loop': loop,
+                  'channel_keys': ch_keys,
+                  'metrics_proxy': self.writer_metrics_proxy}
+        args = ('replay', self.process_sched.get('replay'), self.writer_metrics_proxy, replay_loop,
+                self.shm_name, int(self.ring.capacity), tuple(self.logical_shape), self.dtype, sources)
+        if self.os_flag == 'win':
+            return Thread(name='replay', target=run_scheduled, args=args, kwargs=kwargs)
+        return Process(name='replay', target=run_scheduled, args=args, kwargs=kwargs)
+
     def setup_plotting_process(self):
         """ Initialize dedicated process to update plot
         :return: pointer to process and plot object
@@ -249,12 +381,15 @@ class SensorManager(DataManager, StorageManager):
         pm = PlotManager(static_args_dict=self.static_args_dict,
                          metrics_proxy=self.plot_metrics_proxy,
                          plot_dsp_proxy=self.plot_dsp_proxy,)
+        args = ('plot', self.process_sched.get('plot'), self.plot_metrics_proxy, pm.online_plot_data)
         if self.os_flag == 'win':
             p = Thread(name='plot',
-                       target=pm.online_plot_data)
+                       target=run_scheduled,
+                       args=args)
         else:
             p = Process(name='plot',
-                        target=pm.online_plot_data)
+                        target=run_scheduled,
+                        args=args)
 
         return p, pm.fig
 
@@ -270,6 +405,25 @@ class SensorManager(DataManager, StorageManager):
             process.start()
         else:
             process.start()
+        self._procs.append(process)
+
+    def shutdown(self, timeout: float = 2.0):
+        """ Stop every process this manager started and release its ring
+
+        Threads (used instead of processes on Windows) cannot be stopped from outside and are left running.
+        :param timeout: seconds to wait for each process to exit after terminate()
+        """
+        procs = [p for p in self._procs if isinstance(p, Process)]
+        for p in reversed(procs):
+            if p.is_alive():
+                p.terminate()
+        for p in procs:
+            p.join(timeout)
+        self._procs = [p for p in self._procs if not isinstance(p, Process)]
+        try:
+            self.ring.unlink()
+        except Exception as e:
+            print(f'[SensorManager:{self.name}] failed to unlink ring {self.shm_name}: {e}')
 
     def get_metrics(self) -> dict:
         """Return a combined metrics snapshot."""
@@ -285,6 +439,11 @@ class SensorManager(DataManager, StorageManager):
 
     def debug_status(self) -> dict:
         return {
+            "name": self.name,
+            "ring": {
+                "shm_name": self.shm_name,
+                "capacity": int(self.ring.capacity),
+            },
             "writer_proc": {
                 "pid": getattr(self._stream_proc, "pid", None),
                 "alive": (self._stream_proc.is_alive() if self._stream_proc else False),
@@ -296,6 +455,7 @@ class SensorManager(DataManager, StorageManager):
             "paths": {
                 "bin_a": self.fast_stream_path_a,
                 "bin_b": self.fast_stream_path_b,
+                "segment_dir": self.segment_dir,
                 "sqlite": self.sqlite_path,
             },
         }
@@ -1 +1,2 @@
-from .ser_manager import *
\ No newline at end of file
+from .ser_manager import *
+from .emulator import SensorEmulator
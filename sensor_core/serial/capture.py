@@ -0,0 +1,189 @@
+import os
+import json
+import struct
+import threading
+import time
+from typing import Optional
+
+MAGIC = b'SCRAW\x00\x00'
+VERSION = 1
+REPLAY_PREFIX = 'replay:'
+_REC = struct.Struct('<QI')  # receive time (monotonic ns), chunk length
+
+
+def _ensure_parent(path: str):
+    parent = os.path.dirname(os.path.abspath(path))
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+
+def _read_header(fh) -> dict:
+    magic = fh.read(len(MAGIC))
+    if magic != MAGIC:
+        raise ValueError("not a raw serial capture file (bad magic)")
+    (version,) = struct.unpack('<H', fh.read(2))
+    if version != VERSION:
+        raise ValueError(f"unsupported capture version {version}")
+    (n,) = struct.unpack('<I', fh.read(4))
+    return json.loads(fh.read(n).decode('utf-8'))
+
+
+class ByteCapture:
+    def __init__(self, path: str, meta: dict = None, buffer_bytes: int = 1 << 20):
+        """
+        Tee of raw serial bytes to a compact capture file
+          Layout: MAGIC, <H version, <I header length, JSON header, then one record per read:
+          <Q receive time (monotonic ns), <I length, raw bytes.
+        :param path: capture file path (overwritten)
+        :param meta: decoder settings and anything else worth keeping (protocol, EOL, frame_shape, ...)
+        :param buffer_bytes: file write buffer size
+        """
+        _ensure_parent(path)
+        self.path = path
+        self.bytes_written = 0
+        self.records = 0
+        self._lock = threading.Lock()  # written from the reader thread, closed from the owner
+        self._fh = open(path, 'wb', buffering=int(buffer_bytes))
+        header = dict(meta or {})
+        header.update({
+            'version': VERSION,
+            'created_unix': time.time(),
+            'ts_clock': 'monotonic_ns',
+            'mono_to_wall_ns': time.time_ns() - time.monotonic_ns(),
+        })
+        payload = json.dumps(header, default=str).encode('utf-8')
+        self._fh.write(MAGIC)
+        self._fh.write(struct.pack('<H', VERSION))
+        self._fh.write(struct.pack('<I', len(payload)))
+        self._fh.write(payload)
+
+    def write(self, data, ts_ns: int = None):
+        """
+        Append one chunk as received from the port
+        :param data: bytes-like chunk
+        :param ts_ns: receive time in monotonic ns (now when None)
+        """
+        n = len(data)
+        if not n:
+            return
+        with self._lock:
+            if self._fh is None:
+                return
+            self._fh.write(_REC.pack(time.monotonic_ns() if ts_ns is None else int(ts_ns), n))
+            self._fh.write(data)
+            self.bytes_written += n
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.flush()
+                self._fh.close()
+                self._fh = None
+
+
+def read_capture(path: str):
+    """ Iterate a capture file
+    :return: (header dict, generator of (ts_ns, bytes) records)
+    """
+    fh = open(path, 'rb')
+    header = _read_header(fh)
+
+    def records():
+        with fh:
+            while True:
+                rec = fh.read(_REC.size)
+                if len(rec) < _REC.size:
+                    return
+                ts, n = _REC.unpack(rec)
+                data = fh.read(n)
+                if len(data) < n:
+                    return  # truncated tail (capture was not closed)
+                yield ts, data
+
+    return header, records()
+
+
+class ReplaySerial:
+    def __init__(self, path: str, speed: Optional[float] = 1.0, timeout: float = 0.1, loop: bool = False):
+        """
+        Stand-in for serial.Serial that serves a capture file with its recorded timing
+          SerialManager reads it with readinto/in_waiting exactly like a port, so replayed bytes go
+          through the same reader thread and decoder as live ones.
+        :param path: capture file written by ByteCapture
+        :param speed: 1.0 replays in real time, N replays N times faster, None or 0 as fast as possible
+        :param timeout: longest a readinto blocks waiting for the next chunk to come due
+        :param loop: start over at the end of the file instead of going idle
+        """
+        self.path = path
+        self.speed = float(speed) if speed else None
+        self.timeout = timeout
+        self.loop = loop
+        self.header, self._records = read_capture(path)
+        self.eof = False
+        self.bytes_replayed = 0
+        self._chunk = b''
+        self._chunk_ts = None
+        self._pos = 0
+        self._ts0 = None
+        self._t0 = None
+        self.is_open = True
+
+    def _due_in(self) -> float:
+        """Seconds until the current chunk is due (<= 0 when it may be delivered)."""
+        if self.speed is None or self._chunk_ts is None:
+            return 0.0
+        due = self._t0 + (self._chunk_ts - self._ts0) / 1e9 / self.speed
+        return due - time.perf_counter()
+
+    def _load(self) -> bool:
+        """Make sure a chunk with unread bytes is loaded; False at end of file."""
+        while self._pos >= len(self._chunk):
+            try:
+                ts, self._chunk = next(self._records)
+            except StopIteration:
+                if not self.loop:
+                    self.eof = True
+                    return False
+                _, self._records = read_capture(self.path)
+                self._ts0 = None
+                continue
+            self._pos = 0
+            self._chunk_ts = ts
+            if self._ts0 is None:
+                self._ts0, self._t0 = ts, time.perf_counter()
+        return True
+
+    @property
+    def in_waiting(self) -> int:
+        if not self._load() or self._due_in() > 0:
+            return 0
+        return len(self._chunk) - self._pos
+
+    def readinto(self, b) -> int:
+        out = memoryview(b).cast('B')
+        if not self._load():
+            time.sleep(self.timeout)
+            return 0
+        wait = self._due_in()
+        if wait > 0:
+            time.sleep(min(wait, self.timeout))
+            if self._due_in() > 0:
+                return 0
+        n = 0
+        # hand over every chunk that is due, as a real port would after a slow read
+        while n < len(out) and self._load() and self._due_in() <= 0:
+            k = min(len(out) - n, len(self._chunk) - self._pos)
+            out[n:n + k] = self._chunk[self._pos:self._pos + k]
+            self._pos += k
+            n += k
+        self.bytes_replayed += n
+        return n
+
+    def read(self, size: int = 1) -> bytes:
+        buf = bytearray(size)
+        return bytes(buf[:self.readinto(buf)])
+
+    def close(self):
+        self.is_open = False
+        self._records.close()
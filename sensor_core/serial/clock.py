@@ -0,0 +1,140 @@
+import time
+from collections import deque
+from typing import Optional
+import numpy as np
+
+
+class DeviceClock:
+    def __init__(self, window: int = 256, counter_bits: Optional[int] = None,
+                 nominal_rate_hz: Optional[float] = None, min_points: int = 8):
+        """
+        Online model of a device's sample clock against the host monotonic clock
+          Each observation pairs the device counter of the newest received sample with the host time
+          its bytes arrived. A least-squares line host_ns = t0 + period * counter over the last `window`
+          observations absorbs receive jitter and follows crystal drift; timestamps() evaluates it
+          for whole arrays of counters at once.
+        :param window: observations kept for the regression
+        :param counter_bits: width of a wrapping hardware counter (e.g. 16 or 32); None if it never wraps
+        :param nominal_rate_hz: the device's nominal sample rate; enables the drift (ppm) estimate
+        :param min_points: observations needed before the fit replaces the simple two-point estimate
+        """
+        self.window = int(window)
+        self.modulus = float(1 << int(counter_bits)) if counter_bits else None
+        self.nominal_rate_hz = float(nominal_rate_hz) if nominal_rate_hz else None
+        self.min_points = max(2, int(min_points))
+        self._obs = deque(maxlen=self.window)  # (unwrapped counter, host ns)
+        self._wraps = 0.0
+        self._last_raw = None
+        self._ref = None  # (counter, ns) origin keeping the fit well conditioned in float64
+        self.period_ns = None
+        self.offset_ns = None  # fitted host ns at counter == ref counter
+        self.residual_ms = 0.0
+        self.observations = 0
+
+    def unwrap(self, raw: np.ndarray) -> np.ndarray:
+        """
+        Undo counter wrap-around for counters in arrival order (updates the wrap state)
+        :param raw: device counter values as received
+        :return: float64 monotone counters
+        """
+        c = np.asarray(raw, dtype=np.float64).ravel()
+        if self.modulus is None or c.size == 0:
+            return c
+        prev = c[0] if self._last_raw is None else self._last_raw
+        steps = np.diff(c, prepend=prev) < -self.modulus / 2
+        out = c + (self._wraps + np.cumsum(steps) * self.modulus)
+        self._wraps += float(steps.sum()) * self.modulus
+        self._last_raw = float(c[-1])
+        return out
+
+    def observe(self, counter: float, host_ns: int):
+        """
+        Add one (device counter, host receive time) pair and refit
+        :param counter: unwrapped counter of the newest sample received
+        :param host_ns: host monotonic ns at which its bytes were read
+        """
+        if self._ref is None:
+            self._ref = (float(counter), int(host_ns))
+        self._obs.append((float(counter) - self._ref[0], float(int(host_ns) - self._ref[1])))
+        self.observations += 1
+        obs = np.asarray(self._obs)
+        x, y = obs[:, 0], obs[:, 1]
+        if len(obs) >= self.min_points and np.ptp(x) > 0:
+            xm, ym = x.mean(), y.mean()
+            dx = x - xm
+            period = float((dx * (y - ym)).sum() / (dx * dx).sum())
+            if period > 0:
+                self.period_ns = period
+                self.offset_ns = ym - period * xm
+                self.residual_ms = float(np.std(y - (self.offset_ns + period * x))) / 1e6
+                return
+        if len(obs) >= 2 and x[-1] > x[0]:
+            self.period_ns = (y[-1] - y[0]) / (x[-1] - x[0])
+        elif self.period_ns is None and self.nominal_rate_hz:
+            self.period_ns = 1e9 / self.nominal_rate_hz
+        # until the fit settles, anchor the line on the newest observation
+        self.offset_ns = y[-1] - (self.period_ns or 0.0) * x[-1]
+
+    def timestamps(self, counters: np.ndarray) -> np.ndarray:
+        """
+        Host monotonic ns of samples with the given (unwrapped) counters
+        :param counters: float64 counters, any shape
+        :return: uint64 array of the same shape
+        """
+        c = np.asarray(counters, dtype=np.float64)
+        if self._ref is None:
+            raise RuntimeError("DeviceClock.timestamps called before any observation")
+        rel = self.offset_ns + (self.period_ns or 0.0) * (c - self._ref[0])
+        return (np.rint(rel) + self._ref[1]).astype(np.uint64)
+
+    def stats(self) -> dict:
+        out = {
+            "clock_observations": int(self.observations),
+            "clock_rate_hz": round(1e9 / self.period_ns, 4) if self.period_ns else 0.0,
+            "clock_residual_ms": round(self.residual_ms, 4),
+        }
+        if self.nominal_rate_hz and self.period_ns:
+            out["clock_drift_ppm"] = round((1e9 / self.period_ns / self.nominal_rate_hz - 1.0) * 1e6, 3)
+        return out
+
+
+class FrameClock:
+    def __init__(self, clock: DeviceClock, frame_shape, data_mode: str = 'line',
+                 counter_channel: Optional[int] = None):
+        """
+        Applies a DeviceClock to decoded frames and returns one stamp per frame (its first sample)
+          With counter_channel the device counter is read from that channel of every sample, so
+          dropped packets leave a visible jump; without it the running count of decoded samples
+          stands in for the device counter.
+        :param clock: the clock model
+        :param frame_shape: decoded frame shape, (S, C) for line or (H, W, C) for image data
+        :param data_mode: 'line' (a sample is one row of S) or 'image' (a sample is one frame)
+        :param counter_channel: channel carrying the device sample counter (line data only)
+        """
+        self.clock = clock
+        self.line = data_mode == 'line'
+        self.S = int(frame_shape[0]) if self.line else 1
+        self.C = int(frame_shape[-1])
+        self.counter_channel = counter_channel if self.line else None
+        self.samples = 0
+
+    def stamp(self, frames: np.ndarray, pending: np.ndarray, host_ns: Optional[int]) -> np.ndarray:
+        """
+        Observe the newest sample and stamp the frames
+        :param frames: (N, S, C) or (N, H, W, C) frames just decoded
+        :param pending: values decoded after the last complete frame (the decoder's carry); they arrived
+        before host_ns too, so the sample count includes them
+        :param host_ns: monotonic ns at which the newest decoded byte was read, or None if unknown
+        :return: (N,) uint64 monotonic ns of each frame's first sample
+        """
+        n = frames.shape[0] * self.S
+        if self.counter_channel is not None:
+            counters = self.clock.unwrap(frames.reshape(n, self.C)[:, self.counter_channel])
+            newest = counters[-1] + pending.size // self.C
+        else:
+            counters = self.samples + np.arange(n, dtype=np.float64)
+            newest = self.samples + n - 1 + (pending.size // self.C if self.line else 0)
+        self.samples += n
+        if host_ns is not None or self.clock.period_ns is None:
+            self.clock.observe(newest, host_ns if host_ns is not None else time.monotonic_ns())
+        return self.clock.timestamps(counters[::self.S])
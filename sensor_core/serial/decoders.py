@@ -0,0 +1,476 @@
+import binascii
+from abc import ABC, abstractmethod
+import struct
+import warnings
+import numpy as np
+from typing import Optional, Tuple
+
+DEFAULT_SYNC = b'\xaa\x55'
+PROTOCOLS = ('sync', 'cobs', 'ascii')
+
+
+def _crc16_table():
+    table = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table[i] = crc & 0xFFFF
+    return table
+
+_CRC16_TABLE = _crc16_table()
+
+
+def crc16_ccitt(data) -> int:
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) of a bytes-like object."""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def _crc16_rows(rows: np.ndarray) -> np.ndarray:
+    """CRC-16/CCITT-FALSE of every row of a (k, L) uint8 matrix, vectorized across rows."""
+    crc = np.full(rows.shape[0], 0xFFFF, dtype=np.uint16)
+    for col in rows.T:
+        crc = (crc << 8) ^ _CRC16_TABLE[(crc >> 8) ^ col]
+    return crc
+
+
+def _gather(buf: np.ndarray, starts: np.ndarray, lens: np.ndarray) -> Optional[np.ndarray]:
+    """Concatenate buf[starts[i]:starts[i] + lens[i]] for all i without a Python loop."""
+    if starts.size == 0:
+        return None
+    if np.all(lens == lens[0]):
+        return buf[starts[:, None] + np.arange(int(lens[0]))].ravel()
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lens)[:-1])), lens)
+    return buf[offsets + np.arange(int(lens.sum()))]
+
+
+def _token_positions(a: np.ndarray, token: bytes) -> np.ndarray:
+    """Start positions of every occurrence of token in a uint8 array."""
+    t = np.frombuffer(token, dtype=np.uint8)
+    n = a.size - t.size + 1
+    if n <= 0:
+        return np.zeros(0, dtype=np.int64)
+    m = a[:n] == t[0]
+    for k in range(1, t.size):
+        m &= a[k:n + k] == t[k]
+    return np.flatnonzero(m)
+
+
+def _eol_bytes(EOL) -> bytes:
+    if EOL is None:
+        return b''
+    if isinstance(EOL, str):
+        return EOL.encode('latin-1')
+    return bytes(EOL)
+
+
+def encode_sync_packet(payload, sync: bytes = DEFAULT_SYNC, crc: bool = True) -> bytes:
+    """
+    Encode one payload as [sync][u16 length][payload][u16 CRC]
+    :param payload: bytes-like payload (a whole number of samples)
+    :param sync: sync word
+    :param crc: append CRC-16/CCITT-FALSE over length + payload
+    """
+    body = struct.pack('<H', len(payload)) + bytes(payload)
+    return bytes(sync) + body + (struct.pack('<H', crc16_ccitt(body)) if crc else b'')
+
+
+def encode_sync_packets(payloads: np.ndarray, sync: bytes = DEFAULT_SYNC, crc: bool = True) -> np.ndarray:
+    """
+    Vectorized encode_sync_packet for k equally sized payloads
+    :param payloads: (k, L) uint8 matrix, one payload per row
+    :param sync: sync word
+    :param crc: append CRC-16/CCITT-FALSE over length + payload
+    :return: (k, len(sync) + 2 + L (+2)) uint8 matrix of packets
+    """
+    payloads = np.ascontiguousarray(payloads, dtype=np.uint8)
+    k, L = payloads.shape
+    head = np.frombuffer(bytes(sync) + struct.pack('<H', L), dtype=np.uint8)
+    body = np.concatenate((np.broadcast_to(head[len(sync):], (k, 2)), payloads), axis=1)
+    parts = [np.broadcast_to(head[:len(sync)], (k, len(sync))), body]
+    if crc:
+        c = _crc16_rows(body)
+        parts.append(np.stack(((c & 0xFF).astype(np.uint8), (c >> 8).astype(np.uint8)), axis=1))
+    return np.concatenate(parts, axis=1)
+
+
+def cobs_encode(payload, delimiter: int = 0) -> bytes:
+    """
+    COBS-encode one payload and append the delimiter
+    :param payload: bytes-like payload
+    :param delimiter: frame delimiter; non-zero delimiters XOR the encoded bytes with it
+    """
+    out = bytearray()
+    block = bytearray()
+    for b in bytes(payload):
+        if b == 0:
+            out.append(len(block) + 1); out += block; block.clear()
+        else:
+            block.append(b)
+            if len(block) == 254:
+                out.append(255); out += block; block.clear()
+    out.append(len(block) + 1); out += block
+    if delimiter:
+        out = bytearray(x ^ delimiter for x in out)
+    out.append(delimiter)
+    return bytes(out)
+
+
+class StreamDecoder(ABC):
+    def __init__(self, frame_shape: Tuple[int, ...], dtype=np.float32, buffer_bytes: int = 1 << 20):
+        """
+        Base class for streaming decoders of framed binary serial protocols
+          Bytes accumulate in a preallocated buffer (fill it in place with readinto via
+          free_space/advance, or copy with feed). Packet boundaries are found with NumPy
+          and payload values are emitted as whole frames of frame_shape.
+        :param frame_shape: shape of one emitted frame, (S, C) for line or (H, W, C) for image data
+        :param dtype: dtype of payload values on the wire (little-endian)
+        :param buffer_bytes: size of the receive buffer
+        """
+        self.frame_shape = tuple(int(x) for x in frame_shape)
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        self.frame_items = int(np.prod(self.frame_shape))
+        self._buf = np.zeros(int(buffer_bytes), dtype=np.uint8)
+        self._n = 0
+        self._carry = np.empty(0, dtype=self.dtype)  # values of a partially received frame
+
+        # counters
+        self.bytes_in = 0
+        self.packets = 0
+        self.bad_packets = 0
+        self.bytes_skipped = 0
+
+    def free_space(self) -> memoryview:
+        """Writable view of the unused part of the receive buffer (for ser.readinto)."""
+        if self._n == self._buf.size:
+            # buffer full of bytes that never formed a packet: drop the oldest half
+            drop = self._buf.size // 2
+            self._buf[:self._n - drop] = self._buf[drop:self._n]
+            self._n -= drop
+            self.bytes_skipped += drop
+        return memoryview(self._buf)[self._n:]
+
+    def advance(self, nbytes: int) -> Optional[np.ndarray]:
+        """
+        Account for nbytes written into free_space() and decode what is complete
+        :return: (N,) + frame_shape array of complete frames, or None
+        """
+        self._n += int(nbytes)
+        self.bytes_in += int(nbytes)
+        consumed, vals = self._parse(self._buf[:self._n])
+        if consumed:
+            rest = self._n - consumed
+            self._buf[:rest] = self._buf[consumed:self._n]
+            self._n = rest
+        return self._emit(vals)
+
+    def feed(self, data) -> Optional[np.ndarray]:
+        """
+        Copy bytes into the receive buffer and decode
+        :param data: bytes-like chunk of the serial stream
+        :return: (N,) + frame_shape array of complete frames, or None
+        """
+        src = np.frombuffer(data, dtype=np.uint8)
+        out = []
+        while src.size:
+            free = self.free_space()
+            k = min(len(free), src.size)
+            self._buf[self._n:self._n + k] = src[:k]
+            frames = self.advance(k)
+            if frames is not None:
+                out.append(frames)
+            src = src[k:]
+        if not out:
+            return None
+        return out[0] if len(out) == 1 else np.concatenate(out)
+
+    def pending(self) -> np.ndarray:
+        """Values already decoded that do not yet fill a whole frame."""
+        return self._carry
+
+    def stats(self) -> dict:
+        return {
+            "decoder_bytes_in": int(self.bytes_in),
+            "decoder_packets": int(self.packets),
+            "decoder_bad_packets": int(self.bad_packets),
+            "decoder_bytes_skipped": int(self.bytes_skipped),
+        }
+
+    def _emit(self, vals: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if vals is None or vals.size == 0:
+            return None
+        if self._carry.size:
+            vals = np.concatenate((self._carry, vals))
+        n = vals.size // self.frame_items
+        self._carry = vals[n * self.frame_items:].copy()
+        if n == 0:
+            return None
+        return vals[:n * self.frame_items].reshape((n,) + self.frame_shape)
+
+    @abstractmethod
+    def _parse(self, buf: np.ndarray):
+        """Return (bytes consumed from the front of buf, decoded values of self.dtype or None)."""
+
+
+class SyncWordDecoder(StreamDecoder):
+    def __init__(self, frame_shape: Tuple[int, ...], dtype=np.float32, sync: bytes = DEFAULT_SYNC,
+                 crc: bool = True, max_payload: int = 0xFFFF, buffer_bytes: int = 1 << 20):
+        """
+        Decoder for [sync word][u16 LE length][payload][u16 LE CRC-16/CCITT-FALSE of length + payload]
+          A payload holds a whole number of values and may carry one or many samples.
+        :param frame_shape: shape of one emitted frame
+        :param dtype: dtype of payload values on the wire
+        :param sync: sync word marking the start of a packet
+        :param crc: whether packets carry (and must pass) the CRC
+        :param max_payload: largest plausible payload length in bytes
+        :param buffer_bytes: size of the receive buffer
+        """
+        super().__init__(frame_shape, dtype, buffer_bytes)
+        if not sync:
+            raise ValueError("sync word must not be empty")
+        self.sync = np.frombuffer(bytes(sync), dtype=np.uint8)
+        self.crc = bool(crc)
+        self.max_payload = int(max_payload)
+
+    def _parse(self, buf: np.ndarray):
+        n = buf.size
+        L = self.sync.size
+        hdr = L + 2
+        tail = 2 if self.crc else 0
+        if n < hdr:
+            return 0, None
+
+        # every position where the sync word matches
+        m = buf[:n - L + 1] == self.sync[0]
+        for k in range(1, L):
+            m &= buf[k:n - L + 1 + k] == self.sync[k]
+        cand = np.flatnonzero(m)
+
+        head_ok = cand + hdr <= n
+        c = cand[head_ok]
+        lens = buf[c + L].astype(np.int64) | (buf[c + L + 1].astype(np.int64) << 8)
+        ends = c + hdr + lens + tail
+        plausible = (lens > 0) & (lens <= self.max_payload) & (lens % self.dtype.itemsize == 0)
+        complete = plausible & (ends <= n)
+
+        ok = complete.copy()
+        if self.crc and ok.any():
+            idx = np.flatnonzero(ok)
+            ok[idx] = self._crc_ok(buf, c[idx], lens[idx])
+
+        starts, lens_ok, ends_ok = c[ok], lens[ok], ends[ok]
+        if starts.size > 1 and np.any(starts[1:] < ends_ok[:-1]):
+            # a sync word inside an accepted packet's payload; keep the earliest chain
+            keep = np.zeros(starts.size, dtype=bool)
+            end = -1
+            for i in range(starts.size):
+                if starts[i] >= end:
+                    keep[i] = True
+                    end = ends_ok[i]
+            starts, lens_ok, ends_ok = starts[keep], lens_ok[keep], ends_ok[keep]
+
+        # CRC failures count as bad packets unless they are sync words inside an accepted payload
+        failed = c[complete & ~ok]
+        if failed.size and starts.size:
+            j = np.searchsorted(starts, failed, side='right') - 1
+            failed = failed[(j < 0) | (failed >= ends_ok[np.maximum(j, 0)])]
+        self.bad_packets += int(failed.size)
+
+        last_end = int(ends_ok[-1]) if starts.size else 0
+        # keep everything from the first packet that may still complete, or a partial sync word
+        keep_from = max(last_end, n - L + 1)
+        pending = np.concatenate((c[plausible & ~complete], cand[~head_ok]))
+        pending = pending[pending >= last_end]
+        if pending.size:
+            keep_from = min(keep_from, int(pending.min()))
+
+        self.packets += int(starts.size)
+        self.bytes_skipped += keep_from - int((ends_ok - starts).sum())
+        payload = _gather(buf, starts + hdr, lens_ok)
+        return keep_from, (payload.view(self.dtype) if payload is not None else None)
+
+    def _crc_ok(self, buf: np.ndarray, starts: np.ndarray, lens: np.ndarray) -> np.ndarray:
+        L = self.sync.size
+        res = np.zeros(starts.size, dtype=bool)
+        for plen in np.unique(lens):
+            sel = np.flatnonzero(lens == plen)
+            width = 2 + int(plen)  # CRC covers the length field and the payload
+            s0 = starts[sel] + L
+            got = buf[s0 + width].astype(np.uint16) | (buf[s0 + width + 1].astype(np.uint16) << 8)
+            if sel.size >= 64 * width:
+                # many short packets: one table step per byte column across all of them
+                res[sel] = _crc16_rows(buf[s0[:, None] + np.arange(width)]) == got
+            else:
+                res[sel] = [crc16_ccitt(buf[s:s + width]) == g for s, g in zip(s0, got)]
+        return res
+
+
+class CobsDecoder(StreamDecoder):
+    def __init__(self, frame_shape: Tuple[int, ...], dtype=np.float32, delimiter: int = 0,
+                 buffer_bytes: int = 1 << 20):
+        """
+        Decoder for COBS-encoded payloads terminated by a delimiter byte
+          Bytes before the first delimiter are discarded (we may have joined mid-packet).
+        :param frame_shape: shape of one emitted frame
+        :param dtype: dtype of payload values on the wire
+        :param delimiter: frame delimiter; non-zero delimiters are XOR-ed out before decoding
+        :param buffer_bytes: size of the receive buffer
+        """
+        super().__init__(frame_shape, dtype, buffer_bytes)
+        self.delimiter = int(delimiter) & 0xFF
+        self._synced = False
+
+    def _parse(self, buf: np.ndarray):
+        delims = np.flatnonzero(buf == self.delimiter)
+        if delims.size == 0:
+            return 0, None
+        consumed = int(delims[-1]) + 1
+        starts = np.concatenate(([0], delims[:-1] + 1))
+        ends = delims
+        if not self._synced:
+            self.bytes_skipped += int(ends[0])
+            starts, ends = starts[1:], ends[1:]
+            self._synced = True
+        nonempty = ends > starts
+        starts, ends = starts[nonempty], ends[nonempty]
+        if starts.size == 0:
+            return consumed, None
+
+        enc = buf[:consumed] ^ self.delimiter if self.delimiter else buf[:consumed]
+        payload, good = self._decode(enc, starts, ends)
+        self.packets += int(good)
+        self.bad_packets += int(starts.size - good)
+        return consumed, payload.view(self.dtype)
+
+    def _decode(self, enc: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+        """COBS-decode all packets enc[starts[i]:ends[i]] at once; returns (payload bytes, good count)."""
+        npk = starts.size
+        ok = np.ones(npk, dtype=bool)
+        prev = np.full(npk, 0xFF, dtype=np.int64)  # the leading code byte never stands for a zero
+        pos = starts.astype(np.int64)
+        zero_at, drop_at = [], []
+
+        # hop through the code bytes of every packet in lockstep
+        active = np.arange(npk)
+        while active.size:
+            p = pos[active]
+            code = enc[p].astype(np.int64)
+            implicit_zero = prev[active] != 0xFF
+            zero_at.append(p[implicit_zero])
+            drop_at.append(p[~implicit_zero])
+            prev[active] = code
+            pos[active] = p + code
+            overshoot = pos[active] > ends[active]
+            ok[active[overshoot]] = False
+            active = active[pos[active] < ends[active]]
+
+        dec = enc.copy()
+        dec[np.concatenate(zero_at)] = 0
+        keep = np.zeros(enc.size + 1, dtype=np.int8)
+        np.add.at(keep, starts, 1)
+        np.add.at(keep, ends, -1)
+        keep = np.cumsum(keep[:-1]) > 0
+        keep[np.concatenate(drop_at)] = False
+
+        # reject packets whose decoded length is not a whole number of values
+        dec_len = np.add.reduceat(keep.astype(np.int64), starts)
+        ok &= (dec_len > 0) & (dec_len % self.dtype.itemsize == 0)
+        if not ok.all():
+            marks = np.zeros(enc.size + 1, dtype=np.int8)
+            np.add.at(marks, starts[~ok], 1)
+            np.add.at(marks, ends[~ok], -1)
+            keep &= ~(np.cumsum(marks[:-1]) > 0)
+        return dec[keep], int(ok.sum())
+
+
+class AsciiLineDecoder(StreamDecoder):
+    def __init__(self, frame_shape: Tuple[int, ...], dtype=np.float32, eol: bytes = b'\n',
+                 delimiter: bytes = b',', buffer_bytes: int = 1 << 20):
+        """
+        Decoder for text lines of C delimited numbers terminated by EOL (e.g. Arduino println output)
+          All complete lines in the buffer are parsed by one NumPy call; a trailing partial line
+          stays buffered for the next read. Lines without exactly C numbers (headers, the partial
+          first line after connecting) are dropped.
+        :param frame_shape: shape of one emitted frame, (S, C)
+        :param dtype: dtype of the emitted values
+        :param eol: line terminator
+        :param delimiter: separator between the values of one line
+        :param buffer_bytes: size of the receive buffer
+        """
+        super().__init__(frame_shape, dtype, buffer_bytes)
+        self.eol = _eol_bytes(eol) or b'\n'
+        self.delimiter = _eol_bytes(delimiter) or b','
+        self.num_channel = self.frame_shape[-1]
+        self._sep = self.delimiter.decode('latin-1')
+        self._synced = False
+
+    def _parse(self, buf: np.ndarray):
+        raw = buf.tobytes()
+        end = raw.rfind(self.eol)
+        if end < 0:
+            return 0, None
+        consumed = end + len(self.eol)
+        start = 0
+        if not self._synced:
+            # we may have connected mid-line
+            start = raw.find(self.eol) + len(self.eol)
+            self.bytes_skipped += start
+            self._synced = True
+            if start >= consumed:
+                return consumed, None
+        text = raw[start:end]
+
+        C = self.num_channel
+        arr = np.frombuffer(text, dtype=np.uint8)
+        eols = _token_positions(arr, self.eol)
+        nlines = eols.size + 1
+        # fast path: every line holds exactly C - 1 delimiters (checked per line, so a short line
+        # next to a long one cannot pass as two good lines) and the batch parses to C values per line
+        per_line = np.bincount(np.searchsorted(eols, _token_positions(arr, self.delimiter)), minlength=nlines)
+        if np.all(per_line == C - 1):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", DeprecationWarning)
+                vals = np.fromstring(text.replace(self.eol, self.delimiter), dtype=np.float64, sep=self._sep)
+            if vals.size == nlines * C:
+                self.packets += nlines
+                return consumed, vals.astype(self.dtype)
+        return consumed, self._parse_lines(text.split(self.eol))
+
+    def _parse_lines(self, lines) -> Optional[np.ndarray]:
+        """Slow path for a batch with malformed lines: parse line by line and drop the bad ones."""
+        C = self.num_channel
+        rows = []
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            for line in lines:
+                try:
+                    row = np.fromstring(line, dtype=np.float64, sep=self._sep)
+                except ValueError:
+                    row = None
+                if row is not None and row.size == C and line.count(self.delimiter) == C - 1:
+                    rows.append(row)
+        self.packets += len(rows)
+        self.bad_packets += len(lines) - len(rows)
+        if not rows:
+            return None
+        return np.concatenate(rows).astype(self.dtype)
+
+
+def make_decoder(protocol: str, frame_shape: Tuple[int, ...], dtype=np.float32, EOL=None, **kwargs) -> StreamDecoder:
+    """
+    Build a decoder from SerialManager settings
+    :param protocol: 'sync' (sync word + length + CRC), 'cobs' or 'ascii' (delimited text lines)
+    :param frame_shape: shape of one emitted frame, (S, C) or (H, W, C)
+    :param dtype: dtype of payload values on the wire
+    :param EOL: sync word for 'sync', delimiter byte for 'cobs', line terminator for 'ascii';
+    protocol defaults when None
+    :param kwargs: extra decoder options (crc, max_payload, delimiter, buffer_bytes)
+    """
+    sep = _eol_bytes(EOL)
+    if protocol == 'sync':
+        return SyncWordDecoder(frame_shape, dtype, sync=sep or DEFAULT_SYNC, **kwargs)
+    if protocol == 'cobs':
+        return CobsDecoder(frame_shape, dtype, delimiter=sep[0] if sep else 0, **kwargs)
+    if protocol == 'ascii':
+        return AsciiLineDecoder(frame_shape, dtype, eol=sep or b'\n', **kwargs)
+    raise ValueError(f"unsupported protocol {protocol!r}; expected one of {PROTOCOLS}")
@@ -0,0 +1,211 @@
+import io
+import os
+import sys
+import threading
+import time
+import numpy as np
+from typing import Tuple
+
+from sensor_core.serial.decoders import (PROTOCOLS, DEFAULT_SYNC, _eol_bytes,
+                                         encode_sync_packets, cobs_encode)
+
+WAVEFORMS = ('sine', 'noise', 'chirp', 'counter', 'image')
+
+
+class SensorEmulator:
+    def __init__(self, num_channel: int = 3, protocol: str = 'sync', waveform: str = 'sine',
+                 sample_rate_hz: float = 1000.0, byte_rate: float = None,
+                 samples_per_packet: int = 1, frame_shape: Tuple[int, ...] = None,
+                 dtype=np.float32, EOL=None, freq_hz: float = 5.0, amplitude: float = 1.0,
+                 noise: float = 0.0, chirp_hz: Tuple[float, float] = (1.0, 50.0),
+                 chirp_period_s: float = 2.0, seed: int = 0, tick_s: float = 0.005):
+        """ Initialize SensorEmulator Class
+        Streams synthetic sensor data into a Linux/macOS pseudo-terminal in one of the wire formats
+        the default reader decodes, so the whole pyserial -> tty -> decoder -> ring path can run
+        without hardware.
+
+        Example:
+          with SensorEmulator(num_channel=3, sample_rate_hz=10000) as emu:
+              sm = SensorManager(ser_channel_key, frame_shape=(1000, 100, 3), **emu.sensor_kwargs())
+
+        :param num_channel: channels per sample (line waveforms)
+        :param protocol: wire format: 'sync', 'cobs' or 'ascii'
+        :param waveform: 'sine', 'noise', 'chirp', 'counter' (every channel carries the sample index)
+        or 'image' (moving pattern frames of frame_shape)
+        :param sample_rate_hz: target samples per second (frames per second for 'image')
+        :param byte_rate: optional target bytes per second on the wire; overrides sample_rate_hz
+        :param samples_per_packet: samples per packet for 'sync'/'cobs' (ignored for 'ascii' and images)
+        :param frame_shape: (H, W, C) for the 'image' waveform
+        :param dtype: payload dtype for binary protocols
+        :param EOL: sync word, delimiter or line terminator; protocol default when None
+        :param freq_hz: sine frequency (channel k runs at (k + 1) * freq_hz)
+        :param amplitude: waveform amplitude
+        :param noise: standard deviation of noise added to 'sine' and 'chirp'
+        :param chirp_hz: start and end frequency of the chirp sweep
+        :param chirp_period_s: seconds per sweep
+        :param seed: random seed
+        :param tick_s: writer period; each tick sends the samples due since the last one
+        """
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"unsupported protocol {protocol!r}; expected one of {PROTOCOLS}")
+        if waveform not in WAVEFORMS:
+            raise ValueError(f"unsupported waveform {waveform!r}; expected one of {WAVEFORMS}")
+        if waveform == 'image':
+            if frame_shape is None or len(frame_shape) != 3:
+                raise ValueError("image waveform needs frame_shape=(H, W, C)")
+            if protocol == 'ascii':
+                raise ValueError("image waveform needs a binary protocol ('sync' or 'cobs')")
+
+        self.num_channel = int(num_channel)
+        self.protocol = protocol
+        self.waveform = waveform
+        self.samples_per_packet = 1 if protocol == 'ascii' else max(1, int(samples_per_packet))
+        self.frame_shape = tuple(frame_shape) if frame_shape is not None else None
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        self.EOL = EOL
+        self.freq_hz = float(freq_hz)
+        self.amplitude = float(amplitude)
+        self.noise = float(noise)
+        self.chirp_hz = tuple(float(f) for f in chirp_hz)
+        self.chirp_period_s = float(chirp_period_s)
+        self.tick_s = float(tick_s)
+        self._rng = np.random.default_rng(seed)
+        self._sep = _eol_bytes(EOL)
+
+        self.sample_rate_hz = float(sample_rate_hz)
+        if byte_rate is not None:
+            self.sample_rate_hz = float(byte_rate) / self.wire_bytes_per_sample()
+
+        # counters
+        self.samples_sent = 0
+        self.bytes_sent = 0
+
+        self.port = None
+        self.t0 = None  # perf_counter() when streaming started; sample i is due at t0 + i / sample_rate_hz
+        self._master = None
+        self._slave = None
+        self._thread = None
+        self._stop_evt = threading.Event()
+
+    def sensor_kwargs(self) -> dict:
+        """SensorManager arguments that point it at this emulator."""
+        return {"commport": self.port, "protocol": self.protocol, "EOL": self.EOL}
+
+    def wire_bytes_per_sample(self) -> float:
+        """Average encoded bytes per sample (per frame for images)."""
+        n = 1 if self.waveform == 'image' else max(self.samples_per_packet, 64)
+        return len(self.encode(self.generate(0, n))) / n
+
+    def generate(self, start: int, n: int) -> np.ndarray:
+        """
+        Samples start .. start + n of the waveform
+        :return: (n, C) for line waveforms, (n, H, W, C) for images
+        """
+        idx = np.arange(start, start + n)
+        if self.waveform == 'image':
+            H, W, C = self.frame_shape
+            yy, xx = np.mgrid[0:H, 0:W]
+            frames = (xx[None] + yy[None] + 4 * idx[:, None, None]) % 256
+            frames = np.repeat(frames[..., None], C, axis=-1)
+            return frames.astype(self.dtype)
+        if self.waveform == 'counter':
+            return np.repeat(idx[:, None], self.num_channel, axis=1).astype(self.dtype)
+
+        t = idx / self.sample_rate_hz
+        k = np.arange(1, self.num_channel + 1)
+        if self.waveform == 'sine':
+            vals = np.sin(2 * np.pi * self.freq_hz * t[:, None] * k[None, :])
+        elif self.waveform == 'chirp':
+            f0, f1 = self.chirp_hz
+            tm = np.mod(t, self.chirp_period_s)
+            phase = 2 * np.pi * (f0 * tm + 0.5 * (f1 - f0) / self.chirp_period_s * tm ** 2)
+            vals = np.sin(phase[:, None] + np.pi * (k[None, :] - 1) / self.num_channel)
+        else:
+            vals = self._rng.standard_normal((n, self.num_channel))
+        vals = self.amplitude * vals
+        if self.noise and self.waveform != 'noise':
+            vals = vals + self._rng.normal(0.0, self.noise, vals.shape)
+        return vals.astype(self.dtype)
+
+    def encode(self, data: np.ndarray) -> bytes:
+        """Encode samples (or image frames) from generate() in the emulator's wire format."""
+        if self.protocol == 'ascii':
+            eol = (self._sep or b'\n').decode('latin-1')
+            out = io.StringIO()
+            np.savetxt(out, data, fmt='%.6g', delimiter=',', newline=eol)
+            return out.getvalue().encode('latin-1')
+
+        raw = np.ascontiguousarray(data).view(np.uint8).reshape(-1)
+        if self.waveform == 'image':
+            # split each frame into payloads that fit the u16 length field
+            per_packet = self.dtype.itemsize * max(1, 32768 // self.dtype.itemsize)
+        else:
+            per_packet = self.samples_per_packet * self.num_channel * self.dtype.itemsize
+        full = raw.size // per_packet * per_packet
+        payloads = [raw[:full].reshape(-1, per_packet)]
+        if full < raw.size:
+            payloads.append(raw[full:].reshape(1, -1))
+        if self.protocol == 'sync':
+            sync = self._sep or DEFAULT_SYNC
+            return b''.join(encode_sync_packets(p, sync=sync).tobytes() for p in payloads)
+        delimiter = self._sep[0] if self._sep else 0
+        return b''.join(cobs_encode(row.tobytes(), delimiter) for p in payloads for row in p)
+
+    def start(self) -> str:
+        """ Open the pseudo-terminal and start streaming
+        :return: path of the slave tty to use as commport
+        """
+        if not sys.platform.startswith(('linux', 'darwin')):
+            raise EnvironmentError("SensorEmulator needs a POSIX pseudo-terminal (Linux or macOS)")
+        import tty
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        self._stop_evt.clear()
+        self.t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sensor-emulator", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self, timeout: float = 1.0):
+        self._stop_evt.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master = self._slave = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        t0 = self.t0
+        step = self.samples_per_packet
+        while not self._stop_evt.is_set():
+            due = int((time.perf_counter() - t0) * self.sample_rate_hz)
+            n = (due - self.samples_sent) // step * step
+            if n > 0:
+                wire = memoryview(self.encode(self.generate(self.samples_sent, n)))
+                while wire and not self._stop_evt.is_set():
+                    try:
+                        k = os.write(self._master, wire)
+                    except BlockingIOError:
+                        # nobody is draining the tty fast enough; retry shortly
+                        self._stop_evt.wait(0.001)
+                        continue
+                    except OSError:
+                        return
+                    wire = wire[k:]
+                    self.bytes_sent += k
+                self.samples_sent += n
+            self._stop_evt.wait(self.tick_s)
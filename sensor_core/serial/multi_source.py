@@ -0,0 +1,272 @@
+import threading
+import time
+from collections import deque
+from typing import Sequence
+import numpy as np
+
+from sensor_core.serial.ser_manager import SerialManager
+
+ALIGN_METHODS = ('nearest', 'linear')
+
+
+def _ms(seq) -> float:
+    return round(float(np.mean(seq)), 3) if seq else 0.0
+
+
+class SerialSource(threading.Thread):
+    def __init__(self, commport: str, baudrate: int, num_channel: int, protocol: str = 'sync',
+                 EOL=None, wire_dtype=np.float32, replay_speed: float = 1.0, name: str = None,
+                 counter_channel: int = None, counter_bits: int = None):
+        """
+        One serial port of a multi-port rig, read and decoded on its own thread
+          Samples are stamped on the host monotonic clock by the port's DeviceClock, fitted from
+          sample counts (or a device counter channel) against read times.
+        :param commport: serial port (or 'replay:<capture file>')
+        :param baudrate: target baudrate
+        :param num_channel: channels this port carries
+        :param protocol: wire protocol of this port ('sync', 'cobs' or 'ascii')
+        :param EOL: sync word, delimiter or line terminator for the protocol
+        :param wire_dtype: dtype of binary payload values
+        :param replay_speed: pacing for a replay commport
+        :param name: label used in metrics (defaults to the commport)
+        :param counter_channel: channel of this port carrying a device sample counter, if any
+        :param counter_bits: width of that counter if it wraps
+        """
+        super().__init__(name=f"serial-source-{name or commport}", daemon=True)
+        self.label = str(name or commport)
+        self.num_channel = int(num_channel)
+        self.sm = SerialManager(commport, baudrate, (1, 1, self.num_channel), EOL=EOL,
+                                protocol=protocol, wire_dtype=wire_dtype, replay_speed=replay_speed,
+                                timestamp_model=True, counter_channel=counter_channel,
+                                counter_bits=counter_bits)
+        self.clock = self.sm.frame_clock.clock
+        self.samples_in = 0
+        self.gaps = 0           # arrival pauses longer than a few sample periods
+        self.error = None
+        self._lock = threading.Lock()
+        self._vals = []
+        self._ts = []
+        self._last_t = None
+        self._last_ts = 0
+        self._stop_evt = threading.Event()
+
+    def open(self):
+        self.sm.setup_serial()
+
+    def run(self):
+        while not self._stop_evt.is_set():
+            try:
+                frames = self.sm._read_frames()
+            except Exception as e:
+                self.error = e
+                break
+            if frames is None:
+                continue
+            vals = frames.reshape(-1, self.num_channel)
+            n = len(vals)
+            # decoded frames are single samples, so the frame stamps are the sample stamps
+            # a refit may move the line back a little; keep each source's stamps non-decreasing
+            ts = np.maximum(self.sm.frame_mono_ns.astype(np.int64), self._last_ts)
+            self._last_ts = int(ts[-1])
+            t = time.monotonic_ns()
+            period = self.clock.period_ns
+            if self._last_t is not None and period and (t - self._last_t) > 4 * n * period:
+                self.gaps += 1
+            self._last_t = t
+            with self._lock:
+                self._vals.append(vals)
+                self._ts.append(ts)
+                self.samples_in += n
+
+    def drain(self):
+        """ Take everything decoded since the last call
+        :return: (values (n, C), monotonic ns (n,))
+        """
+        with self._lock:
+            vals, ts = self._vals, self._ts
+            self._vals, self._ts = [], []
+        if not vals:
+            return np.empty((0, self.num_channel), dtype=np.float64), np.empty(0, dtype=np.int64)
+        return np.concatenate(vals), np.concatenate(ts)
+
+    def stop(self, timeout: float = 1.0):
+        self._stop_evt.set()
+        if self.is_alive():
+            self.join(timeout)
+        if self.sm.ser is not None:
+            self.sm.ser.close()
+
+
+class MultiSourceAligner:
+    def __init__(self, sources: Sequence[SerialSource], window: int, method: str = 'nearest',
+                 max_skew_ms: float = 20.0, reference: int = 0, stale_ms: float = 500.0):
+        """
+        Merges several SerialSources into one (S, C) frame stream on the reference source's clock
+          Every reference sample is matched to each other source by nearest neighbour or by linear
+          interpolation between its neighbours. Rows whose match is further than max_skew_ms away
+          are dropped; a source that goes quiet drops rows after stale_ms instead of stalling.
+        :param sources: sources in channel order; channels are concatenated in this order
+        :param window: samples per frame (S)
+        :param method: 'nearest' or 'linear'
+        :param max_skew_ms: largest accepted time distance between a reference sample and its match
+        :param reference: index of the source whose sample times define the aligned rows
+        :param stale_ms: how long reference samples may wait for a silent source before being dropped
+        """
+        if method not in ALIGN_METHODS:
+            raise ValueError(f"unsupported align method {method!r}; expected one of {ALIGN_METHODS}")
+        self.sources = list(sources)
+        self.window = int(window)
+        self.method = method
+        self.max_skew_ns = int(max_skew_ms * 1e6)
+        self.stale_ns = int(stale_ms * 1e6)
+        self.ref = int(reference)
+        self.num_channel = sum(s.num_channel for s in self.sources)
+
+        self._pending = [(np.empty((0, s.num_channel)), np.empty(0, dtype=np.int64)) for s in self.sources]
+        self._rows = np.empty((0, self.num_channel), dtype=np.float64)
+        self._row_ts = np.empty(0, dtype=np.int64)
+
+        # stats
+        self.rows_aligned = 0
+        self.rows_dropped = 0
+        self._skew_ms = [deque(maxlen=500) for _ in self.sources]
+        self._skew_max_ms = [0.0 for _ in self.sources]
+        self._missing = [0 for _ in self.sources]
+
+    def start(self):
+        for s in self.sources:
+            s.open()
+        for s in self.sources:
+            s.start()
+
+    def stop(self, timeout: float = 1.0):
+        for s in self.sources:
+            s.stop(timeout)
+
+    def poll(self, timeout: float = 0.01):
+        """
+        Align what has arrived and cut it into frames
+        :param timeout: seconds to sleep when nothing can be aligned yet
+        :return: (frames (N, S, C), per-frame monotonic ns of each frame's first row), or (None, None)
+        """
+        for i, s in enumerate(self.sources):
+            v, t = s.drain()
+            if t.size:
+                pv, pt = self._pending[i]
+                self._pending[i] = (np.concatenate((pv, v)), np.concatenate((pt, t)))
+
+        ref_v, ref_t = self._pending[self.ref]
+        if ref_t.size:
+            self._align(ref_v, ref_t)
+
+        n = self._rows.shape[0] // self.window
+        if n == 0:
+            time.sleep(timeout)
+            return None, None
+        k = n * self.window
+        frames = self._rows[:k].reshape(n, self.window, self.num_channel)
+        stamps = self._row_ts[0:k:self.window].astype(np.uint64)
+        self._rows, self._row_ts = self._rows[k:], self._row_ts[k:]
+        return frames, stamps
+
+    def _align(self, ref_v: np.ndarray, ref_t: np.ndarray):
+        others = [i for i in range(len(self.sources)) if i != self.ref]
+        # a reference sample is ready once every other source has data at or after it
+        horizon = min((self._pending[i][1][-1] if self._pending[i][1].size else -1) for i in others) \
+            if others else ref_t[-1]
+        ready = int(np.searchsorted(ref_t, horizon, side='right'))
+        stale = int(np.searchsorted(ref_t, time.monotonic_ns() - self.stale_ns, side='right'))
+        if ready == 0 and stale == 0:
+            return
+        k = max(ready, stale)
+        tr = ref_t[:k]
+        valid = np.ones(k, dtype=bool)
+        valid[ready:] = False  # stale rows nobody can match
+        for i in others:
+            if self._pending[i][1].size == 0 or ready < k:
+                self._missing[i] += k - ready
+        cols = [None] * len(self.sources)
+        cols[self.ref] = ref_v[:k]
+
+        for i in others:
+            v, t = self._pending[i]
+            C = self.sources[i].num_channel
+            if t.size == 0:
+                cols[i] = np.zeros((k, C))
+                continue
+            j = np.clip(np.searchsorted(t, tr), 1, max(1, t.size - 1)) if t.size > 1 else np.zeros(k, dtype=np.int64)
+            if t.size > 1:
+                left_closer = (tr - t[j - 1]) <= (t[j] - tr)
+                nearest = np.where(left_closer, j - 1, j)
+            else:
+                nearest = j
+            skew = np.abs(t[nearest] - tr)
+            if self.method == 'linear' and t.size > 1:
+                cols[i] = np.stack([np.interp(tr, t, v[:, c]) for c in range(C)], axis=1)
+            else:
+                cols[i] = v[nearest]
+            ok = skew <= self.max_skew_ns
+            valid[:ready] &= ok[:ready]
+            self._skew_ms[i].extend((skew[:ready] / 1e6).tolist()[-500:])
+            if ready:
+                self._skew_max_ms[i] = max(self._skew_max_ms[i], float(skew[:ready].max()) / 1e6)
+            # keep from the sample just before the last matched row; earlier ones can't match again
+            keep_from = max(0, int(nearest[ready - 1]) - 1) if ready else 0
+            self._pending[i] = (v[keep_from:], t[keep_from:])
+
+        rows = np.concatenate(cols, axis=1)
+        self.rows_aligned += int(valid.sum())
+        self.rows_dropped += int(k - valid.sum())
+        self._rows = np.concatenate((self._rows, rows[valid]))
+        self._row_ts = np.concatenate((self._row_ts, tr[valid]))
+        self._pending[self.ref] = (ref_v[k:], ref_t[k:])
+
+    def stats(self) -> dict:
+        out = {
+            "align_method": self.method,
+            "align_rows": int(self.rows_aligned),
+            "align_rows_dropped": int(self.rows_dropped),
+        }
+        for i, s in enumerate(self.sources):
+            dec = s.sm.decoder.stats() if s.sm.decoder is not None else {}
+            p = f"src{i}_"
+            out.update({
+                p + "port": s.label,
+                p + "samples": int(s.samples_in),
+                p + "rate_hz": round(1e9 / s.clock.period_ns, 2) if s.clock.period_ns else 0.0,
+                p + "clock_residual_ms": round(s.clock.residual_ms, 4),
+                p + "gaps": int(s.gaps),
+                p + "bad_packets": int(dec.get("decoder_bad_packets", 0)),
+                p + "skew_avg_ms": _ms(self._skew_ms[i]),
+                p + "skew_max_ms": round(self._skew_max_ms[i], 3),
+                p + "rows_missing": int(self._missing[i]),
+                p + "error": repr(s.error) if s.error is not None else None,
+            })
+        return out
+
+
+def make_aligner(commports: Sequence[str], baudrate: int, source_channels: Sequence[int], window: int,
+                 protocol='sync', EOL=None, wire_dtype=np.float32, method: str = 'nearest',
+                 max_skew_ms: float = 20.0, replay_speed: float = 1.0) -> MultiSourceAligner:
+    """
+    Build an aligner with one SerialSource per commport
+    :param commports: ports in channel order
+    :param baudrate: baudrate shared by all ports
+    :param source_channels: channels carried by each port
+    :param window: samples per frame (S)
+    :param protocol: protocol for all ports, or one per port
+    :param EOL: EOL for all ports, or one per port
+    :param wire_dtype: payload dtype for binary protocols
+    :param method: 'nearest' or 'linear'
+    :param max_skew_ms: largest accepted match distance
+    :param replay_speed: pacing for replay commports
+    """
+    if len(source_channels) != len(commports):
+        raise ValueError(f"source_channels {list(source_channels)} must give one channel count per commport")
+    n = len(commports)
+    protocols = list(protocol) if isinstance(protocol, (list, tuple)) else [protocol] * n
+    eols = list(EOL) if isinstance(EOL, (list, tuple)) else [EOL] * n
+    sources = [SerialSource(port, baudrate, ch, protocol=pr, EOL=eol, wire_dtype=wire_dtype,
+                            replay_speed=replay_speed)
+               for port, ch, pr, eol in zip(commports, source_channels, protocols, eols)]
+    return MultiSourceAligner(sources, window, method=method, max_skew_ms=max_skew_ms)
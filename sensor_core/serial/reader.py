@@ -0,0 +1,121 @@
+import threading
+import time
+import numpy as np
+
+
+class ByteRing:
+    def __init__(self, capacity: int = 1 << 22):
+        """
+        Single-producer / single-consumer ring of bytes between a serial reader thread and the decoder
+          The producer reads straight into write_view() and commits; the consumer copies out with
+          read_into. Positions are running byte counts, so available() is head - tail.
+        :param capacity: ring size in bytes
+        """
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=np.uint8)
+        self._head = 0  # total bytes committed by the producer
+        self._tail = 0  # total bytes consumed (or dropped)
+        self.head_ns = None       # monotonic receive time of the newest committed bytes
+        self.last_read_ns = None  # receive time of the newest bytes handed out, when read_into drained the ring
+        self._cond = threading.Condition()
+
+    def available(self) -> int:
+        return self._head - self._tail
+
+    def fill(self) -> float:
+        return self.available() / self.capacity
+
+    def write_view(self, nbytes: int) -> memoryview:
+        """Contiguous free region of at most nbytes at the head (empty when the ring is full)."""
+        pos = self._head % self.capacity
+        free = self.capacity - self.available()
+        n = min(int(nbytes), free, self.capacity - pos)
+        return memoryview(self._buf)[pos:pos + n]
+
+    def commit(self, nbytes: int, ts_ns: int = None):
+        with self._cond:
+            self._head += int(nbytes)
+            self.head_ns = time.monotonic_ns() if ts_ns is None else int(ts_ns)
+            self._cond.notify()
+
+    def drop_oldest(self, nbytes: int) -> int:
+        """Discard up to nbytes of unread data to make room; returns the number dropped."""
+        with self._cond:
+            n = min(int(nbytes), self.available())
+            self._tail += n
+            return n
+
+    def read_into(self, out, timeout: float = None) -> int:
+        """
+        Move up to len(out) bytes into out, waiting up to timeout seconds for data
+        :param out: writable bytes-like destination (e.g. a decoder's free_space())
+        :param timeout: seconds to wait when the ring is empty; None waits forever
+        :return: number of bytes copied
+        """
+        dst = np.frombuffer(out, dtype=np.uint8)
+        with self._cond:
+            if not self.available():
+                self._cond.wait_for(self.available, timeout=timeout)
+            n = min(self.available(), dst.size)
+            pos = self._tail % self.capacity
+            first = min(n, self.capacity - pos)
+            dst[:first] = self._buf[pos:pos + first]
+            dst[first:n] = self._buf[:n - first]
+            self._tail += n
+            self.last_read_ns = self.head_ns if n and not self.available() else None
+            return n
+
+    def clear(self):
+        with self._cond:
+            self._tail = self._head
+
+
+class SerialReader(threading.Thread):
+    def __init__(self, ser, ring: ByteRing, metrics=None, chunk_bytes: int = 1 << 16, capture=None):
+        """
+        Thread that drains a serial port into a ByteRing with readinto
+          Keeps the OS buffer empty however long the decode/publish side takes. When the ring is
+          full the oldest bytes are dropped (the decoder resyncs) and the overflow is recorded.
+        :param ser: open serial.Serial (its timeout bounds each blocking read)
+        :param ring: destination byte ring
+        :param metrics: optional RingMetrics receiving serial read/overflow counters
+        :param chunk_bytes: largest single read
+        :param capture: optional ByteCapture that every chunk is teed to with its receive time
+        """
+        super().__init__(name="serial-reader", daemon=True)
+        self.ser = ser
+        self.ring = ring
+        self.metrics = metrics
+        self.chunk_bytes = int(chunk_bytes)
+        self.capture = capture
+        self.error = None
+        self._stop_evt = threading.Event()
+
+    def run(self):
+        ring, ser = self.ring, self.ser
+        while not self._stop_evt.is_set():
+            try:
+                want = min(self.chunk_bytes, max(1, ser.in_waiting))
+                view = ring.write_view(want)
+                if not len(view):
+                    dropped = ring.drop_oldest(max(want, ring.capacity // 16))
+                    if self.metrics is not None:
+                        self.metrics.note_serial_overflow(dropped)
+                    view = ring.write_view(want)
+                n = ser.readinto(view)
+                if n:
+                    t = time.monotonic_ns()
+                    capture = self.capture
+                    if capture is not None:
+                        capture.write(view[:n], t)
+                    ring.commit(n, t)
+                    if self.metrics is not None:
+                        self.metrics.note_serial_read(n, ser.in_waiting, ring.fill())
+            except Exception as e:
+                # port closed or unplugged; the consumer sees no more data
+                self.error = e
+                break
+
+    def stop(self, timeout: float = 1.0):
+        self._stop_evt.set()
+        self.join(timeout)
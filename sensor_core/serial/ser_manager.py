@@ -1,21 +1,175 @@
 import serial
+import os
 import sys
 import glob
+import time
+import queue
+import inspect
+import threading
 import numpy as np
 from typing import *
 from itertools import product
+from sensor_core.serial.decoders import make_decoder
+from sensor_core.serial.reader import ByteRing, SerialReader
+from sensor_core.serial.capture import ByteCapture, ReplaySerial, REPLAY_PREFIX
+from sensor_core.serial.clock import DeviceClock, FrameClock
 
 
-def find_serial():
+_SYSFS_TTY = '/sys/class/tty'
+_PROBE_CACHE = {}  # device node -> ((st_ino, st_mtime_ns), openable)
+_PROBE_CACHE_LOCK = threading.Lock()
+
+
+def _read_sysfs(path: str) -> Optional[str]:
+    try:
+        with open(path) as fh:
+            return fh.read().strip()
+    except OSError:
+        return None
+
+
+def _as_usb_id(value) -> Optional[int]:
+    if value is None:
+        return None
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def _sysfs_serial_ports() -> Dict[str, dict]:
+    """ Serial-capable tty nodes from /sys/class/tty metadata (Linux), without opening anything
+    Virtual consoles and ptys have no device link; legacy 8250 ports report type 0 when no UART is fitted.
+    :return: {'/dev/ttyX': {'vid', 'pid', 'serial_number', 'driver'}}
+    """
+    ports = {}
+    for name in os.listdir(_SYSFS_TTY):
+        dev_link = os.path.join(_SYSFS_TTY, name, 'device')
+        if not os.path.exists(dev_link):
+            continue
+        if _read_sysfs(os.path.join(_SYSFS_TTY, name, 'type')) == '0':
+            continue
+        dev = os.path.realpath(dev_link)
+        driver_link = os.path.join(dev, 'driver')
+        info = {'vid': None, 'pid': None, 'serial_number': None,
+                'driver': os.path.basename(os.path.realpath(driver_link)) if os.path.exists(driver_link) else None}
+        # USB serial: idVendor/idProduct live on an ancestor (the USB device)
+        d = dev
+        while d not in ('/', '/sys') and d.startswith('/sys'):
+            vid = _read_sysfs(os.path.join(d, 'idVendor'))
+            if vid is not None:
+                info.update(vid=_as_usb_id(vid),
+                            pid=_as_usb_id(_read_sysfs(os.path.join(d, 'idProduct'))),
+                            serial_number=_read_sysfs(os.path.join(d, 'serial')))
+                break
+            d = os.path.dirname(d)
+        ports[os.path.join('/dev', name)] = info
+    return ports
+
+
+def _probe_key(port: str):
+    try:
+        st = os.stat(port)
+        return (st.st_ino, st.st_mtime_ns)
+    except OSError:
+        return None
+
+
+def _probe_port(port: str) -> bool:
+    try:
+        s = serial.Serial(port, timeout=0)
+        s.close()
+        return True
+    except (OSError, serial.SerialException, ValueError):
+        return False
+
+
+def _probe_ports(ports: List[str], timeout: float, max_workers: int, use_cache: bool) -> Dict[str, bool]:
+    """ Open each port once, concurrently, giving each probe at most `timeout` seconds
+    Probes run on daemon threads so a driver that never returns cannot block interpreter exit;
+    a port whose probe times out counts as unavailable (and is not cached).
+    """
+    results, todo = {}, []
+    for port in ports:
+        key = _probe_key(port)
+        with _PROBE_CACHE_LOCK:
+            hit = _PROBE_CACHE.get(port)
+        if use_cache and key is not None and hit is not None and hit[0] == key:
+            results[port] = hit[1]
+        else:
+            todo.append((port, key))
+    if not todo:
+        return results
+
+    jobs = queue.Queue()
+    for item in todo:
+        jobs.put(item)
+    started, done = {}, {}
+    cond = threading.Condition()
+
+    def worker():
+        while True:
+            try:
+                port, key = jobs.get_nowait()
+            except queue.Empty:
+                return
+            with cond:
+                started[port] = time.monotonic()
+            ok = _probe_port(port)
+            with cond:
+                done[port] = ok
+                cond.notify()
+            if key is not None:
+                with _PROBE_CACHE_LOCK:
+                    _PROBE_CACHE[port] = (key, ok)
+
+    def spawn():
+        threading.Thread(target=worker, name='serial-probe', daemon=True).start()
+
+    for _ in range(max(1, min(int(max_workers), len(todo)))):
+        spawn()
+
+    abandoned = set()
+    with cond:
+        while len(done) < len(todo):
+            now = time.monotonic()
+            hung = [p for p in started if p not in done and now - started[p] >= timeout]
+            if len(started) == len(todo) and len(hung) == len(started) - len(done):
+                break  # everything has started and whatever is still running has timed out
+            for p in hung:
+                if p not in abandoned:
+                    # replace the stuck worker so the queue keeps draining
+                    abandoned.add(p)
+                    spawn()
+            cond.wait(0.01)
+        results.update(done)
+    for port, _ in todo:
+        results.setdefault(port, False)
+    return results
+
+
+def find_serial(vid=None, pid=None, timeout: float = 0.5, max_workers: int = 16,
+                use_cache: bool = True) -> List[str]:
     """ Lists serial port names
 
+        Linux candidates come from /sys/class/tty metadata, so virtual consoles and absent UARTs are
+        never opened; the remaining ports are probed concurrently. Probe results are cached per
+        device node and reused while the node's inode and mtime are unchanged.
+
+        :param vid: optional USB vendor id (int or hex string) to filter by
+        :param pid: optional USB product id (int or hex string) to filter by
+        :param timeout: seconds each port probe may take before it counts as unavailable
+        :param max_workers: number of concurrent probes
+        :param use_cache: reuse cached probe results for unchanged device nodes
         :raises EnvironmentError:
             On unsupported or unknown platforms
         :returns:
             A list of the serial ports available on the system
     """
+    vid, pid = _as_usb_id(vid), _as_usb_id(pid)
+    info = None
     if sys.platform.startswith('win'):
         ports = ['COM%s' % (i + 1) for i in range(256)]
+    elif sys.platform.startswith('linux') and os.path.isdir(_SYSFS_TTY):
+        info = _sysfs_serial_ports()
+        ports = sorted(info)
     # TODO: confirm if cygwin check is necessary. 
     elif sys.platform.startswith('linux') or sys.platform.startswith('cygwin'):
         # this excludes your current terminal "/dev/tty"
@@ -25,20 +179,25 @@ def find_serial():
     else:
         raise EnvironmentError('Unsupported platform')
 
-    result = []
-    for port in ports:
-        try:
-            s = serial.Serial(port)
-            s.close()
-            result.append(port)
-        except (OSError, serial.SerialException):
-            pass
-    return result
+    if vid is not None or pid is not None:
+        if info is None:
+            # no sysfs: pyserial's per-platform enumeration knows USB ids
+            from serial.tools import list_ports
+            info = {p.device: {'vid': p.vid, 'pid': p.pid} for p in list_ports.comports()}
+        ports = [p for p in ports if p in info
+                 and (vid is None or info[p]['vid'] == vid)
+                 and (pid is None or info[p]['pid'] == pid)]
+
+    ok = _probe_ports(ports, timeout=timeout, max_workers=max_workers, use_cache=use_cache)
+    return [p for p in ports if ok.get(p)]
 
 
 class SerialManager:
     def __init__(self, commport: str, baudrate: int, frame_shape: Tuple[int, ...],
-                 EOL: str = None, virtual_ser_port: bool = False):
+                 EOL: str = None, virtual_ser_port: bool = False, protocol: str = None,
+                 wire_dtype=np.float32, data_mode: str = 'line', replay_speed: float = 1.0,
+                 timestamp_model: bool = False, counter_channel: int = None, counter_bits: int = None,
+                 nominal_rate_hz: float = None):
         """ Initialize SerialManager class - manages functions related to instantiating and using serial port
 
         :param commport: target serial port
@@ -47,6 +206,17 @@ class SerialManager:
         :param EOL: optional; end of line phrase used to separate timepoints
         :param virtual_ser_port: boolean, if True will not initialize serial port, instead will rely on user-defined
         custom function to generate simulated data
+        :param protocol: optional wire protocol decoded by the default reader: 'sync' or 'cobs' framed binary
+        packets, or 'ascii' delimited text lines; EOL then holds the sync word, delimiter or line terminator
+        :param wire_dtype: dtype of the values carried in packet payloads
+        :param data_mode: 'line' (frames of (S, C)) or 'image' (frames of (H, W, C))
+        :param replay_speed: for a 'replay:<capture file>' commport; 1.0 real time, N times faster,
+        or None/0 as fast as possible
+        :param timestamp_model: stamp decoded frames from a DeviceClock fit of sample counters against
+        receive time instead of publish time (needs a protocol)
+        :param counter_channel: channel carrying the device sample counter; None counts decoded samples
+        :param counter_bits: width of the device counter if it wraps
+        :param nominal_rate_hz: nominal device sample rate, for the drift estimate
         """
         self.commport = commport
         self.baudrate = baudrate
@@ -54,6 +224,23 @@ class SerialManager:
         self.EOL = EOL
         self.ser = None
         self.virtual_ser_port = virtual_ser_port
+        self.protocol = protocol
+        self.decoder = None
+        self.data_mode = data_mode
+        self.wire_dtype = np.dtype(wire_dtype)
+        self.replay_speed = replay_speed
+        self._reader = None
+        self._byte_ring = None
+        self._capture = None
+        self.aligner = None        # MultiSourceAligner when several ports feed one frame
+        self.frame_mono_ns = None  # per-frame monotonic stamps of the last acquisition, if known
+        self.frame_clock = None
+        if protocol is not None:
+            decoded_shape = tuple(frame_shape[1:]) if data_mode == 'line' else tuple(frame_shape)
+            self.decoder = make_decoder(protocol, decoded_shape, dtype=wire_dtype, EOL=EOL)
+            if timestamp_model:
+                clock = DeviceClock(counter_bits=counter_bits, nominal_rate_hz=nominal_rate_hz)
+                self.frame_clock = FrameClock(clock, decoded_shape, data_mode, counter_channel=counter_channel)
 
     def setup_serial(self):
         """ Sets up given serial port for a given baudrate
@@ -62,6 +249,10 @@ class SerialManager:
         """
         if self.virtual_ser_port:
             pass
+        elif isinstance(self.commport, str) and self.commport.startswith(REPLAY_PREFIX):
+            # recorded byte stream standing in for the port
+            self.ser = ReplaySerial(self.commport[len(REPLAY_PREFIX):], speed=self.replay_speed)
+            return self.ser
         else:
             try:
                 self.ser = serial.Serial(self.commport, self.baudrate, timeout=0.1)
@@ -69,8 +260,84 @@ class SerialManager:
             except (OSError, serial.SerialException):
                 raise OSError("Error setting up serial port")
 
+    def start_reader(self, metrics=None, ring_bytes: int = 1 << 22):
+        """ Start a background thread that drains the port into a byte ring
+        The decoder then consumes from the ring, so slow publishes no longer back up the OS buffer.
+        :param metrics: optional RingMetrics receiving read and overflow counters
+        :param ring_bytes: byte ring capacity
+        """
+        if self._reader is not None or self.ser is None:
+            return
+        self._byte_ring = ByteRing(ring_bytes)
+        self._reader = SerialReader(self.ser, self._byte_ring, metrics=metrics, capture=self._capture)
+        self._reader.start()
+
+    def stop_reader(self, timeout: float = 1.0):
+        if self._reader is not None:
+            self._reader.stop(timeout)
+            self._reader = None
+
+    def start_capture(self, path: str) -> ByteCapture:
+        """ Tee every raw byte read from the port, with its receive time, to a capture file
+        Replay it later with commport='replay:<path>' to feed the same bytes through the decoder.
+        :param path: capture file path (overwritten)
+        """
+        self.stop_capture()
+        eol = self.EOL.encode('latin-1') if isinstance(self.EOL, str) else self.EOL
+        self._capture = ByteCapture(path, meta={
+            'commport': self.commport,
+            'baudrate': self.baudrate,
+            'protocol': self.protocol,
+            'eol_hex': eol.hex() if eol else None,
+            'frame_shape': list(self.frame_shape),
+            'data_mode': self.data_mode,
+            'wire_dtype': self.wire_dtype.str,
+        })
+        if self._reader is not None:
+            self._reader.capture = self._capture
+        return self._capture
+
+    def stop_capture(self):
+        if self._capture is not None:
+            if self._reader is not None:
+                self._reader.capture = None
+            self._capture.close()
+            self._capture = None
+
+    def _read_frames(self, timeout: float = 0.05):
+        """
+        Move received bytes into the decoder's buffer and decode them
+          From the background reader's byte ring when it runs, otherwise straight from the port.
+        :param timeout: seconds to wait for bytes from the reader thread
+          With a timestamp model, frame_mono_ns receives the stamp of each frame's first sample.
+        :return: (N, S, C) or (N, H, W, C) array of complete frames, or None
+        """
+        free = self.decoder.free_space()
+        if self._reader is not None:
+            n = self._byte_ring.read_into(free, timeout=timeout)
+            if not n:
+                return None
+            recv_ns = self._byte_ring.last_read_ns
+        else:
+            want = min(len(free), max(1, self.ser.in_waiting))
+            n = self.ser.readinto(free[:want])
+            if not n:
+                return None
+            recv_ns = time.monotonic_ns()
+            if self._capture is not None:
+                self._capture.write(free[:n], recv_ns)
+        frames = self.decoder.advance(n)
+        if frames is not None and self.frame_clock is not None:
+            self.frame_mono_ns = self.frame_clock.stamp(frames, self.decoder.pending(), recv_ns)
+        return frames
+
     def _acquire_data(self, frame_shape, data_mode):
-        """Default (fallback) reader; replace with real protocol."""
+        """Default reader: decodes framed packets when a protocol is set, zeros otherwise."""
+        if self.aligner is not None:
+            frames, self.frame_mono_ns = self.aligner.poll()
+            return frames
+        if self.decoder is not None and self.ser is not None:
+            return self._read_frames()
         if data_mode == "line":
             N = int(frame_shape[0])  # num_points
             C = int(frame_shape[2])  # channels
@@ -79,14 +346,68 @@ class SerialManager:
             H, W, Cimg = (frame_shape[0], frame_shape[1], frame_shape[2] if len(frame_shape) == 3 else 1)
             return np.zeros((H, W, Cimg), dtype=np.float32)
 
+    def take_frame_stamps(self):
+        """ Hand over the stamps of the last acquisition (and forget them)
+        :return: (mono_ns, wall_ns) per-frame arrays, or (None, None) when frames should be stamped at publish
+        """
+        mono, self.frame_mono_ns = self.frame_mono_ns, None
+        if mono is None:
+            return None, None
+        wall = mono + np.uint64(time.time_ns() - time.monotonic_ns())
+        return mono, wall
+
+    @staticmethod
+    def func_writes_in_place(func) -> bool:
+        """ Check whether a custom acquisition function takes an `out` buffer to fill in place
+        :param func: custom acquisition function
+        """
+        if func is None:
+            return False
+        try:
+            return 'out' in inspect.signature(func).parameters
+        except (TypeError, ValueError):
+            return False
+
+    @staticmethod
+    def func_fills_batches(func) -> bool:
+        """ Check whether an in-place acquisition function takes `max_frames` and so fills a batch
+        Such functions get `out` as (max_frames, S, C) or (max_frames, H, W, C) and return how many
+        leading frames they filled.
+        :param func: custom acquisition function
+        """
+        if func is None:
+            return False
+        try:
+            return 'max_frames' in inspect.signature(func).parameters
+        except (TypeError, ValueError):
+            return False
+
+    def acquire_into(self, out: np.ndarray, func, max_frames: int = None):
+        """
+        Acquire frames straight into a preallocated buffer (e.g. reserved ring slots)
+          Skips the validation, astype and copy of acquire_data; the buffer already has
+          the ring's shape and dtype.
+        :param out: writable (S, C) or (H, W, C) array, or a batch of them when max_frames is given
+        :param func: custom acquisition function accepting ser, frame_shape, out (and max_frames)
+        :param max_frames: number of frames out has room for (batch functions only)
+        :return: number of frames written (0 if nothing was acquired)
+        """
+        if max_frames is None:
+            n = func(ser=self.ser, frame_shape=self.frame_shape, out=out)
+        else:
+            n = func(ser=self.ser, frame_shape=self.frame_shape, out=out, max_frames=int(max_frames))
+        return int(n or 0)
+
     def acquire_data(self, func=None, data_mode: str='line'):
         """
         Acquire serial data
+          A function may return one frame or a batch of N frames (e.g. everything in one USB packet);
+          the shape is validated once for the whole batch, which is then published as one block.
         :param func: custom acquisition function
         :param data_mode: Line or Image data acquisition
         Returns:
-          LINE mode:  (S, C) float32
-          IMAGE mode: (H, W, C) uint8/float32
+          LINE mode:  (S, C) or (N, S, C) float32
+          IMAGE mode: (H, W, C) or (N, H, W, C) uint8/float32
         """
         if func is None:
             channel_data = self._acquire_data(frame_shape=self.frame_shape,
@@ -111,13 +432,13 @@ class SerialManager:
 
         # Line mode
         if data_mode == "line":
-            # normalize to (S, C)
-            if arr.ndim != 2:
-                raise ValueError(f"LINE mode expects 2D (S, C), got {arr.shape}")
-            S, C = arr.shape
+            # normalize to (S, C), or (N, S, C) when several frames arrive at once
+            if arr.ndim not in (2, 3):
+                raise ValueError(f"LINE mode expects 2D (S, C) or 3D (N, S, C), got {arr.shape}")
+            S, C = arr.shape[-2:]
             if C != self.num_channel and S == self.num_channel:
-                arr = arr.T
-            if arr.shape != (self.frame_shape[1], self.num_channel):
+                arr = np.swapaxes(arr, -1, -2)
+            if arr.shape[-2:] != (self.frame_shape[1], self.num_channel):
                 raise ValueError(f"LINE data shape {arr.shape} != ({self.frame_shape[1]}, {self.num_channel})")
             return arr.astype(np.float32, copy=False)
         # Image Mode
@@ -125,6 +446,6 @@ class SerialManager:
             if arr.ndim == 2:
                 arr = arr[:, :, None]
             Hexp, Wexp, Cexp = self.frame_shape
-            if arr.shape != (Hexp, Wexp, Cexp):
+            if arr.shape[-3:] != (Hexp, Wexp, Cexp) or arr.ndim not in (3, 4):
                 raise ValueError(f"IMAGE data shape {arr.shape} != expected {(Hexp, Wexp, Cexp)}")
             return arr
@@ -10,7 +10,8 @@ def _p95(seq):  return float(np.percentile(seq, 95)) if seq else 0.0
 class RingMetrics:
     """
     Keeps rolling timing metrics and simple rates for producer (writer) and consumer (plot).
-    All durations are in milliseconds.
+    All durations are in milliseconds. Acquire and publish times are per frame; a batch of N frames
+    counts as N frames of 1/N of the batch time, and the per-batch times are kept separately.
     """
     def __init__(self, window: int = 500):
         """ Initialize Ring Metrics Class
@@ -21,6 +22,11 @@ class RingMetrics:
         self.plot_ms    = deque(maxlen=window)
         self.gpu_ms     = deque(maxlen=window)
         self.acquire_ms = deque(maxlen=window)
+        self.publish_batch_ms = deque(maxlen=window)
+        self.acquire_batch_ms = deque(maxlen=window)
+        self.batch_frames     = deque(maxlen=window)
+        self.frames_published  = 0
+        self.batches_published = 0
 
         self._last_pub_t  = None
         self._last_plot_t = None
@@ -36,14 +42,26 @@ class RingMetrics:
         # for crude drop estimation across ticks
         self._prev_write_idx = None
 
-    def note_publish(self, ms: float, write_idx: int | None = None):
-        self.publish_ms.append(ms)
+        # background serial reader (byte ring between the port and the decoder)
+        self.serial_bytes_read     = 0
+        self.serial_overflows      = 0    # times the byte ring was full and its oldest bytes were dropped
+        self.serial_bytes_dropped  = 0
+        self.serial_ring_fill_max  = 0.0  # peak fill fraction of the byte ring
+        self.serial_os_backlog_max = 0    # peak bytes still pending in the OS buffer after a read
+
+    def note_publish(self, ms: float, write_idx: int | None = None, frames: int = 1):
+        frames = max(1, int(frames))
+        self.publish_ms.append(ms / frames)
+        self.publish_batch_ms.append(ms)
+        self.batch_frames.append(frames)
+        self.frames_published += frames
+        self.batches_published += 1
         now = time.perf_counter()
         if self._last_pub_t is not None:
             dt = now - self._last_pub_t
             if dt > 0:
                 # EWMA for stability
-                self.producer_fps = 0.9 * self.producer_fps + 0.1 * (1.0 / dt)
+                self.producer_fps = 0.9 * self.producer_fps + 0.1 * (frames / dt)
         self._last_pub_t = now
         if write_idx is not None:
             self.last_write_idx = int(write_idx)
@@ -62,8 +80,19 @@ class RingMetrics:
     def add_gpu_upload_ms(self, ms: float):
         self.gpu_ms.append(ms)
 
-    def add_acquire_ms(self, ms: float):
-        self.acquire_ms.append(ms)
+    def add_acquire_ms(self, ms: float, frames: int = 1):
+        frames = max(1, int(frames))
+        self.acquire_ms.append(ms / frames)
+        self.acquire_batch_ms.append(ms)
+
+    def note_serial_read(self, nbytes: int, os_backlog: int, ring_fill: float):
+        self.serial_bytes_read += int(nbytes)
+        self.serial_os_backlog_max = max(self.serial_os_backlog_max, int(os_backlog))
+        self.serial_ring_fill_max = max(self.serial_ring_fill_max, float(ring_fill))
+
+    def note_serial_overflow(self, dropped: int):
+        self.serial_overflows += 1
+        self.serial_bytes_dropped += int(dropped)
 
     def update_drop_estimate(self, write_idx_now: int, frames_read_this_tick: int):
         # If writer advanced by more than we consumed, the excess are "drops" at this visualization rate.
@@ -85,10 +114,20 @@ class RingMetrics:
             gpu_upload_p95_ms= round(_p95(self.gpu_ms), 3),
             acquire_avg_ms   = round(_avg(self.acquire_ms), 3),
             acquire_p95_ms   = round(_p95(self.acquire_ms), 3),
+            publish_batch_avg_ms = round(_avg(self.publish_batch_ms), 3),
+            acquire_batch_avg_ms = round(_avg(self.acquire_batch_ms), 3),
+            batch_frames_avg = round(_avg(self.batch_frames), 2),
+            frames_published = int(self.frames_published),
+            batches_published= int(self.batches_published),
             write_idx        = int(self.last_write_idx),
             read_idx         = int(self.last_read_idx),
             frames_lag       = int(self.frames_lag),
             drops_est        = int(self.drops_est),
+            serial_bytes_read     = int(self.serial_bytes_read),
+            serial_overflows      = int(self.serial_overflows),
+            serial_bytes_dropped  = int(self.serial_bytes_dropped),
+            serial_ring_fill_max  = round(self.serial_ring_fill_max, 3),
+            serial_os_backlog_max = int(self.serial_os_backlog_max),
         )
 
 @contextmanager
@@ -0,0 +1,76 @@
+import os
+from typing import Iterable, Optional
+
+SCHED_ROLES = ('update', 'plot', 'stream', 'ingest', 'replay')
+
+_POLICY_NAMES = {getattr(os, k): k[len('SCHED_'):].lower()
+                 for k in ('SCHED_OTHER', 'SCHED_BATCH', 'SCHED_IDLE', 'SCHED_FIFO', 'SCHED_RR')
+                 if hasattr(os, k)}
+
+
+def effective_sched() -> dict:
+    """ Scheduling settings in effect for the calling process (entries the platform lacks are None) """
+    out = {'pid': os.getpid(), 'cpus': None, 'nice': None, 'policy': None, 'rt_priority': None}
+    if hasattr(os, 'sched_getaffinity'):
+        out['cpus'] = sorted(os.sched_getaffinity(0))
+    if hasattr(os, 'getpriority'):
+        out['nice'] = os.getpriority(os.PRIO_PROCESS, 0)
+    if hasattr(os, 'sched_getscheduler'):
+        out['policy'] = _POLICY_NAMES.get(os.sched_getscheduler(0), str(os.sched_getscheduler(0)))
+        out['rt_priority'] = os.sched_getparam(0).sched_priority
+    return out
+
+
+def apply_sched(cpus: Optional[Iterable[int]] = None, nice: Optional[int] = None,
+                fifo: Optional[int] = None) -> dict:
+    """
+    Pin the calling process to CPUs and adjust its priority, as far as the platform and permissions allow
+      Call it before the process starts any threads so they inherit the settings. Anything refused
+      (e.g. SCHED_FIFO or a negative nice without CAP_SYS_NICE) is reported instead of raised.
+    :param cpus: CPU ids to run on (os.sched_setaffinity)
+    :param nice: niceness to set; negative values raise priority
+    :param fifo: SCHED_FIFO real-time priority (1-99); takes precedence over nice for the scheduler
+    :return: effective settings, with an 'errors' list of what could not be applied
+    """
+    errors = []
+    if cpus is not None:
+        if hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, {int(c) for c in cpus})
+            except OSError as e:
+                errors.append(f"affinity {list(cpus)}: {e}")
+        else:
+            errors.append("affinity: not supported on this platform")
+    if fifo:
+        if hasattr(os, 'sched_setscheduler'):
+            try:
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(int(fifo)))
+            except OSError as e:
+                errors.append(f"SCHED_FIFO {fifo}: {e}")
+        else:
+            errors.append("SCHED_FIFO: not supported on this platform")
+    if nice is not None:
+        if hasattr(os, 'setpriority'):
+            try:
+                os.setpriority(os.PRIO_PROCESS, 0, int(nice))
+            except OSError as e:
+                errors.append(f"nice {nice}: {e}")
+        else:
+            errors.append("nice: not supported on this platform")
+    out = effective_sched()
+    out['errors'] = errors
+    return out
+
+
+def run_scheduled(role: str, sched: Optional[dict], metrics_proxy, target, /, *args, **kwargs):
+    """
+    Process target wrapper: apply the role's scheduling settings, report them, then run target
+    :param role: pipeline role ('update', 'plot', 'stream', 'ingest' or 'replay')
+    :param sched: dict with any of cpus, nice, fifo (None keeps the defaults)
+    :param metrics_proxy: proxy receiving 'sched_<role>' with the effective settings
+    :param target: function the process runs
+    """
+    eff = apply_sched(**sched) if sched else dict(effective_sched(), errors=[])
+    if metrics_proxy is not None:
+        metrics_proxy.update({f"sched_{role}": eff})
+    return target(*args, **kwargs)
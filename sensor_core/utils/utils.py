@@ -61,7 +61,11 @@ def update_static_dict(static_args_dict: dict, **kwargs):
                   'shape', 'dtype', 'EOL', 'ring_capacity',
                   'num_channel', 'plot_target_fps',
                   'plot_catch_up_max', 'plot_catchup_boost',
-                  'plot_lag_frames', 'data_mode']
+                  'plot_lag_frames', 'data_mode', 'protocol',
+                  'capture_path', 'replay_speed', 'source_channels',
+                  'align_method', 'align_max_skew_ms', 'timestamp_model',
+                  'counter_channel', 'counter_bits', 'nominal_rate_hz',
+                  'batch_frames', 'transform', 'input_shape', 'input_dtype']
     for key in kwargs:
         if key in valid_keys:
             static_args_dict[f"{key}"] = kwargs[f"{key}"]
@@ -107,7 +111,11 @@ class DictManager(object):
                           'baudrate', 'shm_name', 'shape', 'dtype', 'ring_capacity',
                           'data_mode']
         optional_keys = ['EOL', 'num_points', 'num_channel', 'plot_target_fps',
-                         'plot_catchup_base_max', 'plot_catchup_boost']
+                         'plot_catchup_base_max', 'plot_catchup_boost', 'protocol',
+                         'capture_path', 'replay_speed', 'source_channels',
+                         'align_method', 'align_max_skew_ms', 'timestamp_model',
+                         'counter_channel', 'counter_bits', 'nominal_rate_hz',
+                         'batch_frames', 'transform', 'input_shape', 'input_dtype']
 
         for key in essential_keys:
             try: